@@ -1,50 +1,564 @@
 import os
+import re
+import fcntl
 import json
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, ParamValidationError
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 ssm = boto3.client("ssm")
+s3 = boto3.client("s3")
 
 DOC_NAME = os.environ["AUTOMATION_DOC_NAME"]
 ASSUME_ROLE_ARN = os.environ["AUTOMATION_ASSUME_ROLE_ARN"]
+# Comma-separated regions to stop instances in; empty means every enabled region
+REGIONS = os.environ.get("REMEDIATION_REGIONS", "").strip() or "all"
+STOP_BATCH_SIZE = os.environ.get("STOP_BATCH_SIZE", "100")
+TAG_KEY = "AutoStop"
+TAG_VALUE = "true"
 
+# Only these budgets, at or above this percentage threshold, trigger remediation
+REMEDIATION_BUDGETS = {b.strip() for b in os.environ.get("REMEDIATION_BUDGETS", "").split(",") if b.strip()}
+REMEDIATION_THRESHOLD = float(os.environ.get("REMEDIATION_THRESHOLD", "100"))
+# Triggers for a budget within this window of the last one are dropped
+DEBOUNCE_SECONDS = int(os.environ.get("DEBOUNCE_SECONDS", "3600"))
+# Locks live in the archive bucket; LOCK_DIR swaps in a local directory (for local runs)
+LOCK_BUCKET = os.environ.get("LOCK_BUCKET", "")
+LOCK_DIR = os.environ.get("LOCK_DIR", "")
+LOCK_PREFIX = "state/remediation/"
+ACTIVE_STATUSES = ["Pending", "InProgress", "Waiting"]
+_conditional_writes = True  # cleared if the bundled botocore predates S3 conditional writes
 
-def lambda_handler(event, context):
+# AutoStop inventory: one object per resource type and region, kept current from
+# tag-change and state-change events and reconciled by a scheduled refresh
+INVENTORY_ENABLED = os.environ.get("INVENTORY_ENABLED", "false").lower() == "true"
+INVENTORY_PREFIX = "state/inventory/"
+INVENTORY_MAX_ATTEMPTS = 5
+STOPPABLE_STATES = {"pending", "running"}
+GONE_STATES = {"shutting-down", "terminated"}
+EC2_RETRIES = Config(retries={"mode": "adaptive", "max_attempts": 10})
+MAX_WORKERS = 16
+_ec2_clients = {}
+
+# AWS Budgets SNS notifications are plain text. The threshold is normally given
+# in dollars ("Alert Threshold: > $40.00") and turned into a percentage of the
+# budgeted amount; a percentage threshold is used as is.
+BUDGET_FIELDS = {
+    "budget": re.compile(r"^Budget Name:\s*(.+?)\s*$", re.M),
+    "alert_type": re.compile(r"^Alert Type:\s*(\w+)", re.M),
+    "budgeted": re.compile(r"^Budgeted Amount:\s*\$?([\d.,]+)", re.M),
+    "threshold_amount": re.compile(r"^Alert Threshold:\s*>=?\s*\$([\d.,]+)", re.M),
+    "threshold": re.compile(r"(?:^Alert Threshold:\s*>=?|greater than)\s*([\d.,]+)%", re.M),
+    "actual": re.compile(r"^(?:ACTUAL|FORECASTED) Amount:\s*\$?([\d.,]+)", re.M),
+}
+NUMERIC_FIELDS = ("budgeted", "threshold_amount", "threshold", "actual")
+
+
+def parse_budget_notification(message):
     """
-    Remediation Lambda triggered by SNS when budget threshold is exceeded.
-    Starts SSM Automation to stop instances tagged AutoStop=true.
+    Pull budget name, alert type, threshold percentage and amount out of an AWS
+    Budgets notification. Returns None if the message is not one; the threshold
+    is left out if it cannot be worked out (see out_of_scope).
+    """
+    fields = {}
+    for name, pattern in BUDGET_FIELDS.items():
+        match = pattern.search(message or "")
+        if match:
+            fields[name] = match.group(1)
+    if "budget" not in fields:
+        return None
+    for name in NUMERIC_FIELDS:
+        if name in fields:
+            fields[name] = float(fields[name].replace(",", ""))
+    if "threshold" not in fields and "threshold_amount" in fields and fields.get("budgeted"):
+        fields["threshold"] = round(fields["threshold_amount"] / fields["budgeted"] * 100, 2)
+    return fields
+
+
+def triggers_from_event(event):
+    """
+    One trigger per SNS record. A direct invocation (make test-remediation, or
+    the reporter's hourly monitor on a burn-rate alert) is a manual trigger:
+    {"budget": ..., "threshold": ..., "trigger": id, "force": true} are all optional.
     """
+    records = [r["Sns"] for r in event.get("Records", []) if "Sns" in r]
+    if not records:
+        return [{
+            "budget": event.get("budget") or next(iter(sorted(REMEDIATION_BUDGETS)), "manual"),
+            "threshold": event.get("threshold"),
+            "message_id": event.get("trigger") or "manual",
+            "manual": True,
+            "force": bool(event.get("force")),
+        }]
+    triggers = []
+    for sns in records:
+        notification = parse_budget_notification(sns.get("Message"))
+        if notification is None:
+            logger.warning(f"Ignoring SNS message {sns.get('MessageId')}: not a budget notification ({sns.get('Subject')})")
+            continue
+        triggers.append({**notification, "message_id": sns.get("MessageId", ""), "manual": False, "force": False})
+    return triggers
+
+
+def out_of_scope(trigger):
+    """Reason a budget notification should not stop instances, or None if it should."""
+    if trigger["manual"]:
+        return None
+    if REMEDIATION_BUDGETS and trigger["budget"] not in REMEDIATION_BUDGETS:
+        return "other_budget"
+    if trigger.get("threshold") is None:
+        # Fail closed: a notification we cannot place must not stop instances
+        return "unknown_threshold"
+    if trigger["threshold"] < REMEDIATION_THRESHOLD:
+        return "below_threshold"
+    return None
+
+
+def lock_key(budget):
+    return f"{LOCK_PREFIX}{re.sub(r'[^A-Za-z0-9._-]', '_', budget)}.json"
+
+
+def read_state(key):
+    """Return (body, etag) for a state object (lock or inventory), or (None, None) if absent."""
+    if LOCK_DIR:
+        path = os.path.join(LOCK_DIR, *key.split("/"))
+        if not os.path.isfile(path):
+            return None, None
+        with open(path, "rb") as f:
+            body = f.read()
+        return json.loads(body), hashlib.md5(body).hexdigest()
     try:
-        logger.info(f"Received event: {json.dumps(event)}")
+        resp = s3.get_object(Bucket=LOCK_BUCKET, Key=key)
+        return json.loads(resp["Body"].read()), resp["ETag"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None, None
+        raise
+
+
+def put_conditional(condition, **kwargs):
+    """
+    put_object with an If-Match / If-None-Match condition. A botocore that
+    predates S3 conditional writes rejects them client-side; the state is then
+    written unconditionally, with a warning, and later writes skip the condition.
+    """
+    global _conditional_writes
+    if _conditional_writes:
+        try:
+            return s3.put_object(**kwargs, **condition)
+        except ParamValidationError as e:
+            _conditional_writes = False
+            logger.warning(f"S3 conditional writes unsupported by this botocore, writing without them: {e}")
+    return s3.put_object(**kwargs)
+
+
+def write_state(key, state, etag):
+    """
+    Conditionally write a state object: If-Match on etag, or If-None-Match for
+    a new one. Returns the new ETag, or None if another invocation wrote it first.
+    """
+    body = json.dumps(state).encode("utf-8")
+    if LOCK_DIR:
+        # Local stand-in: compare-and-replace under an flock (single host only)
+        path = os.path.join(LOCK_DIR, *key.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.lock", "w") as guard:
+            fcntl.flock(guard, fcntl.LOCK_EX)
+            if read_state(key)[1] != etag:
+                return None
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(body)
+            os.replace(f"{path}.tmp", path)
+        return hashlib.md5(body).hexdigest()
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+    try:
+        resp = put_conditional(
+            condition,
+            Bucket=LOCK_BUCKET,
+            Key=key,
+            Body=body,
+            ContentType="application/json",
+            ServerSideEncryption="AES256",
+        )
+        return resp["ETag"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("PreconditionFailed", "ConditionalRequestConflict"):
+            raise
+        return None
+
+
+def outranks(trigger, lock):
+    """True if trigger is for a higher threshold than the one holding the lock (e.g. 100% after 80%)."""
+    return (
+        trigger.get("threshold") is not None
+        and lock.get("threshold") is not None
+        and trigger["threshold"] > lock["threshold"]
+    )
+
+
+def acquire_lock(trigger):
+    """
+    Take the budget's debounce lock for DEBOUNCE_SECONDS. Returns (lock, etag),
+    or (lock, None) when an unexpired lock exists (or another invocation won the
+    race), in which case this trigger is a duplicate. A higher threshold than
+    the lock's takes the lock over instead of being dropped.
+    """
+    key = lock_key(trigger["budget"])
+    lock, etag = read_state(key)
+    now = datetime.now(timezone.utc)
+    if (
+        lock is not None
+        and not trigger["force"]
+        and datetime.fromisoformat(lock["until"]) > now
+        and not outranks(trigger, lock)
+    ):
+        return lock, None
+    claimed = {
+        "budget": trigger["budget"],
+        "threshold": trigger.get("threshold"),
+        "message_id": trigger["message_id"],
+        "until": (now + timedelta(seconds=DEBOUNCE_SECONDS)).isoformat(timespec="seconds"),
+        "triggers": (lock or {}).get("triggers", 0) + 1,
+    }
+    new_etag = write_state(key, claimed, etag)
+    if new_etag is None:
+        return read_state(key)[0], None
+    return claimed, new_etag
+
+
+def update_lock(trigger, lock, etag, **fields):
+    """Best-effort update of a held lock (e.g. to record the execution or expire it)."""
+    try:
+        if write_state(lock_key(trigger["budget"]), {**lock, **fields}, etag) is None:
+            logger.warning(f"Remediation lock for {trigger['budget']} changed before it could be updated")
+    except Exception as e:
+        logger.warning(f"Failed to update remediation lock for {trigger['budget']}: {e}")
+
+
+def active_execution():
+    """ID of a pending or running execution of the stop document, or None."""
+    resp = ssm.describe_automation_executions(
+        Filters=[
+            {"Key": "DocumentNamePrefix", "Values": [DOC_NAME]},
+            {"Key": "ExecutionStatus", "Values": ACTIVE_STATUSES},
+        ],
+        MaxResults=1,
+    )
+    executions = resp.get("AutomationExecutionMetadataList", [])
+    return executions[0]["AutomationExecutionId"] if executions else None
+
+
+def ec2_client(region):
+    """EC2 client per region; create them before fanning out (client creation is not thread-safe)."""
+    if region not in _ec2_clients:
+        _ec2_clients[region] = boto3.client("ec2", region_name=region, config=EC2_RETRIES)
+    return _ec2_clients[region]
+
+
+def inventory_key(region, resource_type="ec2-instance"):
+    return f"{INVENTORY_PREFIX}{resource_type}/{region}.json"
+
+
+def resolve_regions():
+    """REMEDIATION_REGIONS, or every region enabled for the account."""
+    if REGIONS != "all":
+        return [r.strip() for r in REGIONS.split(",") if r.strip()]
+    resp = boto3.client("ec2", config=EC2_RETRIES).describe_regions(
+        Filters=[{"Name": "opt-in-status", "Values": ["opt-in-not-required", "opted-in"]}]
+    )
+    return sorted(r["RegionName"] for r in resp["Regions"])
+
+
+def update_inventory(region, apply, **fields):
+    """
+    Read-modify-write one region's inventory with conditional writes, retrying
+    when a concurrent event got there first. apply(instances) edits the
+    {instance_id: state} dict in place; fields are set on the inventory.
+    """
+    key = inventory_key(region)
+    for attempt in range(1, INVENTORY_MAX_ATTEMPTS + 1):
+        inventory, etag = read_state(key)
+        inventory = inventory or {"region": region, "resource_type": "ec2:instance", "instances": {}}
+        apply(inventory["instances"])
+        inventory.update(fields)
+        inventory["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        if write_state(key, inventory, etag):
+            return inventory
+        logger.info(f"Inventory for {region} changed concurrently (attempt {attempt}), re-reading")
+    raise RuntimeError(f"Could not update the {region} inventory after {INVENTORY_MAX_ATTEMPTS} attempts")
+
+
+def scan_region(region):
+    """{instance_id: state} for every non-terminated instance carrying the AutoStop tag."""
+    instances = {}
+    pages = ec2_client(region).get_paginator("describe_instances").paginate(
+        Filters=[
+            {"Name": f"tag:{TAG_KEY}", "Values": [TAG_VALUE]},
+            {"Name": "instance-state-name", "Values": ["pending", "running", "stopping", "stopped"]},
+        ],
+        PaginationConfig={"PageSize": 1000},
+    )
+    for page in pages:
+        for r in page.get("Reservations", []):
+            for i in r.get("Instances", []):
+                instances[i["InstanceId"]] = i["State"]["Name"]
+    return instances
+
+
+def instance_states(region, instance_ids):
+    """{instance_id: state} for the given instances; IDs that no longer exist are left out."""
+    states = {}
+    pages = ec2_client(region).get_paginator("describe_instances").paginate(
+        Filters=[{"Name": "instance-id", "Values": instance_ids}]
+    )
+    for page in pages:
+        for r in page.get("Reservations", []):
+            for i in r.get("Instances", []):
+                states[i["InstanceId"]] = i["State"]["Name"]
+    return states
 
-        # SNS message body varies; we don't rely on exact schema.
-        # Any SNS publish triggers the automation safely (tag-scoped).
-        logger.info(f"Starting SSM Automation: {DOC_NAME}")
 
+def refresh_inventory():
+    """Full reconcile of every region's inventory (scheduled safety net for missed events)."""
+    regions = resolve_regions()
+    for region in regions:
+        ec2_client(region)
+    refreshed_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    def refresh(region):
+        found = scan_region(region)
+
+        def replace(instances):
+            instances.clear()
+            instances.update(found)
+
+        update_inventory(region, replace, refreshed_at=refreshed_at)
+        return len(found)
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        counts = dict(zip(regions, pool.map(refresh, regions)))
+    logger.info(f"Refreshed AutoStop inventory: {sum(counts.values())} instance(s) in {len(regions)} region(s)")
+    return {"ok": True, "inventory": "refreshed", "regions": {r: n for r, n in counts.items() if n}}
+
+
+def apply_inventory_event(event):
+    """
+    Fold one EventBridge event into the inventory: "Tag Change on Resource"
+    adds an instance (in its current state, read from EC2) or drops it as its
+    AutoStop tag changes, and "EC2 Instance State-change Notification" tracks
+    listed instances starting and terminating. Stops are recorded by
+    stop_from_inventory itself; other stops show up at the next refresh.
+    """
+    region = event.get("region", "")
+    detail = event.get("detail", {})
+    if event.get("detail-type") == "Tag Change on Resource":
+        if detail.get("service") != "ec2" or detail.get("resource-type") != "instance":
+            return {"ok": True, "skipped": "not_an_instance"}
+        instance_ids = [arn.rsplit("/", 1)[-1] for arn in event.get("resources", [])]
+        tagged = detail.get("tags", {}).get(TAG_KEY) == TAG_VALUE
+        states = instance_states(region, instance_ids) if tagged else {}
+
+        def apply(instances):
+            for instance_id in instance_ids:
+                state = states.get(instance_id)
+                if state and state not in GONE_STATES:
+                    instances[instance_id] = state
+                else:
+                    instances.pop(instance_id, None)
+
+    elif event.get("detail-type") == "EC2 Instance State-change Notification":
+        instance_ids = [detail.get("instance-id")]
+        state = detail.get("state")
+        inventory, _ = read_state(inventory_key(region))
+        if instance_ids[0] not in (inventory or {}).get("instances", {}):
+            return {"ok": True, "skipped": "not_in_inventory"}
+
+        def apply(instances):
+            if state in GONE_STATES:
+                instances.pop(instance_ids[0], None)
+            elif instance_ids[0] in instances:
+                instances[instance_ids[0]] = state
+
+    else:
+        return {"ok": True, "skipped": "unknown_event"}
+
+    inventory = update_inventory(region, apply)
+    logger.info(f"Inventory {region}: {event['detail-type']} for {', '.join(instance_ids)}, {len(inventory['instances'])} tracked")
+    return {"ok": True, "inventory": "updated", "region": region, "tracked": len(inventory["instances"])}
+
+
+def stop_batch(ec2, ids):
+    """
+    Stop one batch; returns (stopped IDs, {ID: error}). A rejected batch is split
+    in half until the bad IDs (e.g. terminated since the inventory was updated)
+    are isolated.
+    """
+    try:
+        resp = ec2.stop_instances(InstanceIds=ids)
+        return [i["InstanceId"] for i in resp.get("StoppingInstances", [])], {}
+    except ClientError as e:
+        if len(ids) == 1:
+            return [], {ids[0]: e.response.get("Error", {}).get("Code", str(e))}
+        mid = len(ids) // 2
+        left, left_failed = stop_batch(ec2, ids[:mid])
+        right, right_failed = stop_batch(ec2, ids[mid:])
+        return left + right, {**left_failed, **right_failed}
+
+
+def mark_stopping(region, instance_ids):
+    """Record instances stop_from_inventory stopped (best-effort; the refresh reconciles a miss)."""
+
+    def apply(instances):
+        for instance_id in instance_ids:
+            if instance_id in instances:
+                instances[instance_id] = "stopping"
+
+    try:
+        update_inventory(region, apply)
+    except Exception as e:
+        logger.warning(f"Could not record {len(instance_ids)} stopped instance(s) in the {region} inventory: {e}")
+
+
+def stop_from_inventory():
+    """
+    Stop every running instance in the inventory straight away, no EC2 scan.
+    Returns {region: {"stopped", "failed"}}; the automation started afterwards
+    verifies the result and catches anything the inventory missed. StopInstances
+    is still conditioned on the AutoStop tag in IAM, so a stale entry cannot
+    stop an untagged instance. Stopped instances are marked "stopping" in the
+    inventory, since stop events are not delivered to the Lambda.
+    """
+    regions = resolve_regions()
+    targets = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        for region, (inventory, _) in zip(regions, pool.map(lambda r: read_state(inventory_key(r)), regions)):
+            ids = [i for i, state in ((inventory or {}).get("instances") or {}).items() if state in STOPPABLE_STATES]
+            if ids:
+                targets[region] = ids
+        if not targets:
+            return {}
+        for region in targets:
+            ec2_client(region)
+
+        batch_size = max(1, int(STOP_BATCH_SIZE))
+        batches = [(r, ids[i:i + batch_size]) for r, ids in targets.items() for i in range(0, len(ids), batch_size)]
+        summary = {region: {"stopped": 0, "failed": 0} for region in targets}
+        stopped = {region: [] for region in targets}
+        for region, (ok, bad) in zip([r for r, _ in batches], pool.map(lambda b: stop_batch(ec2_client(b[0]), b[1]), batches)):
+            summary[region]["stopped"] += len(ok)
+            summary[region]["failed"] += len(bad)
+            stopped[region].extend(ok)
+            if bad:
+                logger.warning(f"{region}: could not stop {bad}")
+        list(pool.map(lambda item: mark_stopping(*item), [(r, ids) for r, ids in stopped.items() if ids]))
+    logger.info(f"Stopped {sum(s['stopped'] for s in summary.values())} instance(s) from the inventory: {json.dumps(summary)}")
+    return summary
+
+
+def remediate(trigger):
+    """Start the stop automation for one trigger unless it is out of scope, debounced or already running."""
+    scope = f"budget {trigger['budget']}, threshold {trigger.get('threshold')}"
+    reason = out_of_scope(trigger)
+    if reason:
+        logger.info(f"Not remediating ({reason}): {scope}")
+        return {"ok": True, "skipped": reason, "budget": trigger["budget"], "threshold": trigger.get("threshold")}
+
+    lock, etag = acquire_lock(trigger)
+    if etag is None:
+        logger.info(f"Debounced {scope}: already triggered by {lock.get('message_id')} until {lock.get('until')}")
+        return {
+            "ok": True,
+            "skipped": "debounced",
+            "budget": trigger["budget"],
+            "automation_execution_id": lock.get("execution_id"),
+        }
+
+    try:
+        running = active_execution()
+        if running:
+            logger.info(f"Automation {running} is already in progress, not starting another for {scope}")
+            update_lock(trigger, lock, etag, execution_id=running)
+            return {"ok": True, "skipped": "in_progress", "budget": trigger["budget"], "automation_execution_id": running}
+
+        stopped_from_inventory = None
+        if INVENTORY_ENABLED:
+            try:
+                stopped_from_inventory = stop_from_inventory()
+            except Exception as e:
+                logger.warning(f"Inventory stop failed, leaving it to the automation: {e}")
+
+        logger.info(f"Starting SSM Automation: {DOC_NAME} (regions: {REGIONS}) for {scope}")
         response = ssm.start_automation_execution(
             DocumentName=DOC_NAME,
             Parameters={
                 "AutomationAssumeRole": [ASSUME_ROLE_ARN],
-                "TagKey": ["AutoStop"],
-                "TagValue": ["true"],
+                "TagKey": [TAG_KEY],
+                "TagValue": [TAG_VALUE],
+                "Regions": [REGIONS],
+                "BatchSize": [STOP_BATCH_SIZE],
             },
+            Tags=[
+                {"Key": "Budget", "Value": trigger["budget"][:256]},
+                {"Key": "Threshold", "Value": "manual" if trigger["manual"] else str(trigger.get("threshold"))},
+                {"Key": "Trigger", "Value": trigger["message_id"][:256] or "unknown"},
+            ],
         )
+    except Exception:
+        # Let the next trigger (or SNS retry) try again straight away
+        update_lock(trigger, lock, etag, until=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+        raise
 
-        execution_id = response["AutomationExecutionId"]
-        logger.info(f"Started automation execution: {execution_id}")
+    execution_id = response["AutomationExecutionId"]
+    logger.info(f"Started automation execution: {execution_id}")
+    update_lock(trigger, lock, etag, execution_id=execution_id)
+    return {
+        "ok": True,
+        "automation_execution_id": execution_id,
+        "document_name": DOC_NAME,
+        "regions": REGIONS,
+        "budget": trigger["budget"],
+        "threshold": trigger.get("threshold"),
+        "stopped_from_inventory": stopped_from_inventory,
+    }
 
-        return {
-            "ok": True,
-            "automation_execution_id": execution_id,
-            "document_name": DOC_NAME,
-        }
+
+def lambda_handler(event, context):
+    """
+    Remediation Lambda triggered by SNS when budget threshold is exceeded.
+    Starts SSM Automation to stop instances tagged AutoStop=true. The automation
+    searches the regions in parallel and stops instances in concurrent batches;
+    per-region counts are in its StoppedByRegion output.
+
+    Only notifications for REMEDIATION_BUDGETS at or above REMEDIATION_THRESHOLD
+    act. Repeat triggers for a budget (other thresholds, SNS redeliveries) within
+    DEBOUNCE_SECONDS are dropped via a conditional-write lock, and nothing new
+    starts while an execution is still running.
+
+    With the AutoStop inventory enabled, EventBridge tag/state events and the
+    scheduled {"inventory": "refresh"} maintain it, and a breach stops the
+    inventoried instances before the automation runs as a verifying sweep.
+    """
+    try:
+        logger.info(f"Received event: {json.dumps(event)}")
+        if event.get("source") in ("aws.tag", "aws.ec2"):
+            return apply_inventory_event(event)
+        if event.get("inventory") == "refresh":
+            return refresh_inventory()
+        triggers = triggers_from_event(event)
+        if not triggers:
+            return {"ok": True, "skipped": "not_a_budget_notification"}
+        results = [remediate(trigger) for trigger in triggers]
+        return results[0] if len(results) == 1 else {"ok": True, "results": results}
 
     except Exception as e:
         logger.error(f"Remediation Lambda failed: {e}", exc_info=True)
         raise
-
@@ -47,7 +47,8 @@ resource "aws_iam_role_policy" "reporter_lambda" {
           aws_ssm_parameter.archive_bucket.arn,
           aws_ssm_parameter.top_n_services.arn,
           aws_ssm_parameter.include_mtd.arn,
-          aws_ssm_parameter.include_drivers.arn
+          aws_ssm_parameter.include_drivers.arn,
+          aws_ssm_parameter.org_accounts.arn
         ]
       },
       # Write artifacts to S3
@@ -59,6 +60,18 @@ resource "aws_iam_role_policy" "reporter_lambda" {
         ]
         Resource = "${aws_s3_bucket.archive.arn}/*"
       },
+      # Read cached Cost Explorer results back from S3
+      {
+        Effect   = "Allow"
+        Action   = ["s3:GetObject"]
+        Resource = "${aws_s3_bucket.archive.arn}/*"
+      },
+      # ListBucket lets missing objects surface as 404 instead of 403
+      {
+        Effect   = "Allow"
+        Action   = ["s3:ListBucket"]
+        Resource = aws_s3_bucket.archive.arn
+      },
       # Send email via SES (scoped to verified identities)
       # For domain identity: allow sending from the domain and the specific email address
       {
@@ -72,9 +85,21 @@ resource "aws_iam_role_policy" "reporter_lambda" {
             aws_ses_domain_identity.from[0].arn,
             "arn:aws:ses:${var.aws_region}:${data.aws_caller_identity.current.account_id}:identity/${var.report_from}"
           ] : (length(aws_ses_email_identity.from) > 0 ? [aws_ses_email_identity.from[0].arn] : []),
-          var.ses_sandbox_mode ? [aws_ses_email_identity.to[0].arn] : ["*"]
+          var.ses_sandbox_mode ? concat([aws_ses_email_identity.to[0].arn], [for r in aws_ses_email_identity.additional_to : r.arn]) : ["*"]
         )
       },
+      # Hourly monitor hands burn-rate breaches to the remediation Lambda
+      {
+        Effect   = "Allow"
+        Action   = ["lambda:InvokeFunction"]
+        Resource = "arn:aws:lambda:${var.aws_region}:${data.aws_caller_identity.current.account_id}:function:${var.project_name}-remediation"
+      },
+      # SES send quota (paces batched delivery to the account's send rate)
+      {
+        Effect   = "Allow"
+        Action   = ["ses:GetSendQuota"]
+        Resource = "*"
+      },
       # Cost Explorer API (must be in us-east-1)
       {
         Effect = "Allow"
@@ -92,7 +117,8 @@ resource "aws_iam_role_policy" "reporter_lambda" {
           "budgets:DescribeBudget",
           "budgets:ViewBudget"
         ]
-        Resource = "arn:aws:budgets::${data.aws_caller_identity.current.account_id}:budget/${var.project_name}-monthly"
+        # Organization mode may read any budget named in org_accounts
+        Resource = var.organization_mode ? "arn:aws:budgets::${data.aws_caller_identity.current.account_id}:budget/*" : "arn:aws:budgets::${data.aws_caller_identity.current.account_id}:budget/${var.project_name}-monthly"
       },
       # STS (for getting account ID)
       {
@@ -149,7 +175,7 @@ resource "aws_iam_role_policy" "scheduler_invoke_lambda" {
       {
         Effect   = "Allow"
         Action   = ["lambda:InvokeFunction"]
-        Resource = aws_lambda_function.reporter.arn
+        Resource = concat([aws_lambda_function.reporter.arn], local.inventory_enabled ? [aws_lambda_function.remediation[0].arn] : [])
       }
     ]
   })
@@ -188,7 +214,7 @@ resource "aws_iam_role_policy" "automation_assume_role" {
     Statement = [
       {
         Effect   = "Allow"
-        Action   = ["ec2:DescribeInstances"]
+        Action   = ["ec2:DescribeInstances", "ec2:DescribeRegions"]
         Resource = "*"
       },
       # Stop only instances with AutoStop=true tag
@@ -249,6 +275,51 @@ resource "aws_iam_role_policy" "remediation_lambda" {
         Effect   = "Allow"
         Action   = ["ssm:StartAutomationExecution"]
         Resource = aws_ssm_document.stop_autostop_instances[0].arn
+      },
+      # Tag executions with the budget and threshold that fired
+      {
+        Effect   = "Allow"
+        Action   = ["ssm:AddTagsToResource"]
+        Resource = "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:automation-execution/*"
+      },
+      # Skip triggers while an execution is still running
+      {
+        Effect   = "Allow"
+        Action   = ["ssm:DescribeAutomationExecutions"]
+        Resource = "*"
+      },
+      # Debounce lock (conditional writes in the archive bucket)
+      {
+        Effect   = "Allow"
+        Action   = ["s3:GetObject", "s3:PutObject"]
+        Resource = "${aws_s3_bucket.archive.arn}/state/remediation/*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:ListBucket"]
+        Resource = aws_s3_bucket.archive.arn
+      },
+      # AutoStop inventory: maintained from events, read at breach time
+      {
+        Effect   = "Allow"
+        Action   = ["s3:GetObject", "s3:PutObject"]
+        Resource = "${aws_s3_bucket.archive.arn}/state/inventory/*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["ec2:DescribeInstances", "ec2:DescribeRegions"]
+        Resource = "*"
+      },
+      # Stop straight from the inventory; the tag condition guards against stale entries
+      {
+        Effect   = "Allow"
+        Action   = ["ec2:StopInstances"]
+        Resource = "*"
+        Condition = {
+          StringEquals = {
+            "ec2:ResourceTag/AutoStop" = "true"
+          }
+        }
       }
     ]
   })
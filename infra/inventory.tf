@@ -0,0 +1,120 @@
+# AutoStop inventory for remediation (only if remediation and the inventory are enabled)
+# Tag and state-change events keep state/inventory/ in the archive bucket current;
+# a scheduled refresh reconciles it and covers regions whose events stay local.
+locals {
+  inventory_enabled = var.enable_remediation && var.autostop_inventory
+}
+
+# Instances gaining or losing the AutoStop tag
+resource "aws_cloudwatch_event_rule" "autostop_tag_change" {
+  count = local.inventory_enabled ? 1 : 0
+
+  name        = "${var.project_name}-autostop-tag-change"
+  description = "AutoStop tag added to or removed from an EC2 instance"
+
+  event_pattern = jsonencode({
+    source      = ["aws.tag"]
+    detail-type = ["Tag Change on Resource"]
+    detail = {
+      service          = ["ec2"]
+      resource-type    = ["instance"]
+      changed-tag-keys = ["AutoStop"]
+    }
+  })
+
+  tags = local.common_tags
+}
+
+# Instances starting or terminating. Stops are left out: the remediation records its
+# own, and otherwise a breach would invoke the Lambda once per instance it stopped.
+resource "aws_cloudwatch_event_rule" "instance_state_change" {
+  count = local.inventory_enabled ? 1 : 0
+
+  name        = "${var.project_name}-instance-state-change"
+  description = "EC2 instances starting or terminating, applied to instances in the AutoStop inventory"
+
+  event_pattern = jsonencode({
+    source      = ["aws.ec2"]
+    detail-type = ["EC2 Instance State-change Notification"]
+    detail = {
+      state = ["running", "terminated"]
+    }
+  })
+
+  tags = local.common_tags
+}
+
+resource "aws_cloudwatch_event_target" "autostop_tag_change" {
+  count = local.inventory_enabled ? 1 : 0
+
+  rule = aws_cloudwatch_event_rule.autostop_tag_change[0].name
+  arn  = aws_lambda_function.remediation[0].arn
+}
+
+resource "aws_cloudwatch_event_target" "instance_state_change" {
+  count = local.inventory_enabled ? 1 : 0
+
+  rule = aws_cloudwatch_event_rule.instance_state_change[0].name
+  arn  = aws_lambda_function.remediation[0].arn
+}
+
+resource "aws_lambda_permission" "allow_events_tag_change" {
+  count = local.inventory_enabled ? 1 : 0
+
+  statement_id  = "AllowEventBridgeTagChange"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.remediation[0].function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.autostop_tag_change[0].arn
+}
+
+resource "aws_lambda_permission" "allow_events_state_change" {
+  count = local.inventory_enabled ? 1 : 0
+
+  statement_id  = "AllowEventBridgeStateChange"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.remediation[0].function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.instance_state_change[0].arn
+}
+
+# Periodic full refresh of every region's inventory
+resource "aws_scheduler_schedule" "inventory_refresh" {
+  count = local.inventory_enabled ? 1 : 0
+
+  name       = "${var.project_name}-inventory-refresh"
+  group_name = "default"
+
+  schedule_expression = var.inventory_refresh_schedule
+
+  flexible_time_window {
+    mode                      = "FLEXIBLE"
+    maximum_window_in_minutes = 15
+  }
+
+  target {
+    arn      = aws_lambda_function.remediation[0].arn
+    role_arn = aws_iam_role.scheduler_invoke_lambda.arn
+    input    = jsonencode({ inventory = "refresh" })
+
+    retry_policy {
+      maximum_retry_attempts = var.scheduler_retry_attempts
+    }
+
+    dead_letter_config {
+      arn = aws_sqs_queue.scheduler_dlq.arn
+    }
+  }
+
+  state = "ENABLED"
+}
+
+resource "aws_lambda_permission" "allow_scheduler_inventory" {
+  count = local.inventory_enabled ? 1 : 0
+
+  statement_id  = "AllowEventBridgeSchedulerInventory"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.remediation[0].function_name
+  principal     = "scheduler.amazonaws.com"
+  source_arn    = aws_scheduler_schedule.inventory_refresh[0].arn
+}
@@ -29,17 +29,33 @@ resource "aws_lambda_function" "reporter" {
 
   environment {
     variables = {
-      SES_REGION            = var.aws_region # SES region (AWS_REGION is reserved, set automatically by Lambda)
-      SCHEDULE_TZ           = var.schedule_timezone
-      PARAM_REPORT_TO       = local.param_report_to
-      PARAM_REPORT_FROM     = local.param_report_from
-      PARAM_ARCHIVE_BUCKET  = local.param_archive_bucket
-      PARAM_TOP_N_SERVICES  = local.param_top_n_services
-      PARAM_INCLUDE_MTD     = local.param_include_mtd
-      PARAM_INCLUDE_DRIVERS = local.param_include_drivers
-      ENABLE_METRICS        = tostring(var.enable_custom_metrics)
-      METRICS_NAMESPACE     = var.project_name
-      BUDGET_NAME           = "${var.project_name}-monthly"  # For budget status in reports
+      SES_REGION             = var.aws_region # SES region (AWS_REGION is reserved, set automatically by Lambda)
+      SCHEDULE_TZ            = var.schedule_timezone
+      PARAM_REPORT_TO        = local.param_report_to
+      PARAM_REPORT_FROM      = local.param_report_from
+      PARAM_ARCHIVE_BUCKET   = local.param_archive_bucket
+      PARAM_TOP_N_SERVICES   = local.param_top_n_services
+      PARAM_INCLUDE_MTD      = local.param_include_mtd
+      PARAM_INCLUDE_DRIVERS  = local.param_include_drivers
+      PARAM_ORG_ACCOUNTS     = local.param_org_accounts
+      ENABLE_METRICS         = tostring(var.enable_custom_metrics)
+      METRICS_NAMESPACE      = var.project_name
+      METRICS_BACKEND        = var.metrics_backend
+      BUDGET_NAME            = "${var.project_name}-monthly"  # For budget status in reports
+      INCREMENTAL_MTD        = tostring(var.incremental_mtd)
+      ORG_MODE               = tostring(var.organization_mode)
+      ARCHIVE_FORMATS        = join(",", var.archive_formats)
+      ANOMALY_DETECTION      = tostring(var.anomaly_detection)
+      ANOMALY_LOOKBACK_DAYS  = tostring(var.anomaly_lookback_days)
+      LOCAL_FORECAST         = tostring(var.local_forecast)
+      FORECAST_CE_CROSSCHECK = tostring(var.forecast_ce_crosscheck)
+      RATE_LIMITS            = "ce=${var.ce_requests_per_second},budgets=5"
+      COST_CUBE_DIMENSION    = var.cost_cube_dimension
+      IDEMPOTENT_RUNS        = tostring(var.idempotent_runs)
+      EMAIL_ATTACH_CSV       = tostring(var.email_attach_csv)
+      BURN_RATE_THRESHOLD    = tostring(var.burn_rate_threshold)
+      BURN_RATE_MULTIPLIER   = tostring(var.burn_rate_multiplier)
+      REMEDIATION_FUNCTION   = var.burn_rate_remediation && var.enable_remediation ? "${var.project_name}-remediation" : ""
     }
   }
 
@@ -88,6 +104,13 @@ resource "aws_lambda_function" "remediation" {
     variables = {
       AUTOMATION_DOC_NAME        = aws_ssm_document.stop_autostop_instances[0].name
       AUTOMATION_ASSUME_ROLE_ARN = aws_iam_role.automation_assume_role[0].arn
+      REMEDIATION_REGIONS        = join(",", var.remediation_regions)
+      STOP_BATCH_SIZE            = tostring(var.remediation_batch_size)
+      REMEDIATION_BUDGETS        = aws_budgets_budget.monthly_cost.name
+      REMEDIATION_THRESHOLD      = tostring(coalesce(var.remediation_threshold, var.budget_threshold_100))
+      DEBOUNCE_SECONDS           = tostring(var.remediation_debounce_minutes * 60)
+      LOCK_BUCKET                = aws_s3_bucket.archive.id
+      INVENTORY_ENABLED          = tostring(var.autostop_inventory)
     }
   }
 
@@ -7,6 +7,7 @@ locals {
   param_top_n_services  = "${local.ssm_prefix}/top_n_services"
   param_include_mtd     = "${local.ssm_prefix}/include_mtd"
   param_include_drivers = "${local.ssm_prefix}/include_drivers"
+  param_org_accounts    = "${local.ssm_prefix}/org_accounts"
 
   # OpsCenter severity/category for CloudWatch alarm action
   # Format: arn:aws:ssm:<region>:<account_id>:opsitem:<severity>#CATEGORY=<category>
@@ -32,6 +32,9 @@ resource "aws_s3_bucket_versioning" "archive" {
   }
 }
 
+# Each prefix gets its own rule: reports (and their month indexes) follow
+# archive_retention_days; state, cache and profiles are rewritten often and only
+# needed for a limited time, so their old versions go after a day.
 resource "aws_s3_bucket_lifecycle_configuration" "archive" {
   bucket = aws_s3_bucket.archive.id
 
@@ -39,6 +42,27 @@ resource "aws_s3_bucket_lifecycle_configuration" "archive" {
     id     = "expire-old-reports"
     status = "Enabled"
 
+    filter {
+      prefix = "reports/"
+    }
+
+    expiration {
+      days = var.archive_retention_days
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 30
+    }
+  }
+
+  rule {
+    id     = "expire-old-report-indexes"
+    status = "Enabled"
+
+    filter {
+      prefix = "index/"
+    }
+
     expiration {
       days = var.archive_retention_days
     }
@@ -47,6 +71,60 @@ resource "aws_s3_bucket_lifecycle_configuration" "archive" {
       noncurrent_days = 30
     }
   }
+
+  # Run markers, MTD accumulators, the monitor state, remediation locks and the
+  # inventory. Live objects are rewritten well within this; old run markers age out.
+  rule {
+    id     = "expire-old-state"
+    status = "Enabled"
+
+    filter {
+      prefix = "state/"
+    }
+
+    expiration {
+      days = 90
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+  }
+
+  # Cost Explorer result cache; no window reads further back than 90 days
+  rule {
+    id     = "expire-old-cache"
+    status = "Enabled"
+
+    filter {
+      prefix = "cache/"
+    }
+
+    expiration {
+      days = 120
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+  }
+
+  rule {
+    id     = "expire-old-profiles"
+    status = "Enabled"
+
+    filter {
+      prefix = "profiles/"
+    }
+
+    expiration {
+      days = 30
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+  }
 }
 
 resource "aws_s3_bucket_policy" "archive" {
@@ -63,6 +63,46 @@ resource "aws_lambda_permission" "allow_scheduler" {
   source_arn    = aws_scheduler_schedule.daily_7am.arn
 }
 
+# Hourly burn-rate monitor (only if hourly_monitor is enabled)
+resource "aws_scheduler_schedule" "hourly_monitor" {
+  count = var.hourly_monitor ? 1 : 0
+
+  name       = "${var.project_name}-hourly-monitor"
+  group_name = "default"
+
+  schedule_expression = "cron(5 * * * ? *)"
+
+  flexible_time_window {
+    mode = "OFF"
+  }
+
+  target {
+    arn      = aws_lambda_function.reporter.arn
+    role_arn = aws_iam_role.scheduler_invoke_lambda.arn
+    input    = jsonencode({ monitor = "hourly" })
+
+    retry_policy {
+      maximum_retry_attempts = var.scheduler_retry_attempts
+    }
+
+    dead_letter_config {
+      arn = aws_sqs_queue.scheduler_dlq.arn
+    }
+  }
+
+  state = "ENABLED"
+}
+
+resource "aws_lambda_permission" "allow_scheduler_monitor" {
+  count = var.hourly_monitor ? 1 : 0
+
+  statement_id  = "AllowEventBridgeSchedulerMonitor"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.reporter.function_name
+  principal     = "scheduler.amazonaws.com"
+  source_arn    = aws_scheduler_schedule.hourly_monitor[0].arn
+}
+
 # CloudWatch alarm for DLQ messages (indicates scheduler failures)
 resource "aws_cloudwatch_metric_alarm" "scheduler_dlq" {
   alarm_name          = "${var.project_name}-scheduler-dlq-messages"
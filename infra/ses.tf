@@ -28,6 +28,11 @@ resource "aws_ses_email_identity" "to" {
   email = var.report_to
 }
 
+resource "aws_ses_email_identity" "additional_to" {
+  for_each = var.ses_sandbox_mode ? toset(var.additional_recipients) : toset([])
+  email    = each.value
+}
+
 # Note: After terraform apply, you need to add DNS records to verify the domain.
 # Run: terraform output -json dns_records
 # Then add the TXT and CNAME records to your domain's DNS.
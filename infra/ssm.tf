@@ -1,7 +1,7 @@
 resource "aws_ssm_parameter" "report_to" {
   name  = local.param_report_to
   type  = "String"
-  value = var.report_to
+  value = join(",", concat([var.report_to], var.additional_recipients))
 
   tags = local.common_tags
 }
@@ -46,3 +46,11 @@ resource "aws_ssm_parameter" "include_drivers" {
   tags = local.common_tags
 }
 
+
+resource "aws_ssm_parameter" "org_accounts" {
+  name  = local.param_org_accounts
+  type  = "String"
+  value = jsonencode(var.org_accounts)
+
+  tags = local.common_tags
+}
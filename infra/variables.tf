@@ -33,6 +33,12 @@ variable "report_to" {
   description = "Email address to receive cost reports"
 }
 
+variable "additional_recipients" {
+  type        = list(string)
+  default     = []
+  description = "Extra addresses that receive the daily report alongside report_to (one message, sent in batches)"
+}
+
 variable "report_from" {
   type        = string
   description = "Email address to send reports from (must be verified in SES)"
@@ -56,16 +62,142 @@ variable "include_mtd" {
   description = "Include month-to-date cost breakdown in report"
 }
 
+variable "incremental_mtd" {
+  type        = bool
+  default     = false
+  description = "Maintain month-to-date totals as a running accumulator in S3 instead of re-querying the whole month daily. Only used on days when anomaly_detection and local_forecast do not already fetch back to month start, so it saves queries only with local_forecast off and a short anomaly_lookback_days"
+}
+
 variable "include_drivers" {
   type        = bool
   default     = true
   description = "Include usage type drivers in report"
 }
 
+variable "anomaly_detection" {
+  type        = bool
+  default     = true
+  description = "Flag services whose daily cost is far outside their own recent range (Anomalies section in the report)"
+}
+
+variable "anomaly_lookback_days" {
+  type        = number
+  default     = 30
+  description = "Days of per-service history used as the anomaly baseline (7-90)"
+
+  validation {
+    condition     = var.anomaly_lookback_days >= 7 && var.anomaly_lookback_days <= 90
+    error_message = "anomaly_lookback_days must be between 7 and 90."
+  }
+}
+
+variable "local_forecast" {
+  type        = bool
+  default     = true
+  description = "Forecast month-end spend locally (weekday seasonality + trend) instead of calling the Cost Explorer forecast API"
+}
+
+variable "forecast_ce_crosscheck" {
+  type        = bool
+  default     = false
+  description = "Also call the Cost Explorer forecast API and show it next to the local forecast"
+}
+
+variable "idempotent_runs" {
+  type        = bool
+  default     = true
+  description = "Track each report day in a run marker so retries skip a sent report or resume at the email step"
+}
+
+variable "email_attach_csv" {
+  type        = bool
+  default     = false
+  description = "Attach the day's CSV views to the report email"
+}
+
+variable "hourly_monitor" {
+  type        = bool
+  default     = false
+  description = "Run an hourly burn-rate check on HOURLY Cost Explorer data (needs hourly granularity enabled in Cost Explorer; about 850 Cost Explorer requests, roughly $8.50, a month)"
+}
+
+variable "burn_rate_threshold" {
+  type        = number
+  default     = 0
+  description = "Hourly monitor alerts above this many USD per hour (0 = off)"
+}
+
+variable "burn_rate_multiplier" {
+  type        = number
+  default     = 3
+  description = "Hourly monitor alerts when the burn rate exceeds this multiple of the rolling baseline (0 = off)"
+
+  validation {
+    condition     = var.burn_rate_multiplier == 0 || var.burn_rate_multiplier > 1
+    error_message = "burn_rate_multiplier must be 0 (off) or greater than 1."
+  }
+}
+
+variable "burn_rate_remediation" {
+  type        = bool
+  default     = false
+  description = "Also trigger remediation on a burn-rate alert (requires enable_remediation)"
+}
+
+variable "ce_requests_per_second" {
+  type        = number
+  default     = 5
+  description = "Client-side Cost Explorer request rate; halved on each throttle and recovered gradually"
+
+  validation {
+    condition     = var.ce_requests_per_second > 0 && var.ce_requests_per_second <= 50
+    error_message = "ce_requests_per_second must be greater than 0 and at most 50."
+  }
+}
+
+variable "cost_cube_dimension" {
+  type        = string
+  default     = "REGION"
+  description = "Second Cost Explorer GroupBy key fetched with SERVICE; its breakdown then needs no separate query (\"\" = SERVICE only)"
+
+  validation {
+    condition     = contains(["", "REGION", "USAGE_TYPE"], var.cost_cube_dimension)
+    error_message = "cost_cube_dimension must be \"REGION\", \"USAGE_TYPE\" or \"\"."
+  }
+}
+
+variable "organization_mode" {
+  type        = bool
+  default     = false
+  description = "Send one report per linked account (from org_accounts) instead of a single payer report"
+}
+
+variable "org_accounts" {
+  type = map(object({
+    report_to      = list(string)
+    name           = optional(string)
+    monthly_budget = optional(number)
+    budget_name    = optional(string)
+  }))
+  default     = {}
+  description = "Per-linked-account report settings for organization_mode, keyed by account ID"
+}
+
 variable "archive_retention_days" {
   type        = number
   default     = 365
-  description = "Number of days to retain archived reports in S3"
+  description = "Number of days to retain archived reports (reports/ and index/) in S3; state, cache and profiles have their own fixed lifecycle rules"
+}
+
+variable "archive_formats" {
+  type        = list(string)
+  default     = ["json", "csv", "columnar"]
+  description = "Per-day archive formats: raw Cost Explorer json, csv rows and/or compressed columnar files with a manifest"
+
+  validation {
+    condition     = length(var.archive_formats) > 0 && alltrue([for f in var.archive_formats : contains(["json", "csv", "columnar"], f)])
+    error_message = "archive_formats may only contain \"json\", \"csv\" and \"columnar\"."
+  }
 }
 
 variable "budget_limit_amount" {
@@ -116,6 +248,17 @@ variable "enable_custom_metrics" {
   description = "Enable custom CloudWatch metrics for monitoring"
 }
 
+variable "metrics_backend" {
+  type        = string
+  default     = "emf"
+  description = "How custom metrics are published: emf (Embedded Metric Format log lines, no API calls) or api (batched PutMetricData)"
+
+  validation {
+    condition     = contains(["emf", "api"], var.metrics_backend)
+    error_message = "metrics_backend must be \"emf\" or \"api\"."
+  }
+}
+
 variable "enable_opsitem_alarms" {
   type        = bool
   default     = false
@@ -128,3 +271,49 @@ variable "enable_remediation" {
   description = "Enable automated EC2 instance remediation (requires SSM Automation document)"
 }
 
+variable "remediation_regions" {
+  type        = list(string)
+  default     = []
+  description = "Regions to stop AutoStop instances in (empty = every region enabled for the account)"
+}
+
+variable "remediation_threshold" {
+  type        = number
+  default     = null
+  description = "Lowest budget alert threshold (%) that stops instances (default: budget_threshold_100)"
+}
+
+variable "remediation_debounce_minutes" {
+  type        = number
+  default     = 60
+  description = "Budget alerts within this many minutes of a remediation are treated as duplicates"
+
+  validation {
+    condition     = var.remediation_debounce_minutes >= 1
+    error_message = "remediation_debounce_minutes must be at least 1."
+  }
+}
+
+variable "autostop_inventory" {
+  type        = bool
+  default     = false
+  description = "Keep an inventory of AutoStop instances so remediation can stop them without scanning EC2 first (invokes the Lambda on every instance start/terminate in the region)"
+}
+
+variable "inventory_refresh_schedule" {
+  type        = string
+  default     = "rate(6 hours)"
+  description = "Schedule expression for the full AutoStop inventory refresh"
+}
+
+variable "remediation_batch_size" {
+  type        = number
+  default     = 100
+  description = "Instance IDs per StopInstances call during remediation"
+
+  validation {
+    condition     = var.remediation_batch_size >= 1 && var.remediation_batch_size <= 1000
+    error_message = "remediation_batch_size must be between 1 and 1000."
+  }
+}
+
@@ -1,13 +1,40 @@
+import time
+
+_INIT_STARTED = time.perf_counter()
+
 import os
 import csv
+import random
+import gzip
+import heapq
 import io
 import json
 import logging
-import re
-from datetime import datetime, timedelta, date
+import statistics
+import string
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone, date
+from email.message import EmailMessage
+from email.policy import SMTP
+from html import escape
 from zoneinfo import ZoneInfo
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    EndpointConnectionError,
+    ParamValidationError,
+    ReadTimeoutError,
+)
 
 # Configure logging
 logger = logging.getLogger()
@@ -18,13 +45,21 @@ TZ = ZoneInfo(os.environ.get("SCHEDULE_TZ", "America/Los_Angeles"))
 # Cost Explorer endpoint is us-east-1
 CE_REGION = "us-east-1"
 
-ssm = boto3.client("ssm")
-ce = boto3.client("ce", region_name=CE_REGION)
-s3 = boto3.client("s3")
-# SES uses the infrastructure region (AWS_REGION is automatically set by Lambda runtime)
-ses = boto3.client("ses", region_name=os.environ.get("SES_REGION", os.environ.get("AWS_REGION", "us-east-1")))
-cloudwatch = boto3.client("cloudwatch")
-budgets = boto3.client("budgets", region_name=CE_REGION)
+# Cost Explorer, Budgets and SES calls are retried by call_aws(), so botocore makes a single attempt
+NO_SDK_RETRIES = Config(retries={"mode": "standard", "max_attempts": 1})
+
+# Clients are created on first use (see client()); many runs never need some of them
+CLIENT_KWARGS = {
+    "ssm": {},
+    "ce": {"region_name": CE_REGION, "config": NO_SDK_RETRIES},
+    "s3": {},
+    # SES uses the infrastructure region (AWS_REGION is automatically set by Lambda runtime)
+    "ses": {"region_name": os.environ.get("SES_REGION", os.environ.get("AWS_REGION", "us-east-1")), "config": NO_SDK_RETRIES},
+    "cloudwatch": {},
+    "budgets": {"region_name": CE_REGION, "config": NO_SDK_RETRIES},
+    "sts": {},
+    "lambda": {},
+}
 
 PARAM_REPORT_TO = os.environ["PARAM_REPORT_TO"]
 PARAM_REPORT_FROM = os.environ["PARAM_REPORT_FROM"]
@@ -32,12 +67,180 @@ PARAM_ARCHIVE_BUCKET = os.environ["PARAM_ARCHIVE_BUCKET"]
 PARAM_TOP_N_SERVICES = os.environ["PARAM_TOP_N_SERVICES"]
 PARAM_INCLUDE_MTD = os.environ["PARAM_INCLUDE_MTD"]
 PARAM_INCLUDE_DRIVERS = os.environ["PARAM_INCLUDE_DRIVERS"]
+# JSON map of linked account ID -> {"report_to", "name", "monthly_budget" | "budget_name"}
+PARAM_ORG_ACCOUNTS = os.environ.get("PARAM_ORG_ACCOUNTS")
 
 ENABLE_METRICS = os.environ.get("ENABLE_METRICS", "true").lower() == "true"
 METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "cost-alerting")
+# "emf" writes Embedded Metric Format log lines (no API calls); "api" batches PutMetricData
+METRICS_BACKEND = os.environ.get("METRICS_BACKEND", "emf").lower()
+PUT_METRIC_DATA_MAX_DATUMS = 1000
+EMF_MAX_METRICS = 100
+# Opt-in cProfile dump of each run to profiles/ in the archive bucket (or pass {"profile": true})
+PROFILE_TO_S3 = os.environ.get("PROFILE_TO_S3", "false").lower() == "true"
+# Log INIT duration and client construction times to verify cold-start behaviour
+MEASURE_INIT = os.environ.get("MEASURE_INIT", "false").lower() == "true"
+# Build every client during INIT (the pre-lazy behaviour), for A/B comparison with MEASURE_INIT
+EAGER_CLIENTS = os.environ.get("EAGER_CLIENTS", "false").lower() == "true"
 BUDGET_NAME = os.environ.get("BUDGET_NAME", "cost-alerting-monthly")
+# Organization mode: one LINKED_ACCOUNT+SERVICE query split into per-account reports (or pass {"organization": true})
+ORG_MODE = os.environ.get("ORG_MODE", "false").lower() == "true"
+# Upper bound on concurrent AWS calls per phase (boto3 clients are thread-safe)
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "8"))
+# Artifacts larger than this spill from memory to /tmp while they are being written
+SPOOL_MAX_BYTES = 1024 * 1024
+# Archive formats written per report day: raw Cost Explorer "json", "csv" rows and/or "columnar"
+ARCHIVE_FORMATS = {f.strip() for f in os.environ.get("ARCHIVE_FORMATS", "json,csv,columnar").lower().split(",") if f.strip()}
+COLUMNAR_FORMAT = "cecol/1"
+COLUMNAR_MAGIC = b"CECOL1\n"
+
+# Client-side rate limits (requests/second) that call_aws() applies once a service throttles (see adapt_rate)
+RATE_LIMITS = {
+    name: float(rate)
+    for name, rate in (
+        item.split("=") for item in os.environ.get("RATE_LIMITS", "ce=5,budgets=5").split(",") if "=" in item
+    )
+}
+RATE_LIMIT_FLOOR = 0.5
+RATE_DECREASE_INTERVAL = 1.0  # throttles within this many seconds of a cut share it (concurrent callers)
+# Attempts per call, and retries each operation may spend per invocation before failing fast
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "6"))
+RETRY_BUDGETS = {"ce.get_cost_and_usage": 30, "ce.get_cost_forecast": 4, "budgets.describe_budget": 4}
+DEFAULT_RETRY_BUDGET = 8
+BACKOFF_BASE_SECONDS = 0.25
+BACKOFF_MAX_SECONDS = 8.0
+THROTTLE_CODES = {
+    "Throttling", "ThrottlingException", "TooManyRequestsException",
+    "RequestLimitExceeded", "LimitExceededException", "SlowDown",
+}
+TRANSIENT_CODES = {"InternalFailure", "InternalServerError", "ServiceUnavailable", "ServiceUnavailableException"}
+REGIONAL_UNAVAILABLE = "regional breakdown unavailable (Cost Explorer throttled or failed)"
+
+# Email delivery: one MIME message per report, sent to its recipients in batches (SES allows 50 per call)
+EMAIL_BATCH_SIZE = max(1, min(50, int(os.environ.get("EMAIL_BATCH_SIZE", "50"))))
+EMAIL_MAX_CONCURRENCY = int(os.environ.get("EMAIL_MAX_CONCURRENCY", "4"))
+EMAIL_ATTACH_CSV = os.environ.get("EMAIL_ATTACH_CSV", "false").lower() == "true"
+EMAIL_ATTACHMENT_MAX_BYTES = 5 * 1024 * 1024  # SES caps the encoded message at 10 MB
+SES_DEFAULT_SEND_RATE = 1.0  # the sandbox rate, used if GetSendQuota fails
+
+# Cost Explorer result cache: days closed longer than this are treated as final
+CACHE_CLOSED_AFTER = timedelta(hours=int(os.environ.get("CACHE_CLOSED_AFTER_HOURS", "48")))
+# Recent (still restating) days are only reused in-process for this many seconds
+CACHE_VOLATILE_TTL_SECONDS = int(os.environ.get("CACHE_VOLATILE_TTL_SECONDS", "900"))
+CACHE_MAX_ENTRIES = 2048
+CACHE_PREFIX = "cache/ce/"
+
+# Cost cube: the SERVICE window is grouped by this dimension too ("" = SERVICE only), and the
+# service totals, regional breakdown (REGION) or usage-type drivers (USAGE_TYPE) are its marginals
+COST_CUBE_DIMENSION = os.environ.get("COST_CUBE_DIMENSION", "REGION").upper()
+REGION_TOP_SERVICES = 3  # services listed per region in "Top Services per Region"
+
+# Incremental MTD: fold each newly closed day into a per-month accumulator in S3
+INCREMENTAL_MTD = os.environ.get("INCREMENTAL_MTD", "false").lower() == "true"
+# Rebuild the accumulator from a full month query this often to catch restatements older than the window
+MTD_RECONCILE_EVERY_DAYS = int(os.environ.get("MTD_RECONCILE_EVERY_DAYS", "7"))
+MTD_STATE_PREFIX = "state/mtd/"
+
+# Anomaly detection: per-service robust z-score of the report day against a trailing baseline
+ANOMALY_DETECTION = os.environ.get("ANOMALY_DETECTION", "true").lower() == "true"
+ANOMALY_LOOKBACK_DAYS = min(max(int(os.environ.get("ANOMALY_LOOKBACK_DAYS", "30")), 7), 90)
+ANOMALY_Z_THRESHOLD = float(os.environ.get("ANOMALY_Z_THRESHOLD", "3.5"))
+# Ignore changes smaller than this many dollars, however unusual
+ANOMALY_MIN_DELTA = float(os.environ.get("ANOMALY_MIN_DELTA", "1.0"))
+ANOMALY_MIN_HISTORY_DAYS = 7
+ANOMALY_MAX_ROWS = 10
+
+# Local month-end forecast: weekday seasonality + linear trend fitted to the daily window
+LOCAL_FORECAST = os.environ.get("LOCAL_FORECAST", "true").lower() == "true"
+FORECAST_HISTORY_DAYS = min(max(int(os.environ.get("FORECAST_HISTORY_DAYS", "28")), 14), 90)
+# Also call the Cost Explorer forecast API and log how far it is from the local forecast
+FORECAST_CE_CROSSCHECK = os.environ.get("FORECAST_CE_CROSSCHECK", "false").lower() == "true"
+FORECAST_INTERVAL_Z = 1.2816  # 80% prediction interval, as in Cost Explorer's default
+
+# Per-month index of archived report days (keys, totals, top services), updated with conditional writes
+REPORT_INDEX_PREFIX = "index/reports/"
+REPORT_INDEX_FORMAT = "report-index/1"
+REPORT_INDEX_MAX_ATTEMPTS = 5
+REPORT_INDEX_TOP_SERVICES = 5
+
+# Per-day run markers: retries and re-invocations skip a sent report or resume at the email phase
+IDEMPOTENT_RUNS = os.environ.get("IDEMPOTENT_RUNS", "true").lower() == "true"
+RUN_STATE_PREFIX = "state/runs/"
+RUN_LEASE_SECONDS = 900  # without a Lambda context; otherwise the invocation's remaining time
+# Longest backfill range per invocation, so one run stays well inside the Lambda timeout
+BACKFILL_MAX_DAYS = int(os.environ.get("BACKFILL_MAX_DAYS", "31"))
+_conditional_writes = True  # cleared if the bundled botocore predates S3 conditional writes
+
+# Hourly monitor ({"monitor": "hourly"}): HOURLY Cost Explorer data folded into state/monitor/,
+# alerting on burn rate without building the daily report
+MONITOR_STATE_KEY = "state/monitor/hourly.json"
+MONITOR_SEED_HOURS = 48  # first run (or stale state): hours fetched to seed the baseline
+MONITOR_MAX_AGE = timedelta(days=13)  # Cost Explorer keeps HOURLY data for 14 days
+MONITOR_LATE_HOURS = int(os.environ.get("MONITOR_LATE_HOURS", "3"))  # hours before the last run re-read each run
+MONITOR_SETTLE_HOURS = int(os.environ.get("MONITOR_SETTLE_HOURS", "24"))  # age at which an hour is final (CE fills in late)
+MONITOR_SETTLE_BATCH_HOURS = 6  # settled hours are re-read once, this many at a time, before entering the baseline
+MONITOR_BURN_WINDOW_HOURS = 3  # latest hours with data averaged into the burn rate
+MONITOR_BASELINE_SPAN_HOURS = 168  # EWMA span of the settled hourly totals
+MONITOR_BASELINE_MIN_HOURS = 24
+BURN_RATE_THRESHOLD = float(os.environ.get("BURN_RATE_THRESHOLD", "0"))  # USD/hour; 0 = off
+BURN_RATE_MULTIPLIER = float(os.environ.get("BURN_RATE_MULTIPLIER", "3"))  # x baseline; 0 = off
+BURN_ALERT_COOLDOWN_HOURS = int(os.environ.get("BURN_ALERT_COOLDOWN_HOURS", "6"))
+REMEDIATION_FUNCTION = os.environ.get("REMEDIATION_FUNCTION", "")  # invoked on a burn-rate alert when set
 
 _cache = {}
+_session = None
+_clients = {}
+_clients_lock = threading.Lock()
+_account_id = None
+_init_seconds = None
+_cold_start = True
+_result_cache = OrderedDict()  # (dimension, granularity, day) -> (expires_at or None, results)
+_result_cache_lock = threading.Lock()
+_metric_buffer = []
+_metric_buffer_lock = threading.Lock()
+_phase_stats = {}  # phase -> {"calls", "seconds", "max_seconds", "bytes"}
+_api_stats = {}  # "service.Operation" -> {"calls", "bytes"}
+_stats_lock = threading.Lock()
+_retry_stats = {}  # "service.operation" -> {"calls", "retries", "throttles", "gave_up"}
+_rate_state = {}  # throttled service -> {"rate", "tokens", "updated", "cut"}; persists in warm containers
+_rate_lock = threading.Lock()
+_ses_send_rate = None
+
+
+def client(name):
+    """
+    Return the named boto3 client, creating it on first use.
+    All clients share one boto3 session; creation is serialised because
+    sessions are not thread-safe, while the clients themselves are.
+    """
+    c = _clients.get(name)
+    if c is not None:
+        return c
+
+    global _session
+    with _clients_lock:
+        c = _clients.get(name)
+        if c is None:
+            with timed(f"client_init[{name}]"):
+                if _session is None:
+                    _session = boto3.session.Session()
+                c = _session.client(name, **CLIENT_KWARGS[name])
+                c.meta.events.register("after-call", record_api_call)
+            _clients[name] = c
+    return c
+
+
+def get_account_id(context=None):
+    """AWS account ID, cached across warm invocations (taken from the function ARN when possible)."""
+    global _account_id
+    if _account_id is None:
+        arn = getattr(context, "invoked_function_arn", None)
+        if arn and arn.count(":") >= 5:
+            _account_id = arn.split(":")[4]
+        else:
+            with timed("sts.get_caller_identity"):
+                _account_id = client("sts").get_caller_identity()["Account"]
+    return _account_id
 
 
 def get_params(names):
@@ -45,7 +248,8 @@ def get_params(names):
     missing = [n for n in names if n not in _cache]
     if missing:
         try:
-            resp = ssm.get_parameters(Names=missing, WithDecryption=True)
+            with timed("ssm.get_parameters"):
+                resp = client("ssm").get_parameters(Names=missing, WithDecryption=True)
             for p in resp.get("Parameters", []):
                 _cache[p["Name"]] = p["Value"]
         except Exception as e:
@@ -68,119 +272,882 @@ def money(amount_str: str) -> float:
 
 
 def put_metric(metric_name, value, unit="Count"):
-    """Put custom CloudWatch metric."""
+    """Buffer a custom CloudWatch metric; flush_metrics sends the batch at the end of the invocation."""
     if not ENABLE_METRICS:
         return
 
-    try:
-        cloudwatch.put_metric_data(
+    with _metric_buffer_lock:
+        _metric_buffer.append(
+            {
+                "MetricName": metric_name,
+                "Value": value,
+                "Unit": unit,
+                "Timestamp": datetime.now(timezone.utc),
+            }
+        )
+
+
+def put_metric_batches(datums):
+    """Send datums with PutMetricData, up to PUT_METRIC_DATA_MAX_DATUMS per call."""
+    for i in range(0, len(datums), PUT_METRIC_DATA_MAX_DATUMS):
+        client("cloudwatch").put_metric_data(
             Namespace=METRICS_NAMESPACE,
-            MetricData=[
-                {
-                    "MetricName": metric_name,
-                    "Value": value,
-                    "Unit": unit,
-                    "Timestamp": datetime.utcnow(),
-                }
-            ],
+            MetricData=datums[i:i + PUT_METRIC_DATA_MAX_DATUMS],
         )
+
+
+def emit_emf(datums):
+    """
+    Write datums as Embedded Metric Format lines to stdout (the function's log group).
+    CloudWatch extracts the metrics asynchronously; repeated names become value arrays.
+    """
+    by_name = {}
+    for d in datums:
+        entry = by_name.setdefault(d["MetricName"], {"Unit": d["Unit"], "Values": []})
+        entry["Values"].append(d["Value"])
+
+    names = list(by_name)
+    timestamp = int(datums[-1]["Timestamp"].timestamp() * 1000)
+    for i in range(0, len(names), EMF_MAX_METRICS):
+        chunk = names[i:i + EMF_MAX_METRICS]
+        doc = {
+            "_aws": {
+                "Timestamp": timestamp,
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": METRICS_NAMESPACE,
+                        "Dimensions": [[]],
+                        "Metrics": [{"Name": n, "Unit": by_name[n]["Unit"]} for n in chunk],
+                    }
+                ],
+            },
+        }
+        for n in chunk:
+            values = by_name[n]["Values"]
+            doc[n] = values[0] if len(values) == 1 else values
+        print(json.dumps(doc), flush=True)
+
+
+def flush_metrics():
+    """Send and clear every buffered metric through METRICS_BACKEND. Never raises."""
+    with _metric_buffer_lock:
+        datums = list(_metric_buffer)
+        _metric_buffer.clear()
+    if not datums:
+        return
+
+    try:
+        if METRICS_BACKEND == "api":
+            put_metric_batches(datums)
+        else:
+            emit_emf(datums)
     except Exception as e:
-        logger.warning(f"Failed to put metric {metric_name}: {e}")
+        logger.warning(f"Failed to flush {len(datums)} metric(s): {e}")
+
+
+def reset_instrumentation():
+    """Clear per-invocation phase and API statistics (warm containers reuse module state)."""
+    with _stats_lock:
+        _phase_stats.clear()
+        _api_stats.clear()
+        _retry_stats.clear()
+
+
+def record_phase(phase, seconds, nbytes=0):
+    """Accumulate one timed occurrence of a phase."""
+    with _stats_lock:
+        stat = _phase_stats.setdefault(phase, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0})
+        stat["calls"] += 1
+        stat["seconds"] += seconds
+        stat["max_seconds"] = max(stat["max_seconds"], seconds)
+        stat["bytes"] += nbytes
+
+
+@contextmanager
+def timed(phase, nbytes=0):
+    """Time the enclosed block as one occurrence of phase (recorded even if it raises)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - t0, nbytes)
+
+
+def record_api_call(http_response=None, model=None, **kwargs):
+    """botocore after-call hook: count every AWS API call and its response payload bytes."""
+    if model is None:
+        return
+    name = f"{model.service_model.service_name}.{model.name}"
+    try:
+        nbytes = len(http_response.content or b"")
+    except Exception:
+        nbytes = 0  # stubbed responses carry no raw body
+    with _stats_lock:
+        stat = _api_stats.setdefault(name, {"calls": 0, "bytes": 0})
+        stat["calls"] += 1
+        stat["bytes"] += nbytes
+
+
+def instrumentation_summary(cold_start=False):
+    """
+    Per-phase durations and per-operation API counts for the current invocation.
+    On a cold start, also reports the module INIT duration and the clients built during it.
+    """
+    with _stats_lock:
+        phases = {
+            name: {
+                "calls": st["calls"],
+                "ms": round(st["seconds"] * 1000, 1),
+                "max_ms": round(st["max_seconds"] * 1000, 1),
+                "bytes": st["bytes"],
+            }
+            for name, st in _phase_stats.items()
+        }
+        api = {name: dict(st) for name, st in _api_stats.items()}
+        retries = {name: dict(st) for name, st in _retry_stats.items() if st["retries"] or st["gave_up"]}
+    with _rate_lock:
+        rates = {name: round(st["rate"], 2) for name, st in _rate_state.items()}
+    summary = {
+        "phases": phases,
+        "api": api,
+        "api_calls": sum(st["calls"] for st in api.values()),
+        "retries": retries,
+        "rate_limits": rates,
+        "cold_start": cold_start,
+    }
+    if cold_start and _init_seconds is not None:
+        summary["init_ms"] = round(_init_seconds * 1000, 1)
+    return summary
+
+
+def acquire_token(service, weight=1):
+    """
+    Block until the service's token bucket allows a request costing weight
+    tokens; a no-op while the service has no bucket. A request heavier than
+    the bucket can hold waits for a full bucket and leaves it in debt.
+    """
+    while True:
+        with _rate_lock:
+            st = _rate_state.get(service)
+            if st is None:
+                return
+            now = time.monotonic()
+            capacity = max(1.0, st["rate"])
+            st["tokens"] = min(capacity, st["tokens"] + (now - st["updated"]) * st["rate"])
+            st["updated"] = now
+            needed = min(weight, capacity)
+            if st["tokens"] >= needed:
+                st["tokens"] -= weight
+                return
+            wait = (needed - st["tokens"]) / st["rate"]
+        time.sleep(wait)
+
+
+def set_rate_limit(service, rate):
+    """Pin a token bucket at rate for the service (e.g. the SES send quota); throttles still halve it."""
+    with _rate_lock:
+        RATE_LIMITS[service] = rate
+        st = _rate_state.get(service)
+        if st is None or not st.get("pinned"):
+            now = time.monotonic()
+            _rate_state[service] = {"rate": rate, "tokens": max(1.0, rate), "updated": now, "cut": 0.0, "pinned": True}
+
+
+def adapt_rate(service, throttled):
+    """
+    AIMD on the service's request rate. The first throttle engages a token
+    bucket at RATE_LIMITS[service]; later throttles halve it (at most once per
+    RATE_DECREASE_INTERVAL, so concurrent callers share a cut) and successes
+    add back 5% of the limit until it is reached and the bucket is dropped
+    (pinned buckets from set_rate_limit stay at the limit).
+    """
+    if service not in RATE_LIMITS:
+        return
+    with _rate_lock:
+        now = time.monotonic()
+        st = _rate_state.get(service)
+        if throttled:
+            if st is None:
+                _rate_state[service] = {"rate": RATE_LIMITS[service], "tokens": 0.0, "updated": now, "cut": now}
+            elif now - st["cut"] >= RATE_DECREASE_INTERVAL:
+                st["rate"] = max(RATE_LIMIT_FLOOR, st["rate"] / 2)
+                st["tokens"] = min(st["tokens"], 0.0)
+                st["cut"] = now
+        elif st is not None:
+            st["rate"] = min(RATE_LIMITS[service], st["rate"] + RATE_LIMITS[service] * 0.05)
+            if st["rate"] >= RATE_LIMITS[service] and not st.get("pinned"):
+                del _rate_state[service]
+
+
+def record_retry(op, field):
+    """Count a call, retry, throttle or give-up for an operation; returns the operation's retries so far."""
+    with _stats_lock:
+        st = _retry_stats.setdefault(op, {"calls": 0, "retries": 0, "throttles": 0, "gave_up": 0})
+        st[field] += 1
+        return st["retries"]
+
+
+def call_aws(service, operation, weight=1, idempotent=True, **kwargs):
+    """
+    Call client(service).<operation>(**kwargs) through the shared retry layer.
+
+    Each attempt first takes a token from the service's adaptive rate limiter.
+    Throttles (which also halve that rate) and transient server or connection
+    errors are retried with full-jitter exponential backoff, up to
+    AWS_MAX_ATTEMPTS per call and the operation's per-invocation retry budget
+    (RETRY_BUDGETS), so a throttling storm fails fast instead of eating the
+    Lambda timeout. Anything else is raised immediately. weight is the
+    request's cost in rate-limit tokens (SES counts each recipient).
+    A call that is not idempotent (sending an email) is retried on throttles
+    only: after a timeout or server error it may already have taken effect.
+    """
+    op = f"{service}.{operation}"
+    method = getattr(client(service), operation)
+    record_retry(op, "calls")
+    attempt = 1
+    while True:
+        acquire_token(service, weight)
+        try:
+            result = method(**kwargs)
+            adapt_rate(service, throttled=False)
+            return result
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "")
+            throttled = code in THROTTLE_CODES
+            if not throttled and (code not in TRANSIENT_CODES or not idempotent):
+                raise
+            error = e
+        except (EndpointConnectionError, ConnectionClosedError, ReadTimeoutError) as e:
+            if not idempotent:
+                raise
+            throttled = False
+            error = e
+
+        if throttled:
+            adapt_rate(service, throttled=True)
+            record_retry(op, "throttles")
+        if attempt >= AWS_MAX_ATTEMPTS or record_retry(op, "retries") > RETRY_BUDGETS.get(op, DEFAULT_RETRY_BUDGET):
+            record_retry(op, "gave_up")
+            logger.error(f"{op} failed after {attempt} attempt(s): {error}")
+            raise error
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        logger.warning(f"{op} {'throttled' if throttled else 'failed'} (attempt {attempt}), retrying in {delay:.2f}s: {error}")
+        time.sleep(delay)
+        attempt += 1
+
+
+def retry_metrics():
+    """Queue ApiRetries/ApiThrottles/ApiGaveUp totals for the invocation, if there were any."""
+    with _stats_lock:
+        totals = {
+            field: sum(st[field] for st in _retry_stats.values()) for field in ("retries", "throttles", "gave_up")
+        }
+    if totals["retries"] or totals["gave_up"]:
+        put_metric("ApiRetries", totals["retries"])
+        put_metric("ApiThrottles", totals["throttles"])
+        put_metric("ApiGaveUp", totals["gave_up"])
 
 
-def ce_grouped_cost(start: date, end: date, group_key: str, aggregate_days=True):
+def dump_profile(profiler, bucket, report_day: date, mode="report"):
     """
-    Query Cost Explorer grouped by dimension.
+    Upload a cProfile dump (pstats format) for the run to profiles/YYYY/MM/DD/
+    in the archive bucket, named by time and mode (report, monitor, backfill...).
+    """
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".prof") as f:
+            profiler.dump_stats(f.name)
+            f.seek(0)
+            key = f"profiles/{report_day:%Y/%m/%d}/{datetime.now(timezone.utc):%H%M%S}-{mode}.prof"
+            put_s3(bucket, key, f.read(), "application/octet-stream")
+    except Exception as e:
+        logger.warning(f"Failed to upload profile: {e}")
+
+
+def run_parallel(tasks, max_workers=MAX_WORKERS):
+    """
+    Run independent callables concurrently on a bounded thread pool.
+    tasks maps a task name to a zero-argument callable; returns {name: result}.
+    Every task runs to completion; each failure is logged under its task name
+    and the run fails afterwards with all failed task names.
+    """
+    if not tasks:
+        return {}
+
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+        futures = {name: pool.submit(fn) for name, fn in tasks.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"Task {name} failed: {e}")
+                errors[name] = e
+
+    if errors:
+        first = next(iter(errors.values()))
+        raise RuntimeError(f"{len(errors)} task(s) failed: {', '.join(errors)}") from first
+    return results
+
+
+def ce_time(t):
+    """Cost Explorer period bound: YYYY-MM-DD for dates, YYYY-MM-DDThh:mm:ssZ for (UTC) HOURLY datetimes."""
+    if isinstance(t, datetime):
+        return t.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return t.isoformat()
+
+
+def iter_cost_pages(start: date, end: date, group_keys, granularity="DAILY"):
+    """
+    Yield get_cost_and_usage pages for the period, following NextPageToken.
+    group_keys is a list of DIMENSION keys (Cost Explorer allows up to two).
+    start and end are datetimes for HOURLY granularity.
+    """
+    kwargs = {
+        "TimePeriod": {"Start": ce_time(start), "End": ce_time(end)},
+        "Granularity": granularity,
+        "Metrics": ["UnblendedCost"],
+    }
+    if group_keys:
+        kwargs["GroupBy"] = [{"Type": "DIMENSION", "Key": k} for k in group_keys]
+
+    while True:
+        with timed(f"ce.get_cost_and_usage[{'+'.join(group_keys or ['TOTAL'])}]"):
+            resp = call_aws("ce", "get_cost_and_usage", **kwargs)
+        yield resp
+        token = resp.get("NextPageToken")
+        if not token:
+            return
+        kwargs["NextPageToken"] = token
+
+
+def iter_cost_groups(pages):
+    """Flatten Cost Explorer pages into (day, keys, amount) tuples, one group at a time."""
+    for page in pages:
+        for result in page["ResultsByTime"]:
+            day = result["TimePeriod"]["Start"]
+            for g in result.get("Groups", []):
+                yield day, g["Keys"], money(g["Metrics"]["UnblendedCost"]["Amount"])
+
+
+def archive_pages(pages, fileobj):
+    """
+    Pass Cost Explorer pages through while streaming them into fileobj as one
+    JSON document shaped like a single get_cost_and_usage response.
+    The file is rewound once the last page has been consumed.
+    """
+    fileobj.write(b'{"ResultsByTime": [')
+    group_definitions = []
+    first = True
+    for page in pages:
+        group_definitions = page.get("GroupDefinitions", group_definitions)
+        for result in page["ResultsByTime"]:
+            if not first:
+                fileobj.write(b", ")
+            fileobj.write(json.dumps(result).encode("utf-8"))
+            first = False
+        yield page
+    fileobj.write(b'], "GroupDefinitions": ' + json.dumps(group_definitions).encode("utf-8") + b"}")
+    fileobj.seek(0)
+
+
+def spooled_file():
+    """Temporary binary file that stays in memory until it outgrows SPOOL_MAX_BYTES."""
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+
+def top_rows(aggregated, top_n=None):
+    """
+    Positive (key, amount) rows, largest first.
+    With top_n, selects through a bounded heap instead of sorting every key.
+    """
+    positive = ((k, v) for k, v in aggregated.items() if v > 0)
+    if top_n is not None:
+        return heapq.nlargest(top_n, positive, key=lambda x: x[1])
+    return sorted(positive, key=lambda x: x[1], reverse=True)
+
+
+def ce_grouped_cost(start: date, end: date, group_key: str, aggregate_days=True, top_n=None, raw_file=None):
+    """
+    Query Cost Explorer grouped by dimension, streaming every page.
     If aggregate_days=True, sums costs across all days in the period.
     If aggregate_days=False, only returns the first day (for daily reports).
+    If top_n is set, rows holds only the N largest; total always covers every key.
+    If raw_file is given, the raw response is streamed into it for archiving.
+    Returns (rows, total, aggregated) where aggregated maps every key to its cost.
     """
     try:
-        resp = ce.get_cost_and_usage(
-            TimePeriod={"Start": start.isoformat(), "End": end.isoformat()},
-            Granularity="DAILY",
-            Metrics=["UnblendedCost"],
-            GroupBy=[{"Type": "DIMENSION", "Key": group_key}],
-        )
-        
-        # Aggregate costs across all days if requested
-        if aggregate_days:
-            # Sum costs across all days in ResultsByTime
-            aggregated = {}
-            for result in resp["ResultsByTime"]:
-                groups = result.get("Groups", [])
-                for g in groups:
-                    key = g["Keys"][0]
-                    amt = money(g["Metrics"]["UnblendedCost"]["Amount"])
-                    if key not in aggregated:
-                        aggregated[key] = 0.0
-                    aggregated[key] += amt
-            # Convert to list of tuples and sort
-            rows = [(k, v) for k, v in aggregated.items() if v > 0]
-            rows.sort(key=lambda x: x[1], reverse=True)
-            total = sum(v for _, v in rows)
-        else:
+        pages = iter_cost_pages(start, end, [group_key])
+        if raw_file is not None:
+            pages = archive_pages(pages, raw_file)
+
+        first_day = start.isoformat()
+        aggregated = {}
+        for day, keys, amt in iter_cost_groups(pages):
             # For daily reports, only use the first day
-            result = resp["ResultsByTime"][0]
-            groups = result.get("Groups", [])
-            rows = []
-            total = 0.0
-            for g in groups:
-                key = g["Keys"][0]
-                amt = money(g["Metrics"]["UnblendedCost"]["Amount"])
-                if amt > 0:
-                    rows.append((key, amt))
-                    total += amt
-            rows.sort(key=lambda x: x[1], reverse=True)
-        
-        return rows, total, resp
+            if not aggregate_days and day != first_day:
+                continue
+            aggregated[keys[0]] = aggregated.get(keys[0], 0.0) + amt
+
+        total = sum(v for v in aggregated.values() if v > 0)
+        return top_rows(aggregated, top_n), total, aggregated
     except Exception as e:
         logger.error(f"Cost Explorer query failed for {group_key}: {e}")
         raise
 
 
-def get_daily_totals(num_days: int, end_date: date):
-    """Get daily cost totals for the past N days (for trend analysis)."""
+def is_closed_day(day: date, now=None) -> bool:
+    """True once a (UTC) Cost Explorer day ended more than CACHE_CLOSED_AFTER ago."""
+    now = now or datetime.now(timezone.utc)
+    day_end = datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(days=1)
+    return now - day_end >= CACHE_CLOSED_AFTER
+
+
+def result_cache_key(dimension: str, granularity: str, day: date):
+    """Key for one day of Cost Explorer results."""
+    return (dimension, granularity, day.isoformat())
+
+
+def result_cache_s3_key(key):
+    """Archive bucket object holding one closed day of cached results."""
+    dimension, granularity, day = key
+    return f"{CACHE_PREFIX}{dimension}/{granularity}/{day}.json"
+
+
+def result_cache_get(key):
+    """In-process lookup; volatile entries expire after CACHE_VOLATILE_TTL_SECONDS."""
+    with _result_cache_lock:
+        entry = _result_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, results = entry
+        if expires_at is not None and expires_at < datetime.now(timezone.utc):
+            del _result_cache[key]
+            return None
+        _result_cache.move_to_end(key)
+        return results
+
+
+def result_cache_put(key, results, closed: bool):
+    """Store a day in-process; closed days never expire, the least recently used are evicted."""
+    expires_at = None if closed else datetime.now(timezone.utc) + timedelta(seconds=CACHE_VOLATILE_TTL_SECONDS)
+    with _result_cache_lock:
+        _result_cache[key] = (expires_at, results)
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > CACHE_MAX_ENTRIES:
+            _result_cache.popitem(last=False)
+
+
+def persist_cached_days(dimension: str, results_by_day, bucket):
+    """Write closed days ({"YYYY-MM-DD": [result, ...]}) to the archive bucket's result cache; failures only warn."""
     try:
-        start_date = end_date - timedelta(days=num_days)
-        resp = ce.get_cost_and_usage(
-            TimePeriod={"Start": start_date.isoformat(), "End": end_date.isoformat()},
-            Granularity="DAILY",
-            Metrics=["UnblendedCost"],
+        run_parallel({
+            day_str: (lambda k=(dimension, "DAILY", day_str), r=results: put_s3(
+                bucket, result_cache_s3_key(k), json.dumps(r).encode("utf-8"), "application/json"
+            ))
+            for day_str, results in results_by_day.items()
+        })
+    except Exception as e:
+        logger.warning(f"Failed to persist {dimension} cache: {e}")
+
+
+def cached_daily_results(dimension: str, start: date, end: date, bucket=None, query=True):
+    """
+    Raw DAILY ResultsByTime entries for [start, end), grouped by one dimension
+    (or two joined with "+", e.g. "LINKED_ACCOUNT+SERVICE"). Days are served from the in-process cache, then (for closed days) from the
+    archive bucket, and only what is still missing is queried from Cost Explorer
+    in one paginated call. With query=False nothing is queried and missing days are left out.
+    Returns ({"YYYY-MM-DD": [result, ...]}, group_definitions).
+    """
+    days = []
+    day = start
+    while day < end:
+        days.append(day)
+        day += timedelta(days=1)
+
+    by_day = {}
+    for day in days:
+        results = result_cache_get(result_cache_key(dimension, "DAILY", day))
+        if results is not None:
+            by_day[day.isoformat()] = results
+
+    # Cold container: closed days may already be persisted in the archive bucket
+    closed_missing = [d for d in days if d.isoformat() not in by_day and is_closed_day(d)]
+    if bucket and closed_missing:
+        loaded = run_parallel({
+            d.isoformat(): (lambda k=result_cache_key(dimension, "DAILY", d): get_s3_json(bucket, result_cache_s3_key(k)))
+            for d in closed_missing
+        })
+        for day_str, results in loaded.items():
+            if results is not None:
+                by_day[day_str] = results
+                result_cache_put((dimension, "DAILY", day_str), results, closed=True)
+
+    group_keys = dimension.split("+")
+    group_definitions = [{"Type": "DIMENSION", "Key": k} for k in group_keys]
+    missing = [d for d in days if d.isoformat() not in by_day]
+    if missing and query:
+        fetched = {}
+        for page in iter_cost_pages(missing[0], end, group_keys):
+            group_definitions = page.get("GroupDefinitions", group_definitions)
+            for result in page["ResultsByTime"]:
+                fetched.setdefault(result["TimePeriod"]["Start"], []).append(result)
+
+        to_persist = {}
+        for day in missing:
+            day_str = day.isoformat()
+            results = fetched.get(day_str, [])
+            by_day[day_str] = results
+            closed = is_closed_day(day)
+            result_cache_put((dimension, "DAILY", day_str), results, closed)
+            if closed:
+                to_persist[day_str] = results
+        logger.info(
+            f"{dimension} cache: {len(days) - len(missing)}/{len(days)} days cached, "
+            f"queried {missing[0]} - {end}"
         )
-        
-        daily_costs = []
-        for result in resp["ResultsByTime"]:
-            day_start = result["TimePeriod"]["Start"]
-            total = money(result.get("Total", {}).get("UnblendedCost", {}).get("Amount", "0"))
-            daily_costs.append({"date": day_start, "cost": total})
-        
-        return daily_costs
+
+        if bucket and to_persist:
+            persist_cached_days(dimension, to_persist, bucket)
+
+    return by_day, group_definitions
+
+
+def plan_cost_window(report_day: date, include_mtd=True):
+    """
+    Plan the single SERVICE-grouped window the report is derived from.
+    Covers the report day, the day before, the same day last week and the
+    7-day trend, widened back to the first of the month when MTD is on and
+    to the anomaly baseline and forecast history when those are on.
+    Returns (start, end) with an exclusive end.
+    """
+    start = report_day - timedelta(days=7)
+    if include_mtd:
+        start = min(start, report_day.replace(day=1))
+    if ANOMALY_DETECTION:
+        start = min(start, report_day - timedelta(days=ANOMALY_LOOKBACK_DAYS))
+    if LOCAL_FORECAST:
+        start = min(start, report_day - timedelta(days=FORECAST_HISTORY_DAYS - 1))
+    return start, report_day + timedelta(days=1)
+
+
+def fetch_daily_by_service(start: date, end: date, bucket=None, cube_start=None):
+    """
+    Fetch DAILY SERVICE-grouped results for the window and index them by day.
+    Closed days come from the result cache when available (see cached_daily_results).
+
+    With COST_CUBE_DIMENSION set, the days from cube_start (or from the first
+    day the SERVICE cache cannot serve, if earlier) are queried grouped by that
+    dimension and SERVICE in one paginated call, SERVICE last so archived views
+    read as before, and their per-service costs are the cube's marginal. Closed
+    cube days are also cached by SERVICE, so later windows only re-query the
+    days that are still open.
+    Returns ({"YYYY-MM-DD": {service: amount}}, raw_response,
+    {"YYYY-MM-DD": {(key, service): amount}}); the cube is empty without a cube dimension.
+    """
+    dimension = f"{COST_CUBE_DIMENSION}+SERVICE" if COST_CUBE_DIMENSION else "SERVICE"
+    label = region_label if COST_CUBE_DIMENSION == "REGION" else None
+    try:
+        results_by_day, group_definitions = cached_daily_results(
+            "SERVICE", start, end, bucket, query=not COST_CUBE_DIMENSION
+        )
+        cube_days = set()
+        if COST_CUBE_DIMENSION:
+            cube_from = cube_start or end
+            day = start
+            while day < cube_from and day.isoformat() in results_by_day:
+                day += timedelta(days=1)
+            cube_from = min(cube_from, day)
+            if cube_from < end:
+                cube_results, group_definitions = cached_daily_results(dimension, cube_from, end, bucket)
+                to_cache = {
+                    day_str: service_results(results) for day_str, results in cube_results.items()
+                    if day_str not in results_by_day and is_closed_day(date.fromisoformat(day_str))
+                }
+                for day_str, results in to_cache.items():
+                    result_cache_put(("SERVICE", "DAILY", day_str), results, closed=True)
+                if bucket and to_cache:
+                    persist_cached_days("SERVICE", to_cache, bucket)
+                results_by_day.update(cube_results)
+                cube_days = set(cube_results)
+
+        by_day = {}
+        cube = {}
+        results = []
+        for day_str in sorted(results_by_day):
+            results.extend(results_by_day[day_str])
+            day_costs = by_day.setdefault(day_str, {})
+            day_cells = cube.setdefault(day_str, {}) if day_str in cube_days else None
+            for _, keys, amt in iter_cost_groups([{"ResultsByTime": results_by_day[day_str]}]):
+                service = keys[-1]
+                day_costs[service] = day_costs.get(service, 0.0) + amt
+                if day_cells is not None:
+                    cell = (label(keys[0]) if label else keys[0], service)
+                    day_cells[cell] = day_cells.get(cell, 0.0) + amt
+
+        return by_day, {"ResultsByTime": results, "GroupDefinitions": group_definitions}, cube
     except Exception as e:
-        logger.warning(f"Failed to get daily totals: {e}")
-        return []
+        logger.error(f"Cost Explorer query failed for {dimension} window {start} - {end}: {e}")
+        raise
+
+
+def cube_cells(cube, start: date, end: date):
+    """Sum a daily cost cube over [start, end) into {(key, service): amount}."""
+    cells = {}
+    day = start
+    while day < end:
+        for cell, amt in cube.get(day.isoformat(), {}).items():
+            cells[cell] = cells.get(cell, 0.0) + amt
+        day += timedelta(days=1)
+    return cells
+
+
+def cube_marginal(cells, axis):
+    """{key: amount} along one axis of summed cube cells: 0 for the cube dimension, 1 for SERVICE."""
+    totals = {}
+    for cell, amt in cells.items():
+        totals[cell[axis]] = totals.get(cell[axis], 0.0) + amt
+    return totals
+
+
+def top_services_by(cells, keys, per_key=REGION_TOP_SERVICES):
+    """The per_key largest services of each cube key in keys, as {key: [(service, amount), ...]}."""
+    by_key = {key: {} for key in keys}
+    for (key, service), amt in cells.items():
+        if key in by_key:
+            by_key[key][service] = by_key[key].get(service, 0.0) + amt
+    return {key: top_rows(services, per_key) for key, services in by_key.items()}
+
+
+def fetch_daily_by_account(start: date, end: date, bucket=None):
+    """
+    Fetch DAILY LINKED_ACCOUNT+SERVICE results for the window (one query for
+    the whole organization) and index them per linked account.
+    Returns ({account_id: {"YYYY-MM-DD": {service: amount}}}, raw_response).
+    """
+    try:
+        results_by_day, group_definitions = cached_daily_results("LINKED_ACCOUNT+SERVICE", start, end, bucket)
+
+        by_account = {}
+        results = []
+        for day_str in sorted(results_by_day):
+            results.extend(results_by_day[day_str])
+            for _, keys, amt in iter_cost_groups([{"ResultsByTime": results_by_day[day_str]}]):
+                account_id, service = keys
+                day_costs = by_account.setdefault(account_id, {}).setdefault(day_str, {})
+                day_costs[service] = day_costs.get(service, 0.0) + amt
+
+        return by_account, {"ResultsByTime": results, "GroupDefinitions": group_definitions}
+    except Exception as e:
+        logger.error(f"Cost Explorer query failed for LINKED_ACCOUNT+SERVICE window {start} - {end}: {e}")
+        raise
+
+
+def rows_for_days(by_day, start: date, end: date):
+    """Sum per-service costs over [start, end) from a daily index, sorted by cost."""
+    aggregated = {}
+    day = start
+    while day < end:
+        for key, amt in by_day.get(day.isoformat(), {}).items():
+            aggregated[key] = aggregated.get(key, 0.0) + amt
+        day += timedelta(days=1)
+
+    rows = [(k, v) for k, v in aggregated.items() if v > 0]
+    rows.sort(key=lambda x: x[1], reverse=True)
+    total = sum(v for _, v in rows)
+    return rows, total
+
+
+def daily_totals_for(by_day, start: date, end: date):
+    """Get daily cost totals over [start, end) from a daily index (for trend analysis)."""
+    daily_costs = []
+    day = start
+    while day < end:
+        daily_costs.append({"date": day.isoformat(), "cost": sum(by_day.get(day.isoformat(), {}).values())})
+        day += timedelta(days=1)
+    return daily_costs
+
+
+def slice_raw(resp, start: date, end: date):
+    """Restrict a raw Cost Explorer response to the days in [start, end) for archiving."""
+    lo, hi = start.isoformat(), end.isoformat()
+    return {
+        **resp,
+        "ResultsByTime": [r for r in resp["ResultsByTime"] if lo <= r["TimePeriod"]["Start"] < hi],
+    }
+
+
+def account_raw(resp, account_id):
+    """Restrict a raw LINKED_ACCOUNT-grouped response to one linked account's groups for archiving."""
+    return {
+        **resp,
+        "ResultsByTime": [
+            {**r, "Groups": [g for g in r.get("Groups", []) if g["Keys"][0] == account_id]}
+            for r in resp["ResultsByTime"]
+        ],
+    }
+
+
+def service_results(results):
+    """Collapse cube-grouped ResultsByTime entries (SERVICE last) to one SERVICE group per day."""
+    collapsed = []
+    for r in results:
+        groups = r.get("Groups", [])
+        if not groups or len(groups[0]["Keys"]) == 1:
+            # Served from the SERVICE cache already
+            collapsed.append(r)
+            continue
+        totals = {}
+        for g in groups:
+            service = g["Keys"][-1]
+            totals[service] = totals.get(service, 0.0) + money(g["Metrics"]["UnblendedCost"]["Amount"])
+        collapsed.append({**r, "Groups": [
+            {"Keys": [k], "Metrics": {"UnblendedCost": {"Amount": f"{v:.10f}", "Unit": "USD"}}}
+            for k, v in totals.items()
+        ]})
+    return collapsed
+
+
+def service_raw(resp):
+    """A cube-grouped raw response collapsed to SERVICE groups for archiving (unchanged if already SERVICE-only)."""
+    if len(resp.get("GroupDefinitions", [])) < 2:
+        return resp
+    return {
+        **resp,
+        "ResultsByTime": service_results(resp["ResultsByTime"]),
+        "GroupDefinitions": resp["GroupDefinitions"][-1:],
+    }
+
+
+def mtd_state_key(month_start: date):
+    """Archive bucket object holding the running MTD accumulator for a month."""
+    return f"{MTD_STATE_PREFIX}{month_start:%Y-%m}.json"
+
+
+def incremental_mtd(state, by_day, window_start: date, report_day: date, bucket=None):
+    """
+    Month-to-date per-service totals from a running accumulator.
+
+    state is the stored accumulator ({"month", "through", "reconciled_at",
+    "totals": {service: amount}, "recent": {day: {service: amount}}}) or None.
+    Every day of the already-fetched window is (re)applied: its previous
+    contribution in "recent" is subtracted and the fresh one added, so
+    restatements inside the window are picked up at no extra query cost.
+    Days before the window are only re-queried on a full rebuild, which
+    happens when there is no usable state or every MTD_RECONCILE_EVERY_DAYS.
+
+    Returns (totals, new_state). new_state is None when the report day is
+    older than the accumulator and the result must not be persisted.
+    """
+    month_start = report_day.replace(day=1)
+    first_day = max(month_start, window_start)
+    end = report_day + timedelta(days=1)
+
+    through = date.fromisoformat(state["through"]) if state else None
+    if through and through > report_day:
+        # Re-running an older day: the accumulator is ahead of us, query the month directly
+        month_by_day = fetch_daily_by_service(month_start, end, bucket)[0]
+        return dict(rows_for_days(month_by_day, month_start, end)[0]), None
+
+    rebuild = (
+        state is None
+        or state.get("month") != f"{month_start:%Y-%m}"
+        or through < first_day - timedelta(days=1)
+        or date.fromisoformat(state["reconciled_at"]) <= report_day - timedelta(days=MTD_RECONCILE_EVERY_DAYS)
+    )
+
+    if rebuild:
+        logger.info(f"Rebuilding MTD accumulator for {month_start:%Y-%m}")
+        month_by_day = fetch_daily_by_service(month_start, end, bucket)[0]
+        totals = dict(rows_for_days(month_by_day, month_start, end)[0])
+        recent = {d: c for d, c in month_by_day.items() if first_day.isoformat() <= d < end.isoformat()}
+        reconciled_at = report_day.isoformat()
+    else:
+        totals = dict(state["totals"])
+        recent = dict(state.get("recent", {}))
+        day = first_day
+        while day <= report_day:
+            day_str = day.isoformat()
+            if day > through or day_str in recent:
+                for key, amt in recent.pop(day_str, {}).items():
+                    totals[key] = totals.get(key, 0.0) - amt
+                day_costs = by_day.get(day_str, {})
+                for key, amt in day_costs.items():
+                    totals[key] = totals.get(key, 0.0) + amt
+                recent[day_str] = day_costs
+            day += timedelta(days=1)
+        # Only days inside the next run's window can still be reapplied
+        recent = {d: c for d, c in recent.items() if d >= first_day.isoformat()}
+        totals = {k: v for k, v in totals.items() if abs(v) > 1e-9}
+        reconciled_at = state["reconciled_at"]
+
+    new_state = {
+        "month": f"{month_start:%Y-%m}",
+        "through": report_day.isoformat(),
+        "reconciled_at": reconciled_at,
+        "totals": totals,
+        "recent": recent,
+    }
+    return totals, new_state
+
+
+def rows_to_raw(rows, start: date, end: date, dimension: str):
+    """Wrap aggregated (key, amount) rows in a single-period Cost Explorer response shape for archiving."""
+    return {
+        "ResultsByTime": [
+            {
+                "TimePeriod": {"Start": start.isoformat(), "End": end.isoformat()},
+                "Groups": [
+                    {"Keys": [k], "Metrics": {"UnblendedCost": {"Amount": f"{v:.10f}", "Unit": "USD"}}}
+                    for k, v in rows
+                ],
+                "Estimated": True,
+            }
+        ],
+        "GroupDefinitions": [{"Type": "DIMENSION", "Key": dimension}],
+    }
+
+
+def region_label(region):
+    """Display name for a Cost Explorer REGION key (global/unattributed spend is "Global")."""
+    if not region or region == "global":
+        return "Global"
+    return region
+
+
+def daily_grouped_costs(start: date, end: date, dimension: str, label=None):
+    """
+    One paginated DAILY query over [start, end) grouped by dimension,
+    indexed as {"YYYY-MM-DD": {key: amount}}. label optionally renames keys.
+    """
+    by_day = {}
+    for day, keys, amt in iter_cost_groups(iter_cost_pages(start, end, [dimension])):
+        key = label(keys[0]) if label else keys[0]
+        day_costs = by_day.setdefault(day, {})
+        day_costs[key] = day_costs.get(key, 0.0) + amt
+    return by_day
+
+
+def costs_by_account(start: date, end: date, dimension: str, label=None):
+    """
+    One paginated query over [start, end) grouped by LINKED_ACCOUNT and dimension,
+    summed per account as {account_id: {key: amount}}. label optionally renames keys.
+    """
+    by_account = {}
+    for _, keys, amt in iter_cost_groups(iter_cost_pages(start, end, ["LINKED_ACCOUNT", dimension])):
+        key = label(keys[1]) if label else keys[1]
+        costs = by_account.setdefault(keys[0], {})
+        costs[key] = costs.get(key, 0.0) + amt
+    return by_account
 
 
 def get_regional_breakdown(start: date, end: date):
-    """Get cost breakdown by AWS region."""
+    """Get cost breakdown by AWS region; None if Cost Explorer gave up (the report goes out without it)."""
     try:
-        resp = ce.get_cost_and_usage(
-            TimePeriod={"Start": start.isoformat(), "End": end.isoformat()},
-            Granularity="DAILY",
-            Metrics=["UnblendedCost"],
-            GroupBy=[{"Type": "DIMENSION", "Key": "REGION"}],
-        )
-        
         aggregated = {}
-        for result in resp["ResultsByTime"]:
-            groups = result.get("Groups", [])
-            for g in groups:
-                region = g["Keys"][0]
-                if not region or region == "global":
-                    region = "Global"
-                amt = money(g["Metrics"]["UnblendedCost"]["Amount"])
-                if region not in aggregated:
-                    aggregated[region] = 0.0
-                aggregated[region] += amt
+        for _, keys, amt in iter_cost_groups(iter_cost_pages(start, end, ["REGION"])):
+            region = region_label(keys[0])
+            aggregated[region] = aggregated.get(region, 0.0) + amt
         
         rows = [(k, v) for k, v in aggregated.items() if v > 0.001]
         rows.sort(key=lambda x: x[1], reverse=True)
@@ -188,17 +1155,23 @@ def get_regional_breakdown(start: date, end: date):
         return rows, total
     except Exception as e:
         logger.warning(f"Failed to get regional breakdown: {e}")
-        return [], 0.0
+        return None
 
 
-def get_budget_status():
+def get_regional_breakdown_by_account(start: date, end: date):
+    """Regional breakdown per linked account; None on failure, like get_regional_breakdown."""
+    try:
+        return costs_by_account(start, end, "REGION", label=region_label)
+    except Exception as e:
+        logger.warning(f"Failed to get regional breakdown by account: {e}")
+        return None
+
+
+def get_budget_status(budget_name=BUDGET_NAME):
     """Get current budget status and utilization."""
     try:
-        account_id = boto3.client("sts").get_caller_identity()["Account"]
-        resp = budgets.describe_budget(
-            AccountId=account_id,
-            BudgetName=BUDGET_NAME,
-        )
+        with timed("get_budget_status"):
+            resp = call_aws("budgets", "describe_budget", AccountId=get_account_id(), BudgetName=budget_name)
         budget = resp["Budget"]
         limit = float(budget["BudgetLimit"]["Amount"])
         
@@ -213,10 +1186,10 @@ def get_budget_status():
             "actual": actual,
             "forecasted": forecasted,
             "utilization": utilization,
-            "name": BUDGET_NAME,
+            "name": budget_name,
         }
     except Exception as e:
-        logger.warning(f"Failed to get budget status: {e}")
+        logger.warning(f"Failed to get budget status for {budget_name}: {e}")
         return None
 
 
@@ -225,11 +1198,14 @@ def get_cost_forecast(start: date, end: date):
     Returns the forecasted total cost for the period (mean value).
     """
     try:
-        resp = ce.get_cost_forecast(
-            TimePeriod={"Start": start.isoformat(), "End": end.isoformat()},
-            Metric="UNBLENDED_COST",
-            Granularity="MONTHLY",
-        )
+        with timed("get_cost_forecast"):
+            resp = call_aws(
+                "ce",
+                "get_cost_forecast",
+                TimePeriod={"Start": start.isoformat(), "End": end.isoformat()},
+                Metric="UNBLENDED_COST",
+                Granularity="MONTHLY",
+            )
         # Cost Explorer forecast returns ForecastResultsByTime array
         # For monthly granularity, we typically get one result
         # Use MeanValue for the forecast
@@ -246,6 +1222,27 @@ def get_cost_forecast(start: date, end: date):
         return None
 
 
+def account_budget(settings, mtd_total: float, report_day: date):
+    """
+    Budget status for one linked account: a named AWS Budget in this account
+    ("budget_name"), a fixed monthly amount ("monthly_budget"), or None.
+    """
+    if settings.get("budget_name"):
+        return get_budget_status(settings["budget_name"])
+    if not settings.get("monthly_budget"):
+        return None
+
+    limit = float(settings["monthly_budget"])
+    days_in_month = ((report_day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)).day
+    return {
+        "limit": limit,
+        "actual": mtd_total,
+        "forecasted": mtd_total / report_day.day * days_in_month,
+        "utilization": (mtd_total / limit * 100) if limit > 0 else 0,
+        "name": f"{settings.get('name') or 'account'} monthly",
+    }
+
+
 def calculate_change(current: float, previous: float):
     """Calculate percentage change between two values."""
     if previous == 0:
@@ -264,6 +1261,158 @@ def calculate_change(current: float, previous: float):
     return change, arrow
 
 
+def detect_anomalies(by_day, report_day: date, lookback=ANOMALY_LOOKBACK_DAYS):
+    """
+    Services whose cost on report_day is far outside their own recent range.
+
+    Each service's baseline is its daily cost over the previous `lookback`
+    days of the daily index (absent = $0). The score is a robust z-score,
+    0.6745 * (cost - median) / MAD, so one earlier spike cannot mask the next
+    the way it would inflate a mean/std. The MAD is floored at 5% of the
+    median (and 1 cent) so flat or brand-new services still score sensibly.
+    Returns the services scoring beyond ANOMALY_Z_THRESHOLD with a change of
+    at least ANOMALY_MIN_DELTA, largest change first, as dicts of service,
+    cost, baseline, change, pct (None for a $0 baseline) and score.
+    """
+    history = [
+        d for d in ((report_day - timedelta(days=i)).isoformat() for i in range(lookback, 0, -1)) if d in by_day
+    ]
+    if len(history) < ANOMALY_MIN_HISTORY_DAYS:
+        return []
+
+    today = by_day.get(report_day.isoformat(), {})
+    services = set(today)
+    for d in history:
+        services.update(by_day[d])
+
+    anomalies = []
+    for service in services:
+        series = [by_day[d].get(service, 0.0) for d in history]
+        median = statistics.median(series)
+        mad = statistics.median(abs(x - median) for x in series)
+        scale = max(mad, 0.05 * abs(median), 0.01)
+        cost = today.get(service, 0.0)
+        change = cost - median
+        score = 0.6745 * change / scale
+        if abs(score) >= ANOMALY_Z_THRESHOLD and abs(change) >= ANOMALY_MIN_DELTA:
+            anomalies.append({
+                "service": service,
+                "cost": cost,
+                "baseline": median,
+                "change": change,
+                "pct": (change / median * 100) if median > 0 else None,
+                "score": score,
+            })
+
+    anomalies.sort(key=lambda a: abs(a["change"]), reverse=True)
+    return anomalies
+
+
+def linear_fit(points):
+    """Least-squares line through (t, y) points: (intercept, slope, t_mean, sxx)."""
+    t_mean = sum(t for t, _ in points) / len(points)
+    y_mean = sum(y for _, y in points) / len(points)
+    sxx = sum((t - t_mean) ** 2 for t, _ in points)
+    slope = sum((t - t_mean) * (y - y_mean) for t, y in points) / sxx if sxx else 0.0
+    return y_mean - slope * t_mean, slope, t_mean, sxx
+
+
+def fit_daily_forecast(series, weekdays, future_weekdays):
+    """
+    Forecast the sum of future daily costs from a daily series (oldest first).
+
+    The model is a least-squares linear trend times multiplicative weekday
+    factors (classical decomposition: once two weeks of history exist, each
+    weekday's factor is its mean ratio to a first trend fit, and the trend is
+    then refitted to the deseasonalized series). Predictions are clamped at
+    $0. The interval combines independent per-day residual noise with the
+    uncertainty of the fitted level, trend and weekday factors.
+    Returns (expected, half_width) for an 80% interval on the sum.
+    """
+    n = len(series)
+    if n == 0 or sum(series) <= 0 or not future_weekdays:
+        return 0.0, 0.0
+
+    factors = [1.0] * 7
+    counts = None
+    if n >= 14:
+        intercept, slope, _, _ = linear_fit(list(enumerate(series)))
+        sums, counts = [0.0] * 7, [0] * 7
+        for t, (y, w) in enumerate(zip(series, weekdays)):
+            trend = intercept + slope * t
+            if trend > 0:
+                sums[w] += y / trend
+                counts[w] += 1
+        factors = [sums[w] / counts[w] if counts[w] else 1.0 for w in range(7)]
+        scale = sum(factors) / 7
+        factors = [f / scale for f in factors] if scale > 0 else [1.0] * 7
+
+    # Days on a weekday that never has spend carry no trend information
+    points = [(t, y / factors[w]) for t, (y, w) in enumerate(zip(series, weekdays)) if factors[w] > 0]
+    intercept, slope, t_mean, sxx = linear_fit(points)
+    z_mean = intercept + slope * t_mean
+
+    dof = len(points) - 2 - (6 if counts else 0)  # the weekday factors were fitted too
+    sigma = (sum((z - intercept - slope * t) ** 2 for t, z in points) / dof) ** 0.5 if dof > 0 else 0.0
+
+    expected = 0.0
+    noise = 0.0
+    level_weight = 0.0
+    trend_weight = 0.0
+    by_weekday = [0.0] * 7
+    for i, w in enumerate(future_weekdays):
+        level = max(0.0, intercept + slope * (n + i))
+        expected += level * factors[w]
+        by_weekday[w] += level * factors[w]
+        noise += (sigma * factors[w]) ** 2
+        level_weight += factors[w]
+        trend_weight += factors[w] * (n + i - t_mean)
+    # Fitted level/trend errors are shared by every future day, so they add up linearly
+    fit = sigma ** 2 * (level_weight ** 2 / len(points) + (trend_weight ** 2 / sxx if sxx else 0.0))
+    # Each weekday factor is a mean of a few days, off by about (relative noise) / sqrt(count)
+    seasonal = 0.0
+    if counts and z_mean > 0:
+        relative = (sigma / z_mean) ** 2
+        seasonal = sum(by_weekday[w] ** 2 * relative / counts[w] for w in range(7) if counts[w])
+    return expected, FORECAST_INTERVAL_Z * (noise + fit + seasonal) ** 0.5
+
+
+def forecast_month(by_day, report_day: date, history_days=FORECAST_HISTORY_DAYS):
+    """
+    Forecast the rest of report_day's month from the daily SERVICE index.
+    Fits fit_daily_forecast to the daily totals and to each service over the
+    last history_days (through report_day). Returns None without a week of
+    history, else {"history_days", "days_left", "remaining", "half_width",
+    "services": {service: [remaining, half_width]}}; month-end figures are
+    MTD actuals plus "remaining".
+    """
+    history = [
+        d for d in (report_day - timedelta(days=i) for i in range(history_days - 1, -1, -1)) if d.isoformat() in by_day
+    ]
+    if len(history) < 7:
+        return None
+
+    month_end = (report_day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    future = [(report_day + timedelta(days=i)).weekday() for i in range(1, (month_end - report_day).days + 1)]
+    weekdays = [d.weekday() for d in history]
+    days = [by_day[d.isoformat()] for d in history]
+
+    remaining, half_width = fit_daily_forecast([sum(c.values()) for c in days], weekdays, future)
+    services = {}
+    for service in set().union(*days):
+        svc_remaining, svc_half_width = fit_daily_forecast([c.get(service, 0.0) for c in days], weekdays, future)
+        if svc_remaining > 0:
+            services[service] = [svc_remaining, svc_half_width]
+
+    return {
+        "history_days": len(history),
+        "days_left": len(future),
+        "remaining": remaining,
+        "half_width": half_width,
+        "services": services,
+    }
+
+
 def generate_sparkline(daily_costs):
     """Generate a simple ASCII/Unicode sparkline from daily costs."""
     if not daily_costs or len(daily_costs) < 2:
@@ -288,138 +1437,1750 @@ def generate_sparkline(daily_costs):
     return sparkline
 
 
-def csv_bytes(headers, rows):
-    """Generate CSV bytes from headers and rows."""
+def encode_columnar(groups, dimension: str, start: date, end: date):
+    """
+    Encode (day, key, amount) groups as a gzip-compressed columnar file.
+
+    Layout before compression: COLUMNAR_MAGIC, a little-endian uint32 header
+    length, a JSON header {"format", "dimension", "start", "end", "days",
+    "keys", "rows"}, then three little-endian columns of "rows" entries:
+    uint16 day index, uint32 key index (both into the header's dictionaries)
+    and float64 amount. Returns (body, meta) where meta describes the file
+    for the day's manifest.
+    """
+    days, keys = {}, {}
+    day_col, key_col, amount_col = array("H"), array("I"), array("d")
+    for day, key, amount in groups:
+        day_col.append(days.setdefault(day, len(days)))
+        key_col.append(keys.setdefault(key, len(keys)))
+        amount_col.append(amount)
+
+    header = json.dumps({
+        "format": COLUMNAR_FORMAT,
+        "dimension": dimension,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": list(days),
+        "keys": list(keys),
+        "rows": len(amount_col),
+    }).encode("utf-8")
+    if sys.byteorder != "little":
+        for col in (day_col, key_col, amount_col):
+            col.byteswap()
+
+    buf = io.BytesIO()
+    buf.write(COLUMNAR_MAGIC)
+    buf.write(struct.pack("<I", len(header)))
+    buf.write(header)
+    for col in (day_col, key_col, amount_col):
+        buf.write(col.tobytes())
+    body = gzip.compress(buf.getvalue(), mtime=0)
+
+    meta = {
+        "dimension": dimension,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "rows": len(amount_col),
+        "keys": len(keys),
+        "total": sum(v for v in amount_col if v > 0),
+        "bytes": len(body),
+    }
+    return body, meta
+
+
+def decode_columnar(body):
+    """
+    Decode a file written by encode_columnar.
+    Returns (header, rows) with rows as a list of (day, key, amount) tuples.
+    """
+    data = gzip.decompress(body)
+    if not data.startswith(COLUMNAR_MAGIC):
+        raise ValueError("Not a columnar cost archive")
+    offset = len(COLUMNAR_MAGIC)
+    (header_len,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    header = json.loads(data[offset:offset + header_len])
+    offset += header_len
+
+    n = header["rows"]
+    cols = []
+    for typecode in ("H", "I", "d"):
+        col = array(typecode)
+        size = col.itemsize * n
+        col.frombytes(data[offset:offset + size])
+        offset += size
+        if sys.byteorder != "little":
+            col.byteswap()
+        cols.append(col)
+
+    days, keys = header["days"], header["keys"]
+    rows = [(days[d], keys[k], a) for d, k, a in zip(*cols)]
+    return header, rows
+
+
+def raw_groups(raw):
+    """(day, key, amount) groups of a raw Cost Explorer response; the key is the last group key."""
+    return ((day, keys[-1], amount) for day, keys, amount in iter_cost_groups([raw]))
+
+
+def csv_file(headers, rows):
+    """Write CSV rows incrementally to a spooled temp file, rewound for upload."""
+    out = spooled_file()
     buf = io.StringIO()
     w = csv.writer(buf)
     w.writerow(headers)
     for r in rows:
         w.writerow(r)
-    return buf.getvalue().encode("utf-8")
-
-
-def put_s3(bucket, key, body_bytes, content_type):
-    """Upload object to S3 with encryption."""
+        if buf.tell() >= 64 * 1024:
+            out.write(buf.getvalue().encode("utf-8"))
+            buf.seek(0)
+            buf.truncate()
+    out.write(buf.getvalue().encode("utf-8"))
+    out.seek(0)
+    return out
+
+
+def put_s3(bucket, key, body, content_type):
+    """Upload object to S3 with encryption. body is bytes or a seekable file object."""
+    if isinstance(body, (bytes, bytearray)):
+        nbytes = len(body)
+    else:
+        body.seek(0, io.SEEK_END)
+        nbytes = body.tell()
+        body.seek(0)
     try:
-        s3.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=body_bytes,
-            ContentType=content_type,
-            ServerSideEncryption="AES256",
-        )
+        with timed("put_s3", nbytes):
+            client("s3").put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=body,
+                ContentType=content_type,
+                ServerSideEncryption="AES256",
+            )
         logger.info(f"Uploaded to s3://{bucket}/{key}")
     except Exception as e:
         logger.error(f"Failed to upload to S3 {key}: {e}")
         raise
 
 
-def html_table(title, rows, total, show_percentage=True, filter_zeros=True):
-    """Generate HTML table for email with improved formatting."""
-    # Filter out zero-cost items if requested
-    if filter_zeros:
-        rows = [(k, v) for k, v in rows if v > 0.001]  # Use 0.001 to handle floating point precision
-    
-    if not rows:
-        return f"""
-      <h3 style="margin:16px 0 8px 0;">{title}</h3>
-      <p style="color:#666;font-style:italic;">No charges for this period.</p>
+def put_s3_conditional(condition, **kwargs):
     """
-    
-    # Build table rows with percentage if total > 0
-    trs = []
-    for k, v in rows:
-        percentage = f"{(v/total*100):.1f}%" if total > 0 and show_percentage else ""
-        percentage_cell = f"<td style='padding:6px 10px;border:1px solid #ddd;text-align:right;color:#666;font-size:0.9em'>{percentage}</td>" if show_percentage else ""
-        trs.append(
-            f"<tr>"
-            f"<td style='padding:6px 10px;border:1px solid #ddd'>{k}</td>"
-            f"<td style='padding:6px 10px;border:1px solid #ddd;text-align:right;font-weight:500'>${v:,.2f}</td>"
-            f"{percentage_cell}"
-            f"</tr>"
+    put_object with an If-Match / If-None-Match condition. A botocore older
+    than S3 conditional writes (e.g. the runtime's bundled one) rejects those
+    parameters client-side; the object is then written unconditionally, with a
+    warning, and later writes skip the condition. Concurrent runs can then
+    overwrite each other's state, but the report still goes out.
+    """
+    global _conditional_writes
+    if _conditional_writes:
+        try:
+            return client("s3").put_object(**kwargs, **condition)
+        except ParamValidationError as e:
+            _conditional_writes = False
+            logger.warning(f"S3 conditional writes unsupported by this botocore, writing without them: {e}")
+    return client("s3").put_object(**kwargs)
+
+
+def get_s3_json(bucket, key):
+    """Fetch and parse a JSON object from S3. Returns None if the object does not exist."""
+    try:
+        resp = client("s3").get_object(Bucket=bucket, Key=key)
+        return json.loads(resp["Body"].read())
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        logger.warning(f"Failed to read s3://{bucket}/{key}: {e}")
+        return None
+
+
+# Inline styles shared by the report templates (email clients ignore <style> blocks)
+STYLES = {
+    "body": (
+        "font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; "
+        "line-height: 1.6; color: #333; max-width: 800px; margin: 0 auto; padding: 20px;"
+    ),
+    "banner": (
+        "background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; "
+        "border-radius: 8px 8px 0 0; margin: -20px -20px 20px -20px;"
+    ),
+    "card": "flex: 1; min-width: 200px; background: #f8f9fa; padding: 16px; border-radius: 6px; border-left: 4px solid",
+    "card_label": "font-size: 12px; color: #666; text-transform: uppercase; letter-spacing: 0.5px;",
+    "card_value": "font-size: 28px; font-weight: bold; color: #333;",
+    "panel": "background: #f8f9fa; padding: 16px; border-radius: 6px; margin-bottom: 20px;",
+    "alert": "background: #fff8e1; padding: 16px; border-radius: 6px; margin-bottom: 20px; border-left: 4px solid #ffc107;",
+    "panel_title": "font-size: 14px; font-weight: 600; margin-bottom: 12px;",
+    "line": "display: flex; justify-content: space-between; padding: 4px 0; border-bottom: 1px solid #eee;",
+    "split": "display: flex; justify-content: space-between; font-size: 12px; color: #666;",
+    "amount": "font-weight:500",
+    "muted": "color:#666",
+    "th": "padding:6px 10px;border:1px solid #ddd;background-color:#f5f5f5",
+    "td": "padding:6px 10px;border:1px solid #ddd",
+    "td_total": "padding:8px 10px;border:1px solid #ddd",
+}
+
+# Section templates: {field[:format_spec]} is filled per render and HTML-escaped unless the
+# field name ends in _html; {style.name} is replaced from STYLES when the template is compiled.
+TEMPLATE_SOURCES = {
+    "head": """
+<html>
+<head>
+  <meta charset="UTF-8">
+</head>
+<body style="{style.body}">
+  <div style="{style.banner}">
+    <h1 style="margin: 0 0 8px 0; font-size: 24px;">☁️ AWS Cost Report</h1>
+    <div style="font-size: 14px; opacity: 0.9;">Daily Report for <b>{date}</b> ({weekday}){account_html}</div>
+  </div>
+""",
+    "account": " &bull; {account}",
+    "alert_head": """
+<html>
+<head>
+  <meta charset="UTF-8">
+</head>
+<body style="{style.body}">
+  <div style="{style.banner}">
+    <h1 style="margin: 0 0 8px 0; font-size: 24px;">🔥 {title}</h1>
+    <div style="font-size: 14px; opacity: 0.9;">{subtitle}</div>
+  </div>
+""",
+    "cards_start": """
+  <!-- Summary Cards -->
+  <div style="display: flex; flex-wrap: wrap; gap: 16px; margin-bottom: 20px;">""",
+    "card": """
+    <div style="{style.card} {accent};">
+      <div style="{style.card_label}">{label}</div>
+      <div style="{style.card_value}">${value:,.2f}</div>
+      <div style="font-size: 12px; margin-top: 4px;">{detail_html}</div>
+    </div>""",
+    "cards_end": """
+  </div>
+""",
+    "change": '<span style="color:{color};font-weight:500">{arrow} {pct:.1f}%</span>',
+    "notice": """
+  <div style="background: #fff3cd; border-left: 4px solid #ffc107; padding: 12px 16px; border-radius: 6px; margin-bottom: 20px; font-size: 13px;">
+    ⚠️ Partial report: {message}.
+  </div>
+""",
+    "budget": """
+  <!-- Budget Progress -->
+  <div style="{style.panel}">
+    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px;">
+      <div style="font-size: 14px; font-weight: 600;">📊 Budget Status: {name}</div>
+      <div style="font-size: 14px; color: #666;">${actual:,.2f} / ${limit:,.2f}</div>
+    </div>
+    <div style="background: #e9ecef; border-radius: 4px; height: 20px; overflow: hidden;">
+      <div style="background: {color}; height: 100%; width: {width:.1f}%; transition: width 0.3s;"></div>
+    </div>
+    <div style="display: flex; justify-content: space-between; margin-top: 8px; font-size: 12px; color: #666;">
+      <div>{utilization:.1f}% used</div>
+      <div>Forecasted (EOM): ${forecasted:,.2f}{cross_check}</div>
+    </div>
+  </div>
+""",
+    "panel_start": """
+  <div style="{style.panel}">
+    <div style="{style.panel_title}">{title}</div>""",
+    "alert_start": """
+  <div style="{style.alert}">
+    <div style="{style.panel_title}">{title}</div>""",
+    "panel_end": """
+  </div>
+""",
+    "line": """
+    <div style="{style.line}"><span>{name}</span><span style="{style.amount}">${amount:,.2f}</span></div>""",
+    "line_note": """
+    <div style="{style.line}"><span>{name}</span><span><span style="{style.amount}">${amount:,.2f}</span> <span style="{style.muted}">({note})</span></span></div>""",
+    "trend": """
+  <!-- 7-Day Trend -->
+  <div style="{style.panel}">
+    <div style="font-size: 14px; font-weight: 600; margin-bottom: 8px;">📈 7-Day Trend</div>
+    <div style="font-family: monospace; font-size: 24px; letter-spacing: 2px; color: #667eea; margin: 8px 0;">{sparkline}</div>
+    <div style="{style.split}">
+      <div>Min: ${low:,.2f}</div>
+      <div>Avg: ${avg:,.2f}</div>
+      <div>Max: ${high:,.2f}</div>
+    </div>
+  </div>
+""",
+    "table_empty": """
+  <h3 style="margin:16px 0 8px 0;">{title}</h3>
+  <p style="color:#666;font-style:italic;">No charges for this period.</p>
+""",
+    "table_start": """
+  <h3 style="margin:16px 0 8px 0;color:#333;">{title}</h3>
+  <table style="border-collapse:collapse;width:100%;margin-bottom:16px;">
+    <thead>
+      <tr><th style="{style.th};text-align:left">{label}</th><th style="{style.th};text-align:right">Amount</th>{pct_header_html}</tr>
+    </thead>
+    <tbody>""",
+    "pct_header": '<th style="{style.th};text-align:right">% of Total</th>',
+    "row": """
+      <tr><td style="{style.td}">{name}</td><td style="{style.td};text-align:right;font-weight:500">${amount:,.2f}</td></tr>""",
+    "row_pct": """
+      <tr><td style="{style.td}">{name}</td><td style="{style.td};text-align:right;font-weight:500">${amount:,.2f}</td><td style="{style.td};text-align:right;color:#666;font-size:0.9em">{pct:.1f}%</td></tr>""",
+    "table_end": """
+      <tr style="background-color:#f9f9f9;border-top:2px solid #333;">
+        <td style="{style.td_total}"><b>Total</b></td>
+        <td style="{style.td_total};text-align:right"><b>${total:,.2f}</b></td>{pct_total_html}
+      </tr>
+    </tbody>
+  </table>
+""",
+    "pct_total": '\n        <td style="{style.td_total};text-align:right"><b>100.0%</b></td>',
+    "insights_start": """
+  <!-- Insights Section -->
+  <div style="background: #e8f4f8; padding: 16px; border-radius: 6px; margin: 20px 0; border-left: 4px solid #17a2b8;">
+    <div style="font-size: 14px; font-weight: 600; margin-bottom: 8px;">💡 Quick Insights</div>
+    <ul style="margin: 0; padding-left: 20px; font-size: 13px; color: #555;">""",
+    "insight": """
+      <li><b>{label}:</b> {detail}</li>""",
+    "insights_end": """
+    </ul>
+  </div>
+""",
+    "archive": """
+  <!-- Archive Location -->
+  <div style="margin-top: 24px; padding: 16px; background: #f8f9fa; border-radius: 6px; font-size: 13px; color: #666;">
+    <div style="margin-bottom: 8px;"><strong>📦 Archive Location:</strong></div>
+    <div style="font-family: monospace; background: white; padding: 8px; border-radius: 4px; border: 1px solid #ddd; word-break: break-all;">{location}</div>
+    <div style="margin-top: 12px; font-size: 12px;">
+      Reports archived in {formats} formats for historical analysis.
+    </div>
+  </div>
+""",
+    "foot": """
+  <!-- Footer -->
+  <div style="margin-top: 20px; padding-top: 20px; border-top: 1px solid #eee; font-size: 12px; color: #999; text-align: center;">
+    Generated by AWS Cost Alerting System • {generated}
+  </div>
+</body>
+</html>
+""",
+}
+
+
+def compile_template(source):
+    """
+    Split a template into [(literal, field, format_spec, raw), ...] once, at import.
+    {style.name} placeholders are folded into the literals here, so rendering
+    only appends pre-built strings and the formatted fields.
+    """
+    parts = []
+    literal = ""
+    for text, field, spec, _ in string.Formatter().parse(source):
+        literal += text
+        if field is None:
+            continue
+        if field.startswith("style."):
+            literal += STYLES[field[len("style."):]]
+            continue
+        parts.append((literal, field, spec, field.endswith("_html")))
+        literal = ""
+    parts.append((literal, None, "", True))
+    return parts
+
+
+TEMPLATES = {name: compile_template(source) for name, source in TEMPLATE_SOURCES.items()}
+
+
+def emit(out, template, /, **values):
+    """Append a template to the out list (joined once by the caller), escaping non-_html fields."""
+    for literal, field, spec, raw in TEMPLATES[template]:
+        out.append(literal)
+        if field is not None:
+            value = format(values[field], spec)
+            out.append(value if raw else escape(value, quote=True))
+
+
+def fill(template, /, **values):
+    """One template rendered to a string, for fragments passed on as an _html field."""
+    out = []
+    emit(out, template, **values)
+    return "".join(out)
+
+
+def change_color(change):
+    """Red for a rise of more than 5%, green for a fall of more than 5%, gray otherwise."""
+    if change > 5:
+        return "#dc3545"
+    if change < -5:
+        return "#28a745"
+    return "#6c757d"
+
+
+def render_header(html, text, section):
+    """Banner with the report day and, in organization mode, the account."""
+    account = section["account"]
+    emit(
+        html, "head", date=section["date"], weekday=section["weekday"],
+        account_html=fill("account", account=account) if account else "",
+    )
+    text.append("AWS Cost Report")
+    text.append(f"Daily Report for {section['date']} ({section['weekday']}){' - ' + account if account else ''}")
+
+
+def render_cards(html, text, section):
+    """Summary cards: yesterday's total and, with MTD, month-to-date."""
+    emit(html, "cards_start")
+    for card in section:
+        detail_html = " &nbsp;|&nbsp; ".join(
+            escape(f"{label}: ") + (fill("change", **change) if isinstance(change, dict) else escape(change))
+            for label, change in card["details"]
         )
-    
-    trs_str = "\n".join(trs)
-    
-    # Build header
-    header_cols = "<th style='padding:6px 10px;border:1px solid #ddd;text-align:left;background-color:#f5f5f5'>Service</th><th style='padding:6px 10px;border:1px solid #ddd;text-align:right;background-color:#f5f5f5'>Amount</th>"
-    if show_percentage and total > 0:
-        header_cols += "<th style='padding:6px 10px;border:1px solid #ddd;text-align:right;background-color:#f5f5f5'>% of Total</th>"
-    
-    return f"""
-      <h3 style="margin:16px 0 8px 0;color:#333;">{title}</h3>
-      <table style="border-collapse:collapse;width:100%;margin-bottom:16px;">
-        <thead>
-          <tr>
-            {header_cols}
-          </tr>
-        </thead>
-        <tbody>
-          {trs_str}
-          <tr style="background-color:#f9f9f9;border-top:2px solid #333;">
-            <td style="padding:8px 10px;border:1px solid #ddd;"><b>Total</b></td>
-            <td style="padding:8px 10px;border:1px solid #ddd;text-align:right;"><b>${total:,.2f}</b></td>
-            {f"<td style='padding:8px 10px;border:1px solid #ddd;text-align:right'><b>100.0%</b></td>" if show_percentage and total > 0 else ""}
-          </tr>
-        </tbody>
-      </table>
-    """
-
-
-def html_to_text(html_body):
-    """Convert HTML email to plain text for better deliverability."""
-    # Simple HTML to text conversion
-    text = html_body
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
-    # Replace HTML entities
-    text = text.replace('&nbsp;', ' ')
-    text = text.replace('&amp;', '&')
-    text = text.replace('&lt;', '<')
-    text = text.replace('&gt;', '>')
-    # Clean up whitespace
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    return text.strip()
-
-
-def send_email(report_from, report_to, subject, html_body):
-    """Send email via SES with both HTML and plain text for better deliverability."""
-    logger.info(f"Attempting to send email from {report_from} to {report_to}")
+        emit(html, "card", accent=card["accent"], label=card["label"], value=card["value"], detail_html=detail_html)
+        text.append("")
+        text.append(f"{card['label']}: ${card['value']:,.2f}")
+        text.append("  " + " | ".join(
+            f"{label}: " + (f"{c['arrow']} {c['pct']:.1f}%" if isinstance(c, dict) else c) for label, c in card["details"]
+        ))
+    emit(html, "cards_end")
+
+
+def render_notice(html, text, section):
+    """Partial-report notice listing the sections that could not be fetched."""
+    message = "; ".join(section)
+    emit(html, "notice", message=message)
+    text.append("")
+    text.append(f"Partial report: {message}.")
+
+
+def render_budget(html, text, section):
+    """Budget progress bar."""
+    emit(html, "budget", **section)
+    text.append("")
+    text.append(f"Budget Status: {section['name']}")
+    text.append(
+        f"  ${section['actual']:,.2f} / ${section['limit']:,.2f} ({section['utilization']:.1f}% used), "
+        f"forecasted (EOM): ${section['forecasted']:,.2f}{section['cross_check']}"
+    )
+
+
+def render_lines(html, text, section):
+    """A titled panel of name/amount lines, each with an optional note."""
+    emit(html, "alert_start" if section.get("alert") else "panel_start", title=section["title"])
+    text.append("")
+    text.append(section["title"])
+    for name, amount, note in section["lines"]:
+        if note:
+            emit(html, "line_note", name=name, amount=amount, note=note)
+            text.append(f"  {name}: ${amount:,.2f} ({note})")
+        else:
+            emit(html, "line", name=name, amount=amount)
+            text.append(f"  {name}: ${amount:,.2f}")
+    emit(html, "panel_end")
+
+
+def render_trend(html, text, section):
+    """7-day sparkline with min/avg/max."""
+    emit(html, "trend", **section)
+    text.append("")
+    text.append(f"7-Day Trend: {section['sparkline']}")
+    text.append(f"  Min: ${section['low']:,.2f} | Avg: ${section['avg']:,.2f} | Max: ${section['high']:,.2f}")
+
+
+def render_table(html, text, section):
+    """Cost table with an optional % of total column; rows at or below $0.001 are left out."""
+    title, total = section["title"], section["total"]
+    rows = [(k, v) for k, v in section["rows"] if v > 0.001]
+    text.append("")
+    text.append(title)
+    if not rows:
+        emit(html, "table_empty", title=title)
+        text.append("  No charges for this period.")
+        return
+
+    show_pct = total > 0
+    emit(
+        html, "table_start", title=title, label=section.get("label", "Service"),
+        pct_header_html=fill("pct_header") if show_pct else "",
+    )
+    width = min(max(5, *(len(k) for k, _ in rows)), 60)
+    for k, v in rows:
+        if show_pct:
+            pct = v / total * 100
+            emit(html, "row_pct", name=k, amount=v, pct=pct)
+            text.append(f"  {k:<{width}}  {f'${v:,.2f}':>12}  {pct:>5.1f}%")
+        else:
+            emit(html, "row", name=k, amount=v)
+            text.append(f"  {k:<{width}}  {f'${v:,.2f}':>12}")
+    emit(html, "table_end", total=total, pct_total_html=fill("pct_total") if show_pct else "")
+    text.append(f"  {'Total':<{width}}  {f'${total:,.2f}':>12}")
+
+
+def render_insights(html, text, section):
+    """Quick insights as (label, detail) bullets."""
+    emit(html, "insights_start")
+    text.append("")
+    text.append("Quick Insights")
+    for label, detail in section:
+        emit(html, "insight", label=label, detail=detail)
+        text.append(f"  - {label}: {detail}")
+    emit(html, "insights_end")
+
+
+def render_footer(html, text, section):
+    """Archive location and generation time; closes the document."""
+    emit(html, "archive", location=section["location"], formats=section["formats"])
+    emit(html, "foot", generated=section["generated"])
+    text.append("")
+    text.append(f"Archive: {section['location']}")
+    text.append(f"Generated by AWS Cost Alerting System - {section['generated']}")
+
+
+SECTION_RENDERERS = {
+    "header": render_header,
+    "cards": render_cards,
+    "notice": render_notice,
+    "budget": render_budget,
+    "lines": render_lines,
+    "trend": render_trend,
+    "table": render_table,
+    "insights": render_insights,
+    "footer": render_footer,
+}
+
+
+def parse_recipients(report_to):
+    """
+    Recipient list from one address, a list, or a string of addresses
+    separated by commas, semicolons or whitespace; duplicates are dropped.
+    """
+    values = report_to if isinstance(report_to, list) else [report_to]
+    recipients = {}
+    for value in values:
+        for address in value.replace(";", ",").replace(" ", ",").replace("\n", ",").split(","):
+            address = address.strip()
+            if address:
+                recipients.setdefault(address.lower(), address)
+    return list(recipients.values())
+
+
+def csv_attachments(artifacts):
+    """(filename, bytes) for the archive's CSV artifacts; spool files are read from the start and rewound."""
+    attachments = []
+    for key, body, ctype in artifacts:
+        if ctype != "text/csv":
+            continue
+        if hasattr(body, "read"):
+            body.seek(0)
+            data = body.read()
+            body.seek(0)
+        else:
+            data = body
+        attachments.append((key.rsplit("/", 1)[-1], data))
+    return attachments
+
+
+def build_message(report_from, subject, html_body, text_body, attachments=()):
+    """
+    Render the email once as MIME bytes: text and HTML alternatives plus
+    optional (filename, bytes) CSV attachments, up to EMAIL_ATTACHMENT_MAX_BYTES
+    in total. There is no To header; send_raw adds one per batch, so the
+    message is never rebuilt per recipient.
+    """
+    msg = EmailMessage()
+    msg["From"] = report_from
+    msg["Subject"] = subject
+    msg.set_content(text_body)
+    msg.add_alternative(html_body, subtype="html")
+    attached = 0
+    for filename, data in attachments:
+        if attached + len(data) > EMAIL_ATTACHMENT_MAX_BYTES:
+            logger.warning(f"Not attaching {filename} ({len(data)} bytes): over the {EMAIL_ATTACHMENT_MAX_BYTES}-byte limit")
+            continue
+        attached += len(data)
+        msg.add_attachment(data, maintype="text", subtype="csv", filename=filename)
+    return msg.as_bytes(policy=SMTP)
+
+
+def ses_send_rate():
+    """Messages per second SES allows this account (GetSendQuota), looked up once per container."""
+    global _ses_send_rate
+    if _ses_send_rate is None:
+        try:
+            _ses_send_rate = float(call_aws("ses", "get_send_quota")["MaxSendRate"])
+            logger.info(f"SES maximum send rate: {_ses_send_rate}/s")
+        except Exception as e:
+            logger.warning(f"Failed to get SES send quota, assuming {SES_DEFAULT_SEND_RATE}/s: {e}")
+            return SES_DEFAULT_SEND_RATE
+    return _ses_send_rate
+
+
+def send_raw(report_from, recipients, raw):
+    """
+    Deliver pre-rendered MIME bytes (build_message) to recipients.
+
+    Recipients go EMAIL_BATCH_SIZE to a SendRawEmail call, EMAIL_MAX_CONCURRENCY
+    calls at a time. When more than one call is needed they are paced to the
+    account's SES send rate, where each recipient counts as one message. Only
+    throttled sends are retried, since after a timeout or server error SES may
+    have sent the email. A batch that SES rejects is retried one recipient at a
+    time, so a bad address only fails itself. Returns {"message_ids", "sent", "failed": {address: error}};
+    raises if no recipient could be reached.
+    """
+    if not recipients:
+        raise ValueError("No email recipients configured")
+    batches = [recipients[i:i + EMAIL_BATCH_SIZE] for i in range(0, len(recipients), EMAIL_BATCH_SIZE)]
+    if len(batches) > 1:
+        set_rate_limit("ses", ses_send_rate())
+    logger.info(f"Sending {len(raw)}-byte email from {report_from} to {len(recipients)} recipient(s) in {len(batches)} batch(es)")
+
+    message_ids = []
+    failed = {}
+    lock = threading.Lock()
+
+    def deliver(batch):
+        try:
+            with timed("send_raw_email", len(raw)):
+                resp = call_aws(
+                    "ses",
+                    "send_raw_email",
+                    weight=len(batch),
+                    idempotent=False,
+                    Source=report_from,
+                    Destinations=batch,
+                    RawMessage={"Data": b"To: " + ", ".join(batch).encode("utf-8") + b"\r\n" + raw},
+                )
+            with lock:
+                message_ids.append(resp["MessageId"])
+        except Exception as e:
+            code = e.response.get("Error", {}).get("Code", "") if isinstance(e, ClientError) else ""
+            if len(batch) > 1 and code and code not in THROTTLE_CODES | TRANSIENT_CODES:
+                logger.warning(f"SES rejected a batch of {len(batch)} ({code}), sending to each recipient separately")
+                for address in batch:
+                    deliver([address])
+                return
+            logger.error(f"Failed to send email to {', '.join(batch)}: {e}")
+            with lock:
+                failed.update({address: str(e) for address in batch})
+
+    run_parallel(
+        {f"email-{i}": (lambda batch=batch: deliver(batch)) for i, batch in enumerate(batches)},
+        max_workers=EMAIL_MAX_CONCURRENCY,
+    )
+
+    sent = len(recipients) - len(failed)
+    put_metric("EmailSent", sent)
+    if failed:
+        put_metric("EmailFailed", len(failed))
+    if not sent:
+        raise RuntimeError(f"Email could not be delivered to any of {len(recipients)} recipient(s)")
+    logger.info(f"Email sent to {sent}/{len(recipients)} recipient(s) - SES MessageIds: {', '.join(message_ids)}")
+    return {"message_ids": message_ids, "sent": sent, "failed": failed}
+
+
+def send_email(report_from, report_to, subject, html_body, text_body, attachments=()):
+    """
+    Send the report via SES with both HTML and plain text for better deliverability.
+    report_to is one address, a list, or a comma-separated string; the MIME
+    message is built once and delivered by send_raw.
+    """
     logger.info(f"Subject: {subject}")
-    
+    with timed("build_message"):
+        raw = build_message(report_from, subject, html_body, text_body, attachments)
+    return send_raw(report_from, parse_recipients(report_to), raw)
+
+
+def summarize_day(by_day, report_day: date, include_mtd=True):
+    """
+    Derive the day's service rows, DoD/WoW comparisons, 7-day trend and
+    (optionally) MTD from a daily SERVICE index covering the needed window.
+    """
+    end = report_day + timedelta(days=1)
+
+    # Report day's costs by service
+    y_rows, y_total = rows_for_days(by_day, report_day, end)
+
+    # Day before for comparison
+    day_before = report_day - timedelta(days=1)
+    _, prev_total = rows_for_days(by_day, day_before, report_day)
+    dod_change, dod_arrow = calculate_change(y_total, prev_total)
+
+    # Same day last week for comparison
+    week_ago = report_day - timedelta(days=7)
+    _, wow_total = rows_for_days(by_day, week_ago, week_ago + timedelta(days=1))
+    wow_change, wow_arrow = calculate_change(y_total, wow_total)
+
+    # 7-day trend for sparkline
+    daily_costs = daily_totals_for(by_day, end - timedelta(days=7), end)
+
+    # Month-to-date (from first day of month through the report day, inclusive)
+    mtd_rows, mtd_total = rows_for_days(by_day, report_day.replace(day=1), end) if include_mtd else ([], 0.0)
+
+    anomalies = detect_anomalies(by_day, report_day) if ANOMALY_DETECTION else []
+    forecast = forecast_month(by_day, report_day) if LOCAL_FORECAST else None
+
+    return {
+        "date": report_day,
+        "y_rows": y_rows,
+        "y_total": y_total,
+        "prev_total": prev_total,
+        "dod_change": dod_change,
+        "dod_arrow": dod_arrow,
+        "wow_total": wow_total,
+        "wow_change": wow_change,
+        "wow_arrow": wow_arrow,
+        "daily_costs": daily_costs,
+        "sparkline": generate_sparkline(daily_costs),
+        "mtd_rows": mtd_rows,
+        "mtd_total": mtd_total,
+        "anomalies": anomalies,
+        "forecast": forecast,
+    }
+
+
+def report_prefix(report_day: date):
+    """Archive prefix for one report day."""
+    return f"reports/{report_day.year}/{report_day.month:02d}/{report_day.day:02d}/"
+
+
+def day_artifacts(prefix, report_day: date, y_raw, y_rows, mtd_raw=None, mtd_rows=None, d_raw=None, d_by_usage_type=None):
+    """
+    Archive artifacts (key, body, content_type) for one report day; bodies are bytes or files.
+    Which files are written follows ARCHIVE_FORMATS. The columnar format adds one
+    .col.gz file per view plus a manifest.json describing them. Drivers are
+    included when d_by_usage_type is given (d_raw is only needed for JSON).
+    """
+    end = report_day + timedelta(days=1)
+    views = [("daily_by_service", "service", y_raw, y_rows, report_day)]
+    if mtd_raw is not None:
+        views.append(("mtd_by_service", "service", mtd_raw, mtd_rows, report_day.replace(day=1)))
+
+    artifacts = []
+    manifest = {}
+    for name, key_header, raw, rows, start in views:
+        if "json" in ARCHIVE_FORMATS:
+            artifacts.append((f"{prefix}{name}.json", json.dumps(raw).encode("utf-8"), "application/json"))
+        if "csv" in ARCHIVE_FORMATS:
+            artifacts.append((f"{prefix}{name}.csv", csv_file([key_header, "amount_usd"], rows), "text/csv"))
+        if "columnar" in ARCHIVE_FORMATS:
+            dimension = raw["GroupDefinitions"][-1]["Key"] if raw.get("GroupDefinitions") else "SERVICE"
+            body, manifest[f"{name}.col.gz"] = encode_columnar(raw_groups(raw), dimension, start, end)
+            artifacts.append((f"{prefix}{name}.col.gz", body, "application/gzip"))
+
+    if d_by_usage_type is not None:
+        if "json" in ARCHIVE_FORMATS and d_raw is not None:
+            if isinstance(d_raw, dict):
+                d_raw = json.dumps(d_raw).encode("utf-8")
+            artifacts.append((prefix + "daily_drivers_usage_type.json", d_raw, "application/json"))
+        if "csv" in ARCHIVE_FORMATS:
+            artifacts.append((
+                prefix + "daily_drivers_usage_type.csv",
+                csv_file(["usage_type", "amount_usd"], top_rows(d_by_usage_type)),
+                "text/csv",
+            ))
+        if "columnar" in ARCHIVE_FORMATS:
+            day = report_day.isoformat()
+            body, manifest["daily_drivers_usage_type.col.gz"] = encode_columnar(
+                ((day, k, v) for k, v in d_by_usage_type.items()), "USAGE_TYPE", report_day, end
+            )
+            artifacts.append((prefix + "daily_drivers_usage_type.col.gz", body, "application/gzip"))
+
+    if manifest:
+        doc = {"format": COLUMNAR_FORMAT, "date": report_day.isoformat(), "files": manifest}
+        artifacts.append((prefix + "manifest.json", json.dumps(doc, indent=2).encode("utf-8"), "application/json"))
+    return artifacts
+
+
+def upload_artifacts(bucket, artifacts):
+    """Upload (key, body, content_type) artifacts to S3 concurrently."""
+    run_parallel({
+        key: (lambda key=key, body=body, ctype=ctype: put_s3(bucket, key, body, ctype))
+        for key, body, ctype in artifacts
+    })
+
+
+def render_report(report):
+    """
+    Render the email HTML, plain-text body and subject for one report day.
+    report holds the summarize_day keys plus regional_rows, budget_info,
+    aws_forecast, d_rows, d_total, top_n, include_mtd, include_drivers,
+    bucket and prefix, and optionally account (a linked account label),
+    region_services (see top_services_by) and warnings. It is turned into a
+    list of sections, and each section renderer writes its HTML and text
+    together, so both bodies come from one pass.
+    """
+    start = report["date"]
+    date_label = start.isoformat()
+    y_rows, y_total = report["y_rows"], report["y_total"]
+    prev_total, wow_total = report["prev_total"], report["wow_total"]
+    dod_change, dod_arrow = report["dod_change"], report["dod_arrow"]
+    wow_change, wow_arrow = report["wow_change"], report["wow_arrow"]
+    daily_costs, sparkline = report["daily_costs"], report["sparkline"]
+    mtd_rows, mtd_total = report["mtd_rows"], report["mtd_total"]
+    regional_rows = report["regional_rows"]
+    budget_info, aws_forecast = report["budget_info"], report["aws_forecast"]
+    d_rows, d_total = report["d_rows"], report["d_total"]
+    top_n = report["top_n"]
+    include_mtd, include_drivers = report["include_mtd"], report["include_drivers"]
+    bucket, prefix = report["bucket"], report["prefix"]
+    account = report.get("account")
+    warnings = report.get("warnings", [])
+    anomalies = report.get("anomalies", [])
+    forecast = report.get("forecast") if include_mtd else None
+
+    # Calculate daily average for context
+    days_in_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    days_elapsed = start.day
+    daily_avg = mtd_total / days_elapsed if days_elapsed > 0 and include_mtd else 0
+    if forecast:
+        # Local forecast: MTD actuals plus the fitted rest of the month, with an 80% range
+        projected_monthly = mtd_total + forecast["remaining"]
+        projected_low = mtd_total + max(0.0, forecast["remaining"] - forecast["half_width"])
+        projected_high = projected_monthly + forecast["half_width"]
+        projected_label = f"${projected_monthly:,.2f} (${projected_low:,.2f} – ${projected_high:,.2f})"
+        projected_basis = f"80% range; weekday-adjusted trend of the last {forecast['history_days']} days"
+    else:
+        projected_monthly = daily_avg * days_in_month.day if include_mtd else 0
+        projected_label = f"${projected_monthly:,.2f}"
+        projected_basis = f"based on {days_elapsed}-day average"
+
+    sections = [("header", {"date": date_label, "weekday": start.strftime("%A"), "account": account})]
+
+    # Summary cards
+    cards = [{
+        "accent": "#667eea",
+        "label": "Yesterday's Total",
+        "value": y_total,
+        "details": [
+            ("vs. day before", {"color": change_color(dod_change), "arrow": dod_arrow, "pct": abs(dod_change)}),
+            ("vs. week ago", {"color": change_color(wow_change), "arrow": wow_arrow, "pct": abs(wow_change)}),
+        ],
+    }]
+    if include_mtd:
+        cards.append({
+            "accent": "#764ba2",
+            "label": f"Month-to-Date ({days_elapsed} days)",
+            "value": mtd_total,
+            "details": [("Daily avg", f"${daily_avg:,.2f}"), ("Projected", projected_label)],
+        })
+    sections.append(("cards", cards))
+
+    # Sections left out because their data could not be fetched
+    if warnings:
+        sections.append(("notice", warnings))
+
+    # Budget progress bar: uses the Cost Explorer MTD total, not the Budgets API actual, for consistency
+    if budget_info and include_mtd:
+        budget_limit = budget_info["limit"]
+        utilization = (mtd_total / budget_limit * 100) if budget_limit > 0 else 0
+        # Prefer the local forecast (same figure as the MTD card), then Cost Explorer, then Budgets
+        if forecast:
+            forecasted_spend = projected_monthly
+        else:
+            forecasted_spend = aws_forecast if aws_forecast is not None else budget_info.get("forecasted", 0)
+        sections.append(("budget", {
+            "name": budget_info["name"],
+            "actual": mtd_total,
+            "limit": budget_limit,
+            "utilization": utilization,
+            "width": min(utilization, 100),
+            "color": "#28a745" if utilization < 80 else ("#ffc107" if utilization < 100 else "#dc3545"),
+            "forecasted": forecasted_spend,
+            "cross_check": f" (AWS: ${aws_forecast:,.2f})" if forecast and aws_forecast is not None else "",
+        }))
+
+    if anomalies:
+        lines = []
+        for a in anomalies[:ANOMALY_MAX_ROWS]:
+            arrow = "↑" if a["change"] > 0 else "↓"
+            pct = f"{arrow} {abs(a['pct']):.0f}%" if a["pct"] is not None else "new"
+            lines.append((a["service"], a["cost"], f"usually ${a['baseline']:,.2f}, {pct}"))
+        sections.append(("lines", {
+            "title": f"🚨 Anomalies (vs. {ANOMALY_LOOKBACK_DAYS}-day median)", "lines": lines, "alert": True,
+        }))
+
+    if daily_costs and sparkline:
+        costs = [d["cost"] for d in daily_costs]
+        sections.append(("trend", {
+            "sparkline": sparkline, "low": min(costs), "avg": sum(costs) / len(costs), "high": max(costs),
+        }))
+
+    # Service breakdown tables
+    sections.append(("table", {"title": f"Yesterday by Service (Top {top_n})", "rows": y_rows[:top_n], "total": y_total}))
+    if include_mtd:
+        sections.append((
+            "table", {"title": f"Month-to-Date by Service (Top {top_n})", "rows": mtd_rows[:top_n], "total": mtd_total}
+        ))
+
+    # Per-service month-end forecast
+    if forecast and forecast["services"] and mtd_rows:
+        lines = []
+        for service, mtd_cost in mtd_rows[:top_n]:
+            svc_remaining, svc_half_width = forecast["services"].get(service, (0.0, 0.0))
+            low = mtd_cost + max(0.0, svc_remaining - svc_half_width)
+            high = mtd_cost + svc_remaining + svc_half_width
+            lines.append((service, mtd_cost + svc_remaining, f"${low:,.2f} – ${high:,.2f}"))
+        sections.append(("lines", {"title": f"🔮 Month-End Forecast by Service (Top {top_n})", "lines": lines}))
+
+    if regional_rows:
+        sections.append((
+            "lines",
+            {"title": "🌎 Cost by Region (Yesterday)", "lines": [(r, cost, None) for r, cost in regional_rows[:5]]},
+        ))
+    region_services = report.get("region_services")
+    if region_services and regional_rows:
+        lines = []
+        for region, region_cost in regional_rows[:5]:
+            for service, cost in region_services.get(region, []):
+                lines.append((f"{region} · {service}", cost, f"{cost / region_cost * 100:.0f}% of region"))
+        if lines:
+            sections.append((
+                "lines", {"title": f"🧭 Top Services per Region (Yesterday, Top {REGION_TOP_SERVICES})", "lines": lines},
+            ))
+
+    if include_drivers:
+        sections.append((
+            "table",
+            {"title": f"Cost Drivers - Usage Types (Top {top_n})", "rows": d_rows, "total": d_total, "label": "Usage Type"},
+        ))
+
+    # Quick insights
+    insights = [("Top cost driver", f"{y_rows[0][0]} (${y_rows[0][1]:,.2f})" if y_rows else "N/A")]
+    if anomalies:
+        insights.append((
+            "Anomalies", f"{len(anomalies)} service(s) outside their usual range, led by {anomalies[0]['service']}"
+        ))
+    if prev_total > 0:
+        trend = "Increased" if dod_change > 5 else "Decreased" if dod_change < -5 else "Stable"
+        insights.append(("Day-over-day", f"{trend} ({dod_arrow} {abs(dod_change):.1f}%)"))
+    if wow_total > 0:
+        trend = "Increased" if wow_change > 5 else "Decreased" if wow_change < -5 else "Stable"
+        insights.append(("Week-over-week", f"{trend} ({wow_arrow} {abs(wow_change):.1f}%)"))
+    if budget_info and include_mtd:
+        insights.append((
+            "Budget utilization",
+            f"{(mtd_total / budget_info['limit'] * 100):.1f}% of ${budget_info['limit']:,.2f} monthly budget "
+            f"(${mtd_total:,.2f} spent)",
+        ))
+    if include_mtd:
+        insights.append(("On track for", f"{projected_label} this month ({projected_basis})"))
+    sections.append(("insights", insights))
+
+    sections.append(("footer", {
+        "location": f"s3://{bucket}/{prefix}",
+        "formats": ", ".join(f.upper() for f in ("json", "csv", "columnar") if f in ARCHIVE_FORMATS),
+        "generated": datetime.now(TZ).strftime("%Y-%m-%d %H:%M:%S %Z"),
+    }))
+
+    html, text = [], []
+    for kind, section in sections:
+        SECTION_RENDERERS[kind](html, text, section)
+
+    # Use simple ASCII subject with quick summary
+    change_indicator = dod_arrow if dod_change != 0 else ""
+    subject = f"AWS Cost Report - {account + ' - ' if account else ''}{date_label}: ${y_total:,.2f} {change_indicator}"
+
+    return "".join(html), "\n".join(text) + "\n", subject
+
+
+def report_index_key(month_start: date):
+    """Archive bucket object holding the report index for a month."""
+    return f"{REPORT_INDEX_PREFIX}{month_start:%Y-%m}.json"
+
+
+def index_entry(report, prefix, artifacts):
+    """Index entry for one archived report (artifact names are relative to prefix)."""
+    return {
+        "prefix": prefix,
+        "artifacts": sorted(key[len(prefix):] for key, _, _ in artifacts if key.startswith(prefix)),
+        "daily_total": round(report["y_total"], 2),
+        "mtd_total": round(report["mtd_total"], 2) if report["mtd_rows"] else None,
+        "top_services": [[k, round(v, 2)] for k, v in report["y_rows"][:REPORT_INDEX_TOP_SERVICES]],
+    }
+
+
+def read_report_index(bucket, month_start: date):
+    """Return (index, etag) for a month, or (None, None) if it has no index yet."""
     try:
-        # Generate plain text version
-        text_body = html_to_text(html_body)
-        logger.info(f"Generated plain text version (length: {len(text_body)})")
-        
-        logger.info(f"SES client region: {ses.meta.region_name}")
-        logger.info(f"Calling ses.send_email...")
-        
-        response = ses.send_email(
-            Source=report_from,
-            Destination={"ToAddresses": [report_to]},
-            Message={
-                "Subject": {"Data": subject, "Charset": "UTF-8"},
-                "Body": {
-                    "Html": {"Data": html_body, "Charset": "UTF-8"},
-                    "Text": {"Data": text_body, "Charset": "UTF-8"},
-                },
-            },
-        )
-        message_id = response.get("MessageId", "unknown")
-        logger.info(f"Email sent successfully to {report_to} - SES MessageId: {message_id}")
-        put_metric("EmailSent", 1)
-        return message_id
+        with timed("get_report_index"):
+            resp = client("s3").get_object(Bucket=bucket, Key=report_index_key(month_start))
+            index = json.loads(resp["Body"].read())
+        return index, resp["ETag"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None, None
+        raise
+
+
+def write_report_index(bucket, month_start: date, mutate):
+    """
+    Read-modify-write a month's index atomically.
+    mutate(index) edits the index in place. The write is conditional on the
+    object being unchanged since it was read (If-Match on its ETag, or
+    If-None-Match for the first write); on a conflict the index is re-read and
+    mutate applied again, so concurrent runs never drop each other's days.
+    """
+    key = report_index_key(month_start)
+    for attempt in range(1, REPORT_INDEX_MAX_ATTEMPTS + 1):
+        index, etag = read_report_index(bucket, month_start)
+        index = index or {"format": REPORT_INDEX_FORMAT, "month": f"{month_start:%Y-%m}", "days": {}}
+        mutate(index)
+        index["days"] = dict(sorted(index["days"].items()))
+        index["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+        condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        try:
+            with timed("put_report_index"):
+                put_s3_conditional(
+                    condition,
+                    Bucket=bucket,
+                    Key=key,
+                    Body=json.dumps(index).encode("utf-8"),
+                    ContentType="application/json",
+                    ServerSideEncryption="AES256",
+                )
+            logger.info(f"Updated report index s3://{bucket}/{key} ({len(index['days'])} days)")
+            return index
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise
+            logger.info(f"Report index {key} changed concurrently (attempt {attempt}), retrying")
+    raise RuntimeError(f"Could not update report index {key} after {REPORT_INDEX_MAX_ATTEMPTS} attempts")
+
+
+def update_report_index(bucket, entries):
+    """
+    Best-effort merge of {date: entry} into the per-month indexes.
+    An entry's "accounts" map is merged per account instead of replaced.
+    Failures are only logged, since the index can be rebuilt from the bucket.
+    """
+    by_month = {}
+    for day, entry in entries.items():
+        by_month.setdefault(day.replace(day=1), {})[day.isoformat()] = entry
+
+    def merge(index, days):
+        for day, entry in days.items():
+            current = index["days"].setdefault(day, {})
+            accounts = {**current.get("accounts", {}), **entry.get("accounts", {})}
+            current.update(entry)
+            if accounts:
+                current["accounts"] = accounts
+
+    try:
+        run_parallel({
+            f"{month:%Y-%m}": (lambda month=month, days=days: write_report_index(bucket, month, lambda i: merge(i, days)))
+            for month, days in by_month.items()
+        })
     except Exception as e:
-        logger.error(f"Failed to send email: {e}", exc_info=True)
-        logger.error(f"Error type: {type(e).__name__}")
-        logger.error(f"Error details: {str(e)}")
-        put_metric("EmailFailed", 1)
+        logger.warning(f"Failed to update report index (it can be rebuilt with a rebuild_index event): {e}")
+
+
+def run_marker_key(report_day: date):
+    """Archive bucket object tracking one report day's run."""
+    return f"{RUN_STATE_PREFIX}{report_day:%Y/%m/%d}/run.json"
+
+
+def run_email_key(report_day: date):
+    """MIME message archived by the archive phase, so a retry can send it without re-fetching."""
+    return f"{RUN_STATE_PREFIX}{report_day:%Y/%m/%d}/email.eml"
+
+
+def read_run_marker(bucket, report_day: date):
+    """Return (marker, etag) for a report day, or (None, None) if no run has claimed it."""
+    try:
+        with timed("get_run_marker"):
+            resp = client("s3").get_object(Bucket=bucket, Key=run_marker_key(report_day))
+            marker = json.loads(resp["Body"].read())
+        return marker, resp["ETag"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None, None
         raise
 
 
+def write_run_marker(bucket, report_day: date, marker, etag):
+    """
+    Write a run marker if it is unchanged since it was read (If-Match on etag,
+    or If-None-Match for a new marker). Returns the new ETag, or None if
+    another invocation wrote it first.
+    """
+    marker["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+    try:
+        with timed("put_run_marker"):
+            resp = put_s3_conditional(
+                condition,
+                Bucket=bucket,
+                Key=run_marker_key(report_day),
+                Body=json.dumps(marker).encode("utf-8"),
+                ContentType="application/json",
+                ServerSideEncryption="AES256",
+            )
+        return resp["ETag"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("PreconditionFailed", "ConditionalRequestConflict"):
+            raise
+        return None
+
+
+def claim_run(bucket, report_day: date, owner, lease_seconds, force=False):
+    """
+    Take ownership of report_day's run in the archive bucket.
+
+    Returns (marker, etag) when this invocation should go ahead; marker["phase"]
+    is the phase to resume from: "fetch", or "email" when an earlier attempt
+    archived everything but did not get the email out. Returns (marker, None)
+    when there is nothing to do: the day is "done" (unless force), or another
+    invocation holds an unexpired lease. The claim is a conditional write, so
+    of two racing invocations only one proceeds.
+    """
+    for attempt in range(1, REPORT_INDEX_MAX_ATTEMPTS + 1):
+        marker, etag = read_run_marker(bucket, report_day)
+        now = datetime.now(timezone.utc)
+        if marker is not None:
+            if marker["phase"] == "done":
+                if not force:
+                    return marker, None
+            elif marker["owner"] != owner and datetime.fromisoformat(marker["lease_until"]) > now:
+                return marker, None
+
+        resume = "email" if marker is not None and marker["phase"] == "email" else "fetch"
+        claimed = {
+            **(marker or {}),
+            "date": report_day.isoformat(),
+            "phase": resume,
+            "owner": owner,
+            "lease_until": (now + timedelta(seconds=lease_seconds)).isoformat(timespec="seconds"),
+            "attempts": (marker or {}).get("attempts", 0) + 1,
+        }
+        new_etag = write_run_marker(bucket, report_day, claimed, etag)
+        if new_etag:
+            return claimed, new_etag
+        logger.info(f"Run marker for {report_day} changed concurrently (attempt {attempt}), re-reading")
+    raise RuntimeError(f"Could not claim the run for {report_day} after {REPORT_INDEX_MAX_ATTEMPTS} attempts")
+
+
+def release_run(bucket, report_day: date, marker, etag):
+    """After a failed attempt, expire this invocation's lease so a retry can take over at once (best-effort)."""
+    marker["lease_until"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    try:
+        if write_run_marker(bucket, report_day, marker, etag) is None:
+            logger.warning(f"Run marker for {report_day} changed before the lease could be released")
+    except Exception as e:
+        logger.warning(f"Failed to release the run lease for {report_day}: {e}")
+
+
+def advance_run(bucket, report_day: date, marker, etag, phase, **fields):
+    """Record that the run reached phase; fails if another invocation has taken the run over."""
+    marker.update(fields, phase=phase)
+    new_etag = write_run_marker(bucket, report_day, marker, etag)
+    if new_etag is None:
+        raise RuntimeError(f"Run for {report_day} was taken over by another invocation before phase {phase}")
+    logger.info(f"Run for {report_day} is at phase {phase}")
+    return new_etag
+
+
+def read_archived_view(read, prefix, view):
+    """
+    Aggregated {key: amount} of one archived view under prefix, or None if it was not archived.
+    read(key) returns an object's bytes or None, so the archive can be S3 or a local copy.
+    The columnar file is preferred, then the raw Cost Explorer JSON, then the CSV.
+    """
+    def columnar(body):
+        return ((key, amount) for _, key, amount in decode_columnar(body)[1])
+
+    def raw_json(body):
+        return ((key, amount) for _, key, amount in raw_groups(json.loads(body)))
+
+    def csv_rows(body):
+        rows = csv.reader(io.StringIO(body.decode("utf-8")))
+        next(rows, None)  # header
+        return ((row[0], float(row[1])) for row in rows)
+
+    for suffix, parse in ((".col.gz", columnar), (".json", raw_json), (".csv", csv_rows)):
+        body = read(f"{prefix}{view}{suffix}")
+        if body is not None:
+            groups = parse(body)
+            break
+    else:
+        return None
+
+    agg = {}
+    for key, amount in groups:
+        agg[key] = agg.get(key, 0.0) + amount
+    return agg
+
+
+def rebuild_report_index(bucket, month_start: date):
+    """
+    Rebuild a month's index from what is archived under reports/YYYY/MM/,
+    replacing its days (per-account reports are picked up from accounts/<id>/).
+    Returns the number of indexed days.
+    """
+    def rebuild(index):
+        names_by_prefix = {}
+        paginator = client("s3").get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=f"reports/{month_start.year}/{month_start.month:02d}/"):
+            for obj in page.get("Contents", []):
+                prefix, _, name = obj["Key"].rpartition("/")
+                names_by_prefix.setdefault(prefix + "/", set()).add(name)
+
+        def load_entry(prefix, names):
+            def read(key):
+                if key.rpartition("/")[2] not in names:
+                    return None
+                return client("s3").get_object(Bucket=bucket, Key=key)["Body"].read()
+
+            y_costs = read_archived_view(read, prefix, "daily_by_service")
+            if y_costs is None:
+                return None
+            mtd_rows = top_rows(read_archived_view(read, prefix, "mtd_by_service") or {})
+            y_rows = top_rows(y_costs)
+            report = {
+                "y_rows": y_rows,
+                "y_total": sum(v for _, v in y_rows),
+                "mtd_rows": mtd_rows,
+                "mtd_total": sum(v for _, v in mtd_rows),
+            }
+            return index_entry(report, prefix, [(prefix + n, None, None) for n in names])
+
+        loaded = run_parallel({
+            prefix: (lambda prefix=prefix, names=names: load_entry(prefix, names))
+            for prefix, names in names_by_prefix.items()
+        })
+        days = {}
+        for prefix, entry in sorted(loaded.items()):
+            if entry is None:
+                continue
+            parts = prefix.split("/")  # reports/YYYY/MM/DD/[accounts/ID/]
+            day = date(int(parts[1]), int(parts[2]), int(parts[3])).isoformat()
+            if len(parts) == 7 and parts[4] == "accounts":
+                days.setdefault(day, {}).setdefault("accounts", {})[parts[5]] = entry
+            elif len(parts) == 5:
+                days.setdefault(day, {}).update(entry)
+        index["days"] = days
+
+    index = write_report_index(bucket, month_start, rebuild)
+    return len(index["days"])
+
+
+def replay_report(read, report_day: date, top_n=10, bucket="archive"):
+    """
+    Re-render one day's report from its archived views: no Cost Explorer calls, no email.
+    read(key) returns an archive object's bytes or None (see read_archived_view).
+    Comparisons, the 7-day trend and anomalies come from the previous days' archives;
+    regional rows, budget status and forecasts are not archived and are left out.
+    Returns (html, text, subject) like render_report.
+    """
+    by_day = {}
+    for i in range((ANOMALY_LOOKBACK_DAYS if ANOMALY_DETECTION else 7) + 1):
+        day = report_day - timedelta(days=i)
+        costs = read_archived_view(read, report_prefix(day), "daily_by_service")
+        if costs is not None:
+            by_day[day.isoformat()] = costs
+    if report_day.isoformat() not in by_day:
+        raise ValueError(f"No archived report for {report_day}")
+
+    prefix = report_prefix(report_day)
+    report = summarize_day(by_day, report_day, include_mtd=False)
+    mtd = read_archived_view(read, prefix, "mtd_by_service")
+    if mtd is not None:
+        report["mtd_rows"] = top_rows(mtd)
+        report["mtd_total"] = sum(v for _, v in report["mtd_rows"])
+    drivers = read_archived_view(read, prefix, "daily_drivers_usage_type")
+
+    report.update(
+        regional_rows=[],
+        budget_info=None,
+        aws_forecast=None,
+        d_rows=top_rows(drivers or {}, top_n),
+        d_total=sum(v for v in (drivers or {}).values() if v > 0),
+        top_n=top_n,
+        include_mtd=mtd is not None,
+        include_drivers=drivers is not None,
+        bucket=bucket,
+        prefix=prefix,
+    )
+    return render_report(report)
+
+
+def existing_report_days(bucket, first: date, last: date):
+    """
+    Report days in [first, last] that are already archived.
+    Uses the month's report index (one GET) and falls back to listing the
+    month's prefix when no index exists yet.
+    """
+    found = set()
+    month = first.replace(day=1)
+    while month <= last:
+        index, _ = read_report_index(bucket, month)
+        if index is not None:
+            found.update(date.fromisoformat(d) for d, entry in index["days"].items() if "daily_total" in entry)
+        else:
+            paginator = client("s3").get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=bucket, Prefix=f"reports/{month.year}/{month.month:02d}/"):
+                for obj in page.get("Contents", []):
+                    parts = obj["Key"].split("/")
+                    if len(parts) == 5 and parts[4] in ("daily_by_service.json", "daily_by_service.col.gz"):
+                        found.add(date(int(parts[1]), int(parts[2]), int(parts[3])))
+        month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return {d for d in found if first <= d <= last}
+
+
+def run_backfill(spec, cfg):
+    """
+    Regenerate archived reports for every day in [spec["start"], spec["end"]] (inclusive).
+
+    The whole range is fetched with one wide query per dimension (SERVICE,
+    REGION and, if enabled, USAGE_TYPE; the COST_CUBE_DIMENSION one comes out
+    of the SERVICE window instead) and fanned out in memory, one report
+    day per worker. Days that already have an archive are skipped unless
+    spec["overwrite"] is true; emails are only sent with spec["send_email"].
+    Budget status and forecasts describe "now", so they are left out.
+    A day that fails is reported under "failed"; the others are still
+    written and indexed. Ranges longer than BACKFILL_MAX_DAYS are rejected.
+    """
+    bucket = cfg[PARAM_ARCHIVE_BUCKET]
+    top_n = int(cfg[PARAM_TOP_N_SERVICES])
+    include_mtd = to_bool(cfg[PARAM_INCLUDE_MTD])
+    include_drivers = to_bool(cfg[PARAM_INCLUDE_DRIVERS])
+    send = bool(spec.get("send_email", False))
+
+    first = date.fromisoformat(spec["start"])
+    last = date.fromisoformat(spec["end"])
+    latest = datetime.now(TZ).date() - timedelta(days=1)
+    if first > last or last > latest:
+        raise ValueError(f"Backfill range must satisfy start <= end <= {latest}: {first} - {last}")
+    if (last - first).days + 1 > BACKFILL_MAX_DAYS:
+        raise ValueError(f"Backfill range {first} - {last} is longer than {BACKFILL_MAX_DAYS} days; split it up")
+
+    all_days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    existing = set() if spec.get("overwrite") else existing_report_days(bucket, first, last)
+    days = [d for d in all_days if d not in existing]
+    logger.info(f"Backfill {first} - {last}: {len(days)} day(s) to write, {len(existing)} already archived")
+    if not days:
+        return {
+            "ok": True, "mode": "backfill", "written": [], "failed": [],
+            "skipped": sorted(d.isoformat() for d in existing),
+        }
+
+    # Wide fetch: one window covering every day's comparisons, trend and month start
+    end = days[-1] + timedelta(days=1)
+    window_start, _ = plan_cost_window(days[0])
+    fetch_tasks = {"service_window": lambda: fetch_daily_by_service(window_start, end, bucket, cube_start=days[0])}
+    if COST_CUBE_DIMENSION != "REGION":
+        fetch_tasks["regional"] = lambda: daily_grouped_costs(days[0], end, "REGION", label=region_label)
+    if include_drivers and COST_CUBE_DIMENSION != "USAGE_TYPE":
+        fetch_tasks["drivers"] = lambda: daily_grouped_costs(days[0], end, "USAGE_TYPE")
+    fetched = run_parallel(fetch_tasks)
+    by_day, window_raw, cube = fetched["service_window"]
+    cube_by_day = {day_str: cube_marginal(cells, 0) for day_str, cells in cube.items()}
+    regional_by_day = cube_by_day if COST_CUBE_DIMENSION == "REGION" else fetched["regional"]
+    drivers_by_day = cube_by_day if COST_CUBE_DIMENSION == "USAGE_TYPE" else fetched.get("drivers", {})
+
+    def write_day(day):
+        try:
+            day_end = day + timedelta(days=1)
+            report = summarize_day(by_day, day, include_mtd)
+            prefix = report_prefix(day)
+            d_by_usage_type = drivers_by_day.get(day.isoformat(), {})
+            d_rows = top_rows(d_by_usage_type, top_n)
+            artifacts = day_artifacts(
+                prefix,
+                day,
+                service_raw(slice_raw(window_raw, day, day_end)),
+                report["y_rows"],
+                service_raw(slice_raw(window_raw, day.replace(day=1), day_end)) if include_mtd else None,
+                report["mtd_rows"],
+                rows_to_raw(top_rows(d_by_usage_type), day, day_end, "USAGE_TYPE") if include_drivers else None,
+                d_by_usage_type if include_drivers else None,
+            )
+            for key, body, ctype in artifacts:
+                put_s3(bucket, key, body, ctype)
+            entry = index_entry(report, prefix, artifacts)
+
+            if send:
+                regional = top_rows({k: v for k, v in regional_by_day.get(day.isoformat(), {}).items() if v > 0.001})
+                report.update(
+                    regional_rows=regional,
+                    region_services=(
+                        top_services_by(cube.get(day.isoformat(), {}), [r for r, _ in regional])
+                        if COST_CUBE_DIMENSION == "REGION" else None
+                    ),
+                    budget_info=None,
+                    aws_forecast=None,
+                    d_rows=d_rows,
+                    d_total=sum(v for v in d_by_usage_type.values() if v > 0),
+                    top_n=top_n,
+                    include_mtd=include_mtd,
+                    include_drivers=include_drivers,
+                    bucket=bucket,
+                    prefix=prefix,
+                )
+                with timed("render_report"):
+                    html, text, subject = render_report(report)
+                send_email(
+                    cfg[PARAM_REPORT_FROM], cfg[PARAM_REPORT_TO], f"[Backfill] {subject}", html, text,
+                    csv_attachments(artifacts) if EMAIL_ATTACH_CSV else (),
+                )
+            return entry
+        except Exception as e:
+            logger.error(f"Backfill of {day} failed: {e}", exc_info=True)
+            put_metric("BackfillDayFailed", 1)
+            return None
+
+    results = run_parallel({day.isoformat(): (lambda day=day: write_day(day)) for day in days})
+    entries = {d: entry for d, entry in results.items() if entry is not None}
+    failed = sorted(d for d, entry in results.items() if entry is None)
+    if entries:
+        update_report_index(bucket, {date.fromisoformat(d): entry for d, entry in entries.items()})
+    put_metric("BackfillDaysWritten", len(entries))
+
+    return {
+        "ok": not failed,
+        "mode": "backfill",
+        "written": sorted(entries),
+        "failed": failed,
+        "skipped": sorted(d.isoformat() for d in existing),
+        "daily_totals": {day: entry["daily_total"] for day, entry in sorted(entries.items())},
+        "emails_sent": len(entries) if send else 0,
+    }
+
+
+def load_org_accounts():
+    """Per-account report settings ({account_id: {...}}) from the PARAM_ORG_ACCOUNTS parameter."""
+    if not PARAM_ORG_ACCOUNTS:
+        raise ValueError("Organization mode requires PARAM_ORG_ACCOUNTS")
+    accounts = json.loads(get_params([PARAM_ORG_ACCOUNTS])[PARAM_ORG_ACCOUNTS])
+    for account_id, settings in accounts.items():
+        if not settings.get("report_to"):
+            raise ValueError(f"No report_to configured for linked account {account_id}")
+    return accounts
+
+
+def run_organization(cfg, report_day: date, sent=()):
+    """
+    Send one report per configured linked account from organization-wide queries.
+
+    The SERVICE window is fetched once grouped by LINKED_ACCOUNT+SERVICE
+    (regional and usage-type drivers likewise, for the report day) and split
+    in memory. Each account is then archived under accounts/<id>/, rendered
+    and emailed to its own recipients on the worker pool. A failing account
+    is logged and reported without holding up the others. Accounts in sent
+    (emailed by an earlier attempt of the same day) are skipped.
+    """
+    bucket = cfg[PARAM_ARCHIVE_BUCKET]
+    top_n = int(cfg[PARAM_TOP_N_SERVICES])
+    include_mtd = to_bool(cfg[PARAM_INCLUDE_MTD])
+    include_drivers = to_bool(cfg[PARAM_INCLUDE_DRIVERS])
+    accounts = load_org_accounts()
+    already_sent = sorted(set(accounts) & set(sent))
+    if already_sent:
+        logger.info(f"{len(already_sent)} linked account report(s) already sent for {report_day}, skipping them")
+        accounts = {a: settings for a, settings in accounts.items() if a not in already_sent}
+
+    end = report_day + timedelta(days=1)
+    window_start, _ = plan_cost_window(report_day, include_mtd)
+    fetch_tasks = {
+        "account_window": lambda: fetch_daily_by_account(window_start, end, bucket),
+        "regional": lambda: get_regional_breakdown_by_account(report_day, end),
+    }
+    if include_drivers:
+        fetch_tasks["drivers"] = lambda: costs_by_account(report_day, end, "USAGE_TYPE")
+    fetched = run_parallel(fetch_tasks)
+    by_account, window_raw = fetched["account_window"]
+    warnings = []
+    if fetched["regional"] is None:
+        warnings.append(REGIONAL_UNAVAILABLE)
+        put_metric("PartialReport", 1)
+
+    unlisted = sorted(set(by_account) - set(accounts))
+    if unlisted:
+        logger.info(f"{len(unlisted)} linked account(s) with spend have no report settings: {', '.join(unlisted)}")
+
+    def report_account(account_id, settings):
+        try:
+            report = summarize_day(by_account.get(account_id, {}), report_day, include_mtd)
+            prefix = f"{report_prefix(report_day)}accounts/{account_id}/"
+            raw = account_raw(window_raw, account_id)
+            d_by_usage_type = fetched.get("drivers", {}).get(account_id, {})
+            artifacts = day_artifacts(
+                prefix,
+                report_day,
+                slice_raw(raw, report_day, end),
+                report["y_rows"],
+                slice_raw(raw, report_day.replace(day=1), end) if include_mtd else None,
+                report["mtd_rows"],
+                rows_to_raw(top_rows(d_by_usage_type), report_day, end, "USAGE_TYPE") if include_drivers else None,
+                d_by_usage_type if include_drivers else None,
+            )
+            for key, body, ctype in artifacts:
+                put_s3(bucket, key, body, ctype)
+            entry = index_entry(report, prefix, artifacts)
+
+            regional = (fetched["regional"] or {}).get(account_id, {})
+            report.update(
+                regional_rows=top_rows({k: v for k, v in regional.items() if v > 0.001}),
+                warnings=warnings,
+                budget_info=account_budget(settings, report["mtd_total"], report_day) if include_mtd else None,
+                aws_forecast=None,
+                d_rows=top_rows(d_by_usage_type, top_n),
+                d_total=sum(v for v in d_by_usage_type.values() if v > 0),
+                top_n=top_n,
+                include_mtd=include_mtd,
+                include_drivers=include_drivers,
+                bucket=bucket,
+                prefix=prefix,
+                account=settings.get("name") or account_id,
+            )
+            with timed("render_report"):
+                html, text, subject = render_report(report)
+            send_email(
+                cfg[PARAM_REPORT_FROM], settings["report_to"], subject, html, text,
+                csv_attachments(artifacts) if EMAIL_ATTACH_CSV else (),
+            )
+            return entry
+        except Exception as e:
+            logger.error(f"Report for linked account {account_id} failed: {e}", exc_info=True)
+            put_metric("AccountReportFailed", 1)
+            return None
+
+    entries = run_parallel({
+        account_id: (lambda account_id=account_id, settings=settings: report_account(account_id, settings))
+        for account_id, settings in accounts.items()
+    })
+    failed = sorted(a for a, entry in entries.items() if entry is None)
+    put_metric("AccountReportsSent", len(entries) - len(failed))
+    update_report_index(bucket, {report_day: {"accounts": {a: e for a, e in entries.items() if e is not None}}})
+
+    return {
+        "ok": not failed,
+        "mode": "organization",
+        "date": report_day.isoformat(),
+        "accounts": {a: entry["daily_total"] for a, entry in sorted(entries.items()) if entry is not None},
+        "failed": failed,
+        "already_sent": already_sent,
+        "unlisted": unlisted,
+    }
+
+
+def fold_baseline(baseline, total):
+    """Fold one settled hourly total into the EWMA baseline {"mean", "var", "hours"}."""
+    if not baseline["hours"]:
+        return {"mean": total, "var": 0.0, "hours": 1}
+    alpha = 2 / (MONITOR_BASELINE_SPAN_HOURS + 1)
+    diff = total - baseline["mean"]
+    return {
+        "mean": baseline["mean"] + alpha * diff,
+        "var": (1 - alpha) * (baseline["var"] + alpha * diff * diff),
+        "hours": baseline["hours"] + 1,
+    }
+
+
+def update_monitor_state(state, fetched, windows, now_hour: datetime, settle_before=None):
+    """
+    Apply freshly fetched hours to the monitor state.
+
+    state is {"through", "recent": {hour: {service: amount}}, "baseline", "alerted_at"}
+    or None. Every hour of the fetched windows ([start, end) pairs) replaces its
+    entry in "recent"; hours before settle_before, if given, are final and move
+    into the baseline. Returns the new state.
+    """
+    recent = dict((state or {}).get("recent", {}))
+    baseline = dict((state or {}).get("baseline") or {"mean": 0.0, "var": 0.0, "hours": 0})
+    for start, end in windows:
+        hour = start
+        while hour < end:
+            key = ce_time(hour)
+            recent[key] = fetched.get(key, {})
+            hour += timedelta(hours=1)
+
+    if settle_before is not None:
+        for key in sorted(k for k in recent if k < ce_time(settle_before)):
+            baseline = fold_baseline(baseline, sum(recent.pop(key).values()))
+
+    return {
+        "through": ce_time(now_hour),
+        "recent": recent,
+        "baseline": baseline,
+        "alerted_at": (state or {}).get("alerted_at"),
+    }
+
+
+def burn_rate(state):
+    """
+    Average hourly cost over the latest MONITOR_BURN_WINDOW_HOURS hours that have
+    data (hours Cost Explorer has not filled in yet read as empty and are skipped).
+    Returns (rate, hours, {service: average}).
+    """
+    recent = state["recent"]
+    hours = [h for h in sorted(recent) if sum(recent[h].values()) > 0][-MONITOR_BURN_WINDOW_HOURS:]
+    if not hours:
+        return 0.0, [], {}
+    by_service = {}
+    for h in hours:
+        for service, amount in recent[h].items():
+            by_service[service] = by_service.get(service, 0.0) + amount / len(hours)
+    return sum(by_service.values()), hours, by_service
+
+
+def burn_alert_reasons(rate, baseline):
+    """Why the burn rate warrants an alert: the absolute threshold, the baseline multiple, or both."""
+    reasons = []
+    if BURN_RATE_THRESHOLD > 0 and rate > BURN_RATE_THRESHOLD:
+        reasons.append(f"above the ${BURN_RATE_THRESHOLD:,.2f}/hour threshold")
+    if (
+        BURN_RATE_MULTIPLIER > 0
+        and baseline["hours"] >= MONITOR_BASELINE_MIN_HOURS
+        and baseline["mean"] > 0
+        and rate > baseline["mean"] * BURN_RATE_MULTIPLIER
+        and rate - baseline["mean"] >= ANOMALY_MIN_DELTA
+    ):
+        reasons.append(f"{rate / baseline['mean']:.1f}x the ${baseline['mean']:,.2f}/hour baseline")
+    return reasons
+
+
+def render_burn_alert(alert):
+    """Short burn-rate alert email from the report's section renderers. Returns (html, text, subject)."""
+    html = []
+    text = []
+    hours = f"{alert['hours'][0]} - {alert['hours'][-1]}" if alert["hours"] else "no recent data"
+    emit(html, "alert_head", title="Cost Burn Rate Alert", subtitle=f"Hours {hours} (UTC)")
+    text.append("AWS COST BURN RATE ALERT")
+    text.append(f"Hours {hours} (UTC)")
+    render_cards(html, text, [
+        {"label": "Burn Rate (per hour)", "value": alert["rate"], "accent": "#dc3545",
+         "details": [("Projected 24h", f"${alert['rate'] * 24:,.2f}")]},
+        {"label": "Baseline (per hour)", "value": alert["baseline"]["mean"], "accent": "#6c757d",
+         "details": [("Settled hours", str(alert["baseline"]["hours"]))]},
+    ])
+    render_lines(html, text, {
+        "title": "⚠️ Why this alert", "alert": True,
+        "lines": [(reason, alert["rate"], "per hour") for reason in alert["reasons"]],
+    })
+    render_table(html, text, {
+        "title": "Services Driving the Burn (avg per hour)",
+        "rows": top_rows(alert["by_service"], REPORT_INDEX_TOP_SERVICES),
+        "total": alert["rate"],
+    })
+    if alert.get("remediation"):
+        text.append("")
+        text.append(f"Remediation triggered: {alert['remediation']}")
+    emit(html, "foot", generated=datetime.now(TZ).strftime("%Y-%m-%d %H:%M %Z"))
+    text.append("")
+    text.append(f"Generated by AWS Cost Alerting System - {datetime.now(TZ):%Y-%m-%d %H:%M %Z}")
+    subject = f"🔥 AWS burn rate ${alert['rate']:,.2f}/hour ({'; '.join(alert['reasons'])})"
+    return "".join(html), "\n".join(text) + "\n", subject
+
+
+def trigger_remediation(hour_key, rate):
+    """Hand the breach to the remediation Lambda (async; it debounces repeat triggers itself)."""
+    with timed("lambda.invoke"):
+        client("lambda").invoke(
+            FunctionName=REMEDIATION_FUNCTION,
+            InvocationType="Event",
+            Payload=json.dumps({
+                "budget": BUDGET_NAME,
+                "threshold": None,
+                "trigger": f"burn-rate-{hour_key}",
+                "reason": f"burn rate ${rate:,.2f}/hour",
+            }).encode("utf-8"),
+        )
+    logger.info(f"Triggered remediation ({REMEDIATION_FUNCTION}) for burn rate ${rate:,.2f}/hour")
+    return REMEDIATION_FUNCTION
+
+
+def parse_hour(key):
+    """Datetime for a Cost Explorer HOURLY period key (YYYY-MM-DDThh:mm:ssZ)."""
+    return datetime.fromisoformat(key.replace("Z", "+00:00"))
+
+
+def plan_monitor_windows(state, now_hour: datetime):
+    """
+    Plan the hourly monitor's Cost Explorer reads. Returns (windows, settle_before).
+
+    Each run reads the hours since the last run plus the MONITOR_LATE_HOURS
+    before it, so hours Cost Explorer fills in shortly after the fact are
+    picked up. Hours that reach MONITOR_SETTLE_HOURS are final: once
+    MONITOR_SETTLE_BATCH_HOURS of them are due, they are re-read once in a
+    separate window and settle_before moves them into the baseline. A first run
+    (state None) reads MONITOR_SEED_HOURS and settles the older half at once.
+    """
+    settle_before = now_hour - timedelta(hours=MONITOR_SETTLE_HOURS)
+    if state is None:
+        return [(now_hour - timedelta(hours=MONITOR_SEED_HOURS), now_hour)], settle_before
+
+    start = min(parse_hour(state["through"]), now_hour) - timedelta(hours=MONITOR_LATE_HOURS)
+    windows = [(start, now_hour)]
+    oldest = min((parse_hour(k) for k in state["recent"]), default=None)
+    if oldest is None or oldest > settle_before - timedelta(hours=MONITOR_SETTLE_BATCH_HOURS):
+        return windows, None
+    if oldest < min(settle_before, start):
+        windows.insert(0, (oldest, min(settle_before, start)))
+    return windows, settle_before
+
+
+def run_hourly_monitor(cfg, event):
+    """
+    Hourly spend monitor: fetch only the hours since the last run (plus a short
+    late-data re-read, and a batched final read of the hours that settle), update
+    the rolling baseline and alert, and optionally trigger remediation, when the
+    burn rate passes BURN_RATE_THRESHOLD or BURN_RATE_MULTIPLIER x baseline.
+    No report is built or archived.
+    """
+    bucket = cfg[PARAM_ARCHIVE_BUCKET]
+    now_hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    state = get_s3_json(bucket, MONITOR_STATE_KEY)
+    if state and parse_hour(state["through"]) < now_hour - MONITOR_MAX_AGE:
+        state = None
+    windows, settle_before = plan_monitor_windows(state, now_hour)
+
+    fetched = {}
+    for start, end in windows:
+        for hour_key, keys, amount in iter_cost_groups(iter_cost_pages(start, end, ["SERVICE"], "HOURLY")):
+            hour_costs = fetched.setdefault(hour_key, {})
+            hour_costs[keys[0]] = hour_costs.get(keys[0], 0.0) + amount
+    state = update_monitor_state(state, fetched, windows, now_hour, settle_before)
+    logger.info(
+        f"Hourly monitor: fetched {', '.join(f'{s:%Y-%m-%dT%H}Z - {e:%Y-%m-%dT%H}Z' for s, e in windows)}, "
+        f"baseline {state['baseline']}"
+    )
+
+    rate, hours, by_service = burn_rate(state)
+    reasons = burn_alert_reasons(rate, state["baseline"])
+    put_metric("HourlyBurnRate", rate, "None")
+    result = {"ok": True, "mode": "monitor", "burn_rate": round(rate, 4), "hours": hours,
+              "baseline": round(state["baseline"]["mean"], 4), "reasons": reasons, "alerted": False}
+
+    alerted_at = state.get("alerted_at")
+    cooling = alerted_at and datetime.fromisoformat(alerted_at) > now_hour - timedelta(hours=BURN_ALERT_COOLDOWN_HOURS)
+    if reasons and cooling and not (event or {}).get("force"):
+        logger.info(f"Burn rate ${rate:,.2f}/hour still high ({'; '.join(reasons)}); last alert {alerted_at}, cooling down")
+        result["skipped"] = "cooldown"
+    elif reasons:
+        logger.warning(f"Burn rate ${rate:,.2f}/hour: {'; '.join(reasons)}")
+        alert = {"rate": rate, "hours": hours, "by_service": by_service, "baseline": state["baseline"], "reasons": reasons}
+        if REMEDIATION_FUNCTION:
+            alert["remediation"] = trigger_remediation(hours[-1], rate)
+        html, text, subject = render_burn_alert(alert)
+        delivery = send_email(cfg[PARAM_REPORT_FROM], cfg[PARAM_REPORT_TO], subject, html, text)
+        put_metric("BurnRateAlert", 1)
+        state["alerted_at"] = now_hour.isoformat()
+        result.update(alerted=True, remediation=alert.get("remediation"), message_ids=delivery["message_ids"])
+
+    put_s3(bucket, MONITOR_STATE_KEY, json.dumps(state).encode("utf-8"), "application/json")
+    return result
+
+
 def lambda_handler(event, context):
     """Main Lambda handler."""
+    global _cold_start
+    cold_start, _cold_start = _cold_start, False
+    reset_instrumentation()
+    if context is not None:
+        get_account_id(context)  # seeds the cache from the function ARN, no STS round trip
+    profiler = None
+    if PROFILE_TO_S3 or (event or {}).get("profile"):
+        import cProfile  # only needed for opt-in profiling runs
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    bucket = None
+    start = None
+    run, run_etag = None, None
+
     try:
         # Fetch configuration from SSM
         cfg = get_params(
@@ -436,6 +3197,30 @@ def lambda_handler(event, context):
         report_to = cfg[PARAM_REPORT_TO]
         report_from = cfg[PARAM_REPORT_FROM]
         bucket = cfg[PARAM_ARCHIVE_BUCKET]
+
+        # Rebuild the report index from the bucket: {"rebuild_index": "YYYY-MM"} (or a list of months)
+        if (event or {}).get("rebuild_index"):
+            months = event["rebuild_index"]
+            months = [months] if isinstance(months, str) else months
+            rebuilt = {m: rebuild_report_index(bucket, date.fromisoformat(f"{m}-01")) for m in months}
+            logger.info(f"Rebuilt report index: {rebuilt}")
+            return {"ok": True, "mode": "rebuild_index", "days": rebuilt, "timings": instrumentation_summary(cold_start)}
+
+        # Hourly monitor: {"monitor": "hourly"} (scheduled every hour when hourly_monitor is on)
+        if (event or {}).get("monitor"):
+            result = run_hourly_monitor(cfg, event)
+            result["timings"] = instrumentation_summary(cold_start)
+            return result
+
+        # Backfill mode: {"backfill": {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD", "send_email": false}}
+        if (event or {}).get("backfill"):
+            result = run_backfill(event["backfill"], cfg)
+            result["timings"] = instrumentation_summary(cold_start)
+            logger.info(
+                f"Backfill completed: {len(result['written'])} day(s) written, {len(result['failed'])} failed"
+            )
+            return result
+
         top_n = int(cfg[PARAM_TOP_N_SERVICES])
         include_mtd = to_bool(cfg[PARAM_INCLUDE_MTD])
         include_drivers = to_bool(cfg[PARAM_INCLUDE_DRIVERS])
@@ -447,278 +3232,206 @@ def lambda_handler(event, context):
 
         logger.info(f"Generating cost report for {date_label}")
 
-        # Query yesterday's costs by service (single day, no aggregation)
-        y_rows, y_total, y_raw = ce_grouped_cost(start, end, "SERVICE", aggregate_days=False)
-        put_metric("DailyTotalCost", y_total, "None")
-
-        # Get day-before-yesterday for comparison
-        day_before = start - timedelta(days=1)
-        prev_rows, prev_total, _ = ce_grouped_cost(day_before, start, "SERVICE", aggregate_days=False)
-        dod_change, dod_arrow = calculate_change(y_total, prev_total)
-
-        # Get same day last week for comparison
-        week_ago = start - timedelta(days=7)
-        week_ago_end = week_ago + timedelta(days=1)
-        wow_rows, wow_total, _ = ce_grouped_cost(week_ago, week_ago_end, "SERVICE", aggregate_days=False)
-        wow_change, wow_arrow = calculate_change(y_total, wow_total)
-
-        # Get 7-day trend for sparkline
-        daily_costs = get_daily_totals(7, end)
-        sparkline = generate_sparkline(daily_costs)
-        
-        # Get regional breakdown
-        regional_rows, regional_total = get_regional_breakdown(start, end)
+        # Idempotency: skip a day that was already sent (or is being sent), resume one that got as far as archiving
+        if IDEMPOTENT_RUNS:
+            owner = context.aws_request_id if context is not None else f"local-{os.getpid()}-{time.time_ns()}"
+            lease = context.get_remaining_time_in_millis() / 1000 if context is not None else RUN_LEASE_SECONDS
+            run, run_etag = claim_run(bucket, start, owner, lease, force=bool((event or {}).get("force")))
+            if run_etag is None:
+                reason = "already_sent" if run["phase"] == "done" else "in_progress"
+                logger.info(f"Report for {date_label} skipped ({reason}); run marker: {run}")
+                put_metric("RunSkipped", 1)
+                return {
+                    "ok": True,
+                    "date": date_label,
+                    "skipped": reason,
+                    "message_ids": run.get("message_ids"),
+                    "timings": instrumentation_summary(cold_start),
+                }
 
-        # Month-to-date (from first day of month through yesterday, inclusive)
-        mtd_rows = []
-        mtd_total = 0.0
-        mtd_raw = None
-        if include_mtd:
-            mtd_start = start.replace(day=1)  # First day of the month
-            mtd_rows, mtd_total, mtd_raw = ce_grouped_cost(mtd_start, end, "SERVICE", aggregate_days=True)
-            put_metric("MTDTotalCost", mtd_total, "None")
+        # Organization mode: per-linked-account reports from one set of payer queries
+        if ORG_MODE or (event or {}).get("organization"):
+            # Accounts an earlier attempt already emailed are not sent again (a forced run sends all)
+            sent = set() if run is None or (event or {}).get("force") else set(run.get("accounts_sent", []))
+            result = run_organization(cfg, start, sent)
+            put_metric("ReportGenerated" if result["ok"] else "ReportFailed", 1)
+            if run is not None:
+                sent |= set(result["accounts"])
+                run_etag = advance_run(
+                    bucket, start, run, run_etag, "done" if result["ok"] else "fetch", accounts_sent=sorted(sent)
+                )
+                if not result["ok"]:
+                    release_run(bucket, start, run, run_etag)
+                run_etag = None
+            result["timings"] = instrumentation_summary(cold_start)
+            logger.info(f"Organization reports completed: {result['accounts']}, failed: {result['failed']}")
+            return result
+
+        if run is not None and run["phase"] == "email":
+            logger.info(f"Resuming report for {date_label} at the email phase (attempt {run['attempts']})")
+            put_metric("RunResumed", 1)
+            with timed("get_run_email"):
+                raw = client("s3").get_object(Bucket=bucket, Key=run_email_key(start))["Body"].read()
+            delivery = send_raw(report_from, parse_recipients(report_to), raw)
+            advance_run(
+                bucket, start, run, run_etag, "done",
+                message_ids=delivery["message_ids"], failed_recipients=delivery["failed"],
+            )
+            run_etag = None
+            put_metric("ReportGenerated", 1)
+            return {
+                "ok": True,
+                "date": date_label,
+                "resumed": "email",
+                "message_ids": delivery["message_ids"],
+                "failed_recipients": sorted(delivery["failed"]),
+                "timings": instrumentation_summary(cold_start),
+            }
 
-        # Get budget status
-        budget_info = get_budget_status()
-        
         # Calculate first day of current month and first day of next month
         month_start = start.replace(day=1)
         if start.month == 12:
             next_month = start.replace(year=start.year + 1, month=1, day=1)
         else:
             next_month = start.replace(month=start.month + 1, day=1)
-        
-        # Get AWS cost forecast for the entire month (from month start to month end)
-        # This gives us the total forecasted spend for the month
-        aws_forecast = get_cost_forecast(month_start, next_month) if include_mtd else None
 
-        # Drivers: usage types (overall yesterday, single day)
-        d_rows = []
-        d_total = 0.0
+        # Fetch phase: every Cost Explorer / Budgets call is independent, so run them together.
+        # One SERVICE-grouped query covers yesterday, DoD, WoW, the 7-day trend and MTD
+        # (in incremental MTD mode only the last week; the rest comes from the accumulator).
+        # Grouped by COST_CUBE_DIMENSION as well, it also stands in for the regional or drivers query.
+        # The accumulator only saves queries when nothing else widens the window back to month start
+        # (the anomaly baseline and forecast history usually do)
+        incremental = include_mtd and INCREMENTAL_MTD and plan_cost_window(start, False)[0] > start.replace(day=1)
+        window_start, window_end = plan_cost_window(start, include_mtd and not incremental)
+        fetch_tasks = {
+            "service_window": lambda: fetch_daily_by_service(window_start, window_end, bucket, cube_start=start),
+            "budget": get_budget_status,
+        }
+        if COST_CUBE_DIMENSION != "REGION":
+            fetch_tasks["regional"] = lambda: get_regional_breakdown(start, end)
+        if include_mtd and (FORECAST_CE_CROSSCHECK or not LOCAL_FORECAST):
+            # AWS cost forecast for the entire month (from month start to month end)
+            fetch_tasks["forecast"] = lambda: get_cost_forecast(month_start, next_month)
+        if incremental:
+            fetch_tasks["mtd_state"] = lambda: get_s3_json(bucket, mtd_state_key(month_start))
         d_raw = None
-        if include_drivers:
-            d_rows, d_total, d_raw = ce_grouped_cost(start, end, "USAGE_TYPE", aggregate_days=False)
-
-        # Write artifacts to S3
-        prefix = f"reports/{start.year}/{start.month:02d}/{start.day:02d}/"
-        put_s3(
-            bucket,
-            prefix + "daily_by_service.json",
-            json.dumps(y_raw).encode("utf-8"),
-            "application/json",
-        )
-        put_s3(
-            bucket,
-            prefix + "daily_by_service.csv",
-            csv_bytes(["service", "amount_usd"], y_rows),
-            "text/csv",
-        )
-
-        if include_mtd and mtd_raw is not None:
-            put_s3(
-                bucket,
-                prefix + "mtd_by_service.json",
-                json.dumps(mtd_raw).encode("utf-8"),
-                "application/json",
-            )
-            put_s3(
-                bucket,
-                prefix + "mtd_by_service.csv",
-                csv_bytes(["service", "amount_usd"], mtd_rows),
-                "text/csv",
+        if include_drivers and COST_CUBE_DIMENSION != "USAGE_TYPE":
+            # Drivers: usage types (overall yesterday, single day), raw response streamed to a spool file
+            d_raw = spooled_file() if "json" in ARCHIVE_FORMATS else None
+            fetch_tasks["drivers"] = lambda: ce_grouped_cost(
+                start, end, "USAGE_TYPE", aggregate_days=False, top_n=top_n, raw_file=d_raw
             )
+        fetched = run_parallel(fetch_tasks)
+
+        by_day, window_raw, cube = fetched["service_window"]
+        cells = cube_cells(cube, start, end)
+        warnings = []
+        region_services = None
+        if COST_CUBE_DIMENSION == "REGION":
+            regional_rows = top_rows({k: v for k, v in cube_marginal(cells, 0).items() if v > 0.001})
+            region_services = top_services_by(cells, [r for r, _ in regional_rows])
+        else:
+            if fetched["regional"] is None:
+                warnings.append(REGIONAL_UNAVAILABLE)
+            regional_rows = fetched["regional"][0] if fetched["regional"] else []
+        if include_drivers and COST_CUBE_DIMENSION == "USAGE_TYPE":
+            d_by_usage_type = cube_marginal(cells, 0)
+            d_rows = top_rows(d_by_usage_type, top_n)
+            d_total = sum(v for v in d_by_usage_type.values() if v > 0)
+            if "json" in ARCHIVE_FORMATS:
+                d_raw = rows_to_raw(top_rows(d_by_usage_type), start, end, "USAGE_TYPE")
+        else:
+            d_rows, d_total, d_by_usage_type = fetched.get("drivers", ([], 0.0, {}))
 
-        if include_drivers and d_raw is not None:
-            put_s3(
-                bucket,
-                prefix + "daily_drivers_usage_type.json",
-                json.dumps(d_raw).encode("utf-8"),
-                "application/json",
-            )
-            put_s3(
-                bucket,
-                prefix + "daily_drivers_usage_type.csv",
-                csv_bytes(["usage_type", "amount_usd"], d_rows),
-                "text/csv",
-            )
+        report = summarize_day(by_day, start, include_mtd and not incremental)
+        y_raw = service_raw(slice_raw(window_raw, start, end))
+        put_metric("DailyTotalCost", report["y_total"], "None")
+        if ANOMALY_DETECTION:
+            put_metric("AnomalyCount", len(report["anomalies"]))
 
-        # Calculate daily average for context
-        days_in_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-        days_elapsed = start.day
-        daily_avg = mtd_total / days_elapsed if days_elapsed > 0 and include_mtd else 0
-        projected_monthly = daily_avg * days_in_month.day if include_mtd else 0
-        
-        # Format change indicators with color
-        def format_change(change, arrow):
-            if change > 5:
-                color = "#dc3545"  # Red for increase
-            elif change < -5:
-                color = "#28a745"  # Green for decrease
-            else:
-                color = "#6c757d"  # Gray for stable
-            return f'<span style="color:{color};font-weight:500">{arrow} {abs(change):.1f}%</span>'
-        
-        dod_formatted = format_change(dod_change, dod_arrow)
-        wow_formatted = format_change(wow_change, wow_arrow)
-        
-        # Build budget progress bar HTML
-        # Use MTD total from Cost Explorer for consistency, not Budgets API actual
-        budget_html = ""
-        if budget_info and include_mtd:
-            # Use MTD total instead of Budgets API actual for consistency
-            budget_actual = mtd_total
-            budget_limit = budget_info["limit"]
-            utilization = (budget_actual / budget_limit * 100) if budget_limit > 0 else 0
-            
-            # Use Cost Explorer forecast if available, otherwise fall back to Budgets forecast
-            forecasted_spend = aws_forecast if aws_forecast is not None else budget_info.get("forecasted", 0)
-            
-            bar_color = "#28a745" if utilization < 80 else ("#ffc107" if utilization < 100 else "#dc3545")
-            budget_html = f'''
-            <div style="background: #f8f9fa; padding: 16px; border-radius: 6px; margin-bottom: 20px;">
-              <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px;">
-                <div style="font-size: 14px; font-weight: 600;">📊 Budget Status: {budget_info["name"]}</div>
-                <div style="font-size: 14px; color: #666;">${budget_actual:,.2f} / ${budget_limit:,.2f}</div>
-              </div>
-              <div style="background: #e9ecef; border-radius: 4px; height: 20px; overflow: hidden;">
-                <div style="background: {bar_color}; height: 100%; width: {min(utilization, 100):.1f}%; transition: width 0.3s;"></div>
-              </div>
-              <div style="display: flex; justify-content: space-between; margin-top: 8px; font-size: 12px; color: #666;">
-                <div>{utilization:.1f}% used</div>
-                <div>Forecasted (EOM): ${forecasted_spend:,.2f}</div>
-              </div>
-            </div>
-            '''
-        
-        # Build regional breakdown HTML
-        regional_html = ""
-        if regional_rows:
-            regional_items = "".join([
-                f'<div style="display: flex; justify-content: space-between; padding: 4px 0; border-bottom: 1px solid #eee;"><span>{region}</span><span style="font-weight:500">${cost:,.2f}</span></div>'
-                for region, cost in regional_rows[:5]  # Top 5 regions
-            ])
-            regional_html = f'''
-            <div style="background: #f8f9fa; padding: 16px; border-radius: 6px; margin-bottom: 20px;">
-              <div style="font-size: 14px; font-weight: 600; margin-bottom: 12px;">🌎 Cost by Region (Yesterday)</div>
-              {regional_items}
-            </div>
-            '''
-        
-        # Build 7-day trend HTML
-        trend_html = ""
-        if daily_costs and sparkline:
-            min_cost = min(d["cost"] for d in daily_costs)
-            max_cost = max(d["cost"] for d in daily_costs)
-            avg_cost = sum(d["cost"] for d in daily_costs) / len(daily_costs)
-            trend_html = f'''
-            <div style="background: #f8f9fa; padding: 16px; border-radius: 6px; margin-bottom: 20px;">
-              <div style="font-size: 14px; font-weight: 600; margin-bottom: 8px;">📈 7-Day Trend</div>
-              <div style="font-family: monospace; font-size: 24px; letter-spacing: 2px; color: #667eea; margin: 8px 0;">{sparkline}</div>
-              <div style="display: flex; justify-content: space-between; font-size: 12px; color: #666;">
-                <div>Min: ${min_cost:,.2f}</div>
-                <div>Avg: ${avg_cost:,.2f}</div>
-                <div>Max: ${max_cost:,.2f}</div>
-              </div>
-            </div>
-            '''
-        
-        # Build email HTML with improved formatting
-        html = f"""
-    <html>
-    <head>
-      <meta charset="UTF-8">
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; line-height: 1.6; color: #333; max-width: 800px; margin: 0 auto; padding: 20px;">
-      <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; border-radius: 8px 8px 0 0; margin: -20px -20px 20px -20px;">
-        <h1 style="margin: 0 0 8px 0; font-size: 24px;">☁️ AWS Cost Report</h1>
-        <div style="font-size: 14px; opacity: 0.9;">Daily Report for <b>{date_label}</b> ({start.strftime('%A')})</div>
-      </div>
-      
-      <!-- Summary Cards -->
-      <div style="display: flex; flex-wrap: wrap; gap: 16px; margin-bottom: 20px;">
-        <div style="flex: 1; min-width: 200px; background: #f8f9fa; padding: 16px; border-radius: 6px; border-left: 4px solid #667eea;">
-          <div style="font-size: 12px; color: #666; text-transform: uppercase; letter-spacing: 0.5px;">Yesterday's Total</div>
-          <div style="font-size: 28px; font-weight: bold; color: #333;">${y_total:,.2f}</div>
-          <div style="font-size: 12px; margin-top: 4px;">
-            vs. day before: {dod_formatted} &nbsp;|&nbsp; vs. week ago: {wow_formatted}
-          </div>
-        </div>
-        {f'''
-        <div style="flex: 1; min-width: 200px; background: #f8f9fa; padding: 16px; border-radius: 6px; border-left: 4px solid #764ba2;">
-          <div style="font-size: 12px; color: #666; text-transform: uppercase; letter-spacing: 0.5px;">Month-to-Date ({days_elapsed} days)</div>
-          <div style="font-size: 28px; font-weight: bold; color: #333;">${mtd_total:,.2f}</div>
-          <div style="font-size: 12px; color: #666; margin-top: 4px;">
-            Daily avg: ${daily_avg:,.2f} &nbsp;|&nbsp; Projected: ${projected_monthly:,.2f}
-          </div>
-        </div>
-        ''' if include_mtd else ''}
-      </div>
-      
-      <!-- Budget Progress -->
-      {budget_html}
-      
-      <!-- 7-Day Trend -->
-      {trend_html}
-      
-      <!-- Service Breakdown Tables -->
-      {html_table(f"Yesterday by Service (Top {top_n})", y_rows[:top_n], y_total, show_percentage=True, filter_zeros=True)}
-      
-      {html_table(f"Month-to-Date by Service (Top {top_n})", mtd_rows[:top_n], mtd_total, show_percentage=True, filter_zeros=True) if include_mtd else ""}
-      
-      <!-- Regional Breakdown -->
-      {regional_html}
-      
-      <!-- Cost Drivers -->
-      {html_table(f"Cost Drivers - Usage Types (Top {top_n})", d_rows[:top_n], d_total, show_percentage=True, filter_zeros=True) if include_drivers else ""}
-      
-      <!-- Insights Section -->
-      <div style="background: #e8f4f8; padding: 16px; border-radius: 6px; margin: 20px 0; border-left: 4px solid #17a2b8;">
-        <div style="font-size: 14px; font-weight: 600; margin-bottom: 8px;">💡 Quick Insights</div>
-        <ul style="margin: 0; padding-left: 20px; font-size: 13px; color: #555;">
-          <li><b>Top cost driver:</b> {y_rows[0][0] if y_rows else 'N/A'} (${y_rows[0][1]:,.2f})</li>
-          {f'<li><b>Day-over-day:</b> {"Increased" if dod_change > 5 else "Decreased" if dod_change < -5 else "Stable"} ({dod_arrow} {abs(dod_change):.1f}%)</li>' if prev_total > 0 else ''}
-          {f'<li><b>Week-over-week:</b> {"Increased" if wow_change > 5 else "Decreased" if wow_change < -5 else "Stable"} ({wow_arrow} {abs(wow_change):.1f}%)</li>' if wow_total > 0 else ''}
-          {f'<li><b>Budget utilization:</b> {(mtd_total / budget_info["limit"] * 100):.1f}% of ${budget_info["limit"]:,.2f} monthly budget (${mtd_total:,.2f} spent)</li>' if (budget_info and include_mtd) else ''}
-          {f'<li><b>On track for:</b> ${projected_monthly:,.2f} this month (based on {days_elapsed}-day average)</li>' if include_mtd else ''}
-        </ul>
-      </div>
-      
-      <!-- Archive Location -->
-      <div style="margin-top: 24px; padding: 16px; background: #f8f9fa; border-radius: 6px; font-size: 13px; color: #666;">
-        <div style="margin-bottom: 8px;"><strong>📦 Archive Location:</strong></div>
-        <div style="font-family: monospace; background: white; padding: 8px; border-radius: 4px; border: 1px solid #ddd; word-break: break-all;">s3://{bucket}/{prefix}</div>
-        <div style="margin-top: 12px; font-size: 12px;">
-          Reports archived in JSON and CSV formats for historical analysis.
-        </div>
-      </div>
-      
-      <!-- Footer -->
-      <div style="margin-top: 20px; padding-top: 20px; border-top: 1px solid #eee; font-size: 12px; color: #999; text-align: center;">
-        Generated by AWS Cost Alerting System • {datetime.now(TZ).strftime('%Y-%m-%d %H:%M:%S %Z')}
-      </div>
-    </body>
-    </html>
-    """
-
-        # Use simple ASCII subject with quick summary
-        change_indicator = dod_arrow if dod_change != 0 else ""
-        subject = f"AWS Cost Report - {date_label}: ${y_total:,.2f} {change_indicator}"
+        mtd_raw = None
+        mtd_state = None
+        if incremental:
+            mtd_totals, mtd_state = incremental_mtd(fetched["mtd_state"], by_day, window_start, start, bucket)
+            report["mtd_rows"] = top_rows(mtd_totals)
+            report["mtd_total"] = sum(v for _, v in report["mtd_rows"])
+            mtd_raw = rows_to_raw(report["mtd_rows"], month_start, end, "SERVICE")
+        elif include_mtd:
+            mtd_raw = service_raw(slice_raw(window_raw, month_start, end))
+        forecast_eom = None
+        if include_mtd:
+            put_metric("MTDTotalCost", report["mtd_total"], "None")
+            if report["forecast"]:
+                forecast_eom = report["mtd_total"] + report["forecast"]["remaining"]
+                put_metric("ForecastEOMCost", forecast_eom, "None")
+                aws_forecast = fetched.get("forecast")
+                if aws_forecast:
+                    logger.info(
+                        f"Forecast cross-check: local ${forecast_eom:,.2f} vs Cost Explorer ${aws_forecast:,.2f} "
+                        f"({(forecast_eom - aws_forecast) / aws_forecast * 100:+.1f}%)"
+                    )
+
+        prefix = report_prefix(start)
+        report.update(
+            regional_rows=regional_rows,
+            region_services=region_services,
+            warnings=warnings,
+            budget_info=fetched["budget"],
+            aws_forecast=fetched.get("forecast"),
+            d_rows=d_rows,
+            d_total=d_total,
+            top_n=top_n,
+            include_mtd=include_mtd,
+            include_drivers=include_drivers,
+            bucket=bucket,
+            prefix=prefix,
+        )
+        with timed("render_report"):
+            html, text, subject = render_report(report)
+
+        # Archive phase: upload all artifacts to S3 concurrently (with the MIME message, for a resumed run)
+        artifacts = day_artifacts(
+            prefix, start, y_raw, report["y_rows"], mtd_raw, report["mtd_rows"], d_raw,
+            d_by_usage_type if include_drivers else None,
+        )
+        with timed("build_message"):
+            raw = build_message(report_from, subject, html, text, csv_attachments(artifacts) if EMAIL_ATTACH_CSV else ())
+        if mtd_state is not None:
+            artifacts.append((mtd_state_key(month_start), json.dumps(mtd_state).encode("utf-8"), "application/json"))
+        if run is not None:
+            artifacts.append((run_email_key(start), raw, "message/rfc822"))
+        upload_artifacts(bucket, artifacts)
+        update_report_index(bucket, {start: index_entry(report, prefix, artifacts)})
+        if run is not None:
+            run_etag = advance_run(bucket, start, run, run_etag, "email", prefix=prefix)
 
         # Send email
         logger.info(f"About to send email. From: {report_from}, To: {report_to}, Subject: {subject}")
-        message_id = send_email(report_from, report_to, subject, html)
-        logger.info(f"Email sending completed. MessageId: {message_id}")
+        delivery = send_raw(report_from, parse_recipients(report_to), raw)
+        if run is not None:
+            advance_run(
+                bucket, start, run, run_etag, "done",
+                message_ids=delivery["message_ids"], failed_recipients=delivery["failed"],
+            )
+            run_etag = None
 
         # Emit success metric
         put_metric("ReportGenerated", 1)
+        if warnings:
+            put_metric("PartialReport", 1)
 
         result = {
             "ok": True,
             "date": date_label,
-            "daily_total": y_total,
-            "mtd_total": mtd_total if include_mtd else None,
-            "dod_change": dod_change,
-            "wow_change": wow_change,
+            "daily_total": report["y_total"],
+            "mtd_total": report["mtd_total"] if include_mtd else None,
+            "forecast_eom": forecast_eom,
+            "dod_change": report["dod_change"],
+            "wow_change": report["wow_change"],
+            "anomalies": [a["service"] for a in report["anomalies"]],
+            "warnings": warnings,
+            "failed_recipients": sorted(delivery["failed"]),
+            "timings": instrumentation_summary(cold_start),
         }
 
         logger.info(f"Report generated successfully: {result}")
@@ -727,5 +3440,31 @@ def lambda_handler(event, context):
     except Exception as e:
         logger.error(f"Lambda execution failed: {e}", exc_info=True)
         put_metric("ReportFailed", 1)
+        if run_etag is not None:
+            release_run(bucket, start, run, run_etag)
         raise
-
+    finally:
+        retry_metrics()
+        flush_metrics()
+        logger.info(json.dumps({"event": "reporter_timings", **instrumentation_summary(cold_start)}))
+        if profiler is not None:
+            profiler.disable()
+            if bucket:
+                # Monitor, backfill and rebuild runs have no report day; file them under today
+                mode = next((m for m in ("monitor", "backfill", "rebuild_index") if (event or {}).get(m)), "report")
+                dump_profile(profiler, bucket, start or datetime.now(TZ).date(), mode)
+
+
+if EAGER_CLIENTS:
+    for _name in CLIENT_KWARGS:
+        client(_name)
+
+_init_seconds = time.perf_counter() - _INIT_STARTED
+if MEASURE_INIT:
+    logger.info(json.dumps({
+        "event": "reporter_init",
+        "init_ms": round(_init_seconds * 1000, 1),
+        "eager_clients": EAGER_CLIENTS,
+        "clients": sorted(_clients),
+        "client_init_ms": {k: v["ms"] for k, v in instrumentation_summary()["phases"].items()},
+    }))
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the cost reporter Lambda.
+
+Drives lambda/app.py's lambda_handler end to end against in-memory fake
+ce/s3/ses/cloudwatch/budgets/ssm/sts clients that replay synthetic Cost
+Explorer data at a configurable scale. No AWS credentials or network needed.
+
+Each scenario starts with an empty fake archive bucket. Its first invocation
+(traced for peak memory) behaves like the very first production run. Timed
+repeats then start from a cold container by default (--warm keeps in-process
+caches), but the bucket persists between them as it does in production.
+
+Usage:
+    python3 scripts/bench_reporter.py                       # all preset scenarios
+    python3 scripts/bench_reporter.py --scenario large --repeat 3
+    python3 scripts/bench_reporter.py --services 200 --usage-types 20000 --regions 20 --day 28
+    python3 scripts/bench_reporter.py --scenario medium --throttle-every 3   # exercise the retry layer
+    python3 scripts/bench_reporter.py --json > bench_output.txt
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from datetime import date, datetime, timedelta
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+
+PARAMS = {
+    "/bench/report_to": "reports@example.com",
+    "/bench/report_from": "reports@example.com",
+    "/bench/archive_bucket": "bench-archive",
+    "/bench/top_n_services": "10",
+    "/bench/include_mtd": "true",
+    "/bench/include_drivers": "true",
+}
+
+# Every invocation reports the same day into the same bucket; force keeps the run markers from skipping repeats
+BENCH_EVENT = {"force": True}
+
+# Two-key queries: each value of the last key is paired with about this many values of the first
+PAIR_FANOUT = 3
+
+# days: day of the month being reported on; the rest is the Cost Explorer shape
+SCENARIOS = {
+    "small": {"day": 10, "services": 20, "usage_types": 200, "regions": 5},
+    "medium": {"day": 20, "services": 100, "usage_types": 2000, "regions": 12},
+    "large": {"day": 30, "services": 300, "usage_types": 10000, "regions": 25},
+}
+
+
+class CallCounter:
+    """Thread-safe per-operation call counter shared by every fake client."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def hit(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+
+
+class FakeMeta:
+    def __init__(self, region_name="us-east-1"):
+        self.region_name = region_name
+        self.events = self
+
+    def register(self, *args, **kwargs):
+        pass
+
+
+def client_error(code, operation):
+    """The botocore ClientError a real client raises for code."""
+    from botocore.exceptions import ClientError
+
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+class FakeCostExplorer:
+    """Synthetic Cost Explorer with deterministic amounts and NextPageToken paging."""
+
+    def __init__(self, counter, dims, page_size, throttle_every=0):
+        self.counter = counter
+        self.dims = dims
+        self.page_size = page_size
+        self.throttle_every = throttle_every
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.meta = FakeMeta()
+
+    def _amount(self, day, keys):
+        # Deterministic, long-tailed spend: a few expensive keys, many near-zero ones
+        u = (zlib.crc32(f"{day}|{'|'.join(keys)}".encode()) % 1000003 + 1) / 1000004
+        return 0.05 * u ** (-1 / 1.5)
+
+    def get_cost_and_usage(self, TimePeriod, Granularity, Metrics, GroupBy=None, NextPageToken=None, **kwargs):
+        with self.lock:
+            self.requests += 1
+            throttled = self.throttle_every and self.requests % self.throttle_every == 0
+        if throttled:
+            self.counter.hit("ce.throttled")
+            raise client_error("ThrottlingException", "GetCostAndUsage")
+        self.counter.hit("ce.get_cost_and_usage")
+        start = date.fromisoformat(TimePeriod["Start"])
+        end = date.fromisoformat(TimePeriod["End"])
+        group_keys = [g["Key"] for g in (GroupBy or [])]
+        step = timedelta(days=1)
+
+        # Every (period, group) pair in order; pages slice this sequence
+        combos = [[]]
+        for key in group_keys:
+            combos = [c + [v] for c in combos for v in self.dims[key]]
+        if len(group_keys) > 1:
+            # Like Cost Explorer, only combinations with usage: each service spans a few
+            # regions, and usage types are spread across the services
+            first, last = (self.dims[k] for k in (group_keys[0], group_keys[-1]))
+            fanout = max(PAIR_FANOUT, len(first) // len(last))
+            combos = [c for c in combos if zlib.crc32("|".join(c).encode()) % len(first) < fanout]
+        periods = []
+        t = datetime(start.year, start.month, start.day)
+        while t < datetime(end.year, end.month, end.day):
+            periods.append(t)
+            t += step
+        total_items = len(periods) * len(combos) if group_keys else len(periods)
+
+        offset = int(NextPageToken or 0)
+        stop = min(offset + self.page_size, total_items)
+        results = []
+        for i in range(offset, stop):
+            p = periods[i // len(combos)] if group_keys else periods[i]
+            period = {"Start": p.strftime("%Y-%m-%d"), "End": (p + step).strftime("%Y-%m-%d")}
+            if not results or results[-1]["TimePeriod"] != period:
+                results.append({"TimePeriod": period, "Total": {}, "Groups": [], "Estimated": False})
+            if group_keys:
+                keys = combos[i % len(combos)]
+                amount = self._amount(period["Start"], keys)
+                results[-1]["Groups"].append(
+                    {"Keys": keys, "Metrics": {"UnblendedCost": {"Amount": f"{amount:.10f}", "Unit": "USD"}}}
+                )
+            else:
+                amount = sum(self._amount(period["Start"], [s]) for s in self.dims["SERVICE"])
+                results[-1]["Total"] = {"UnblendedCost": {"Amount": f"{amount:.10f}", "Unit": "USD"}}
+
+        resp = {
+            "ResultsByTime": results,
+            "GroupDefinitions": [{"Type": "DIMENSION", "Key": k} for k in group_keys],
+            "DimensionValueAttributes": [],
+        }
+        if stop < total_items:
+            resp["NextPageToken"] = str(stop)
+        return resp
+
+    def get_cost_forecast(self, **kwargs):
+        self.counter.hit("ce.get_cost_forecast")
+        return {
+            "Total": {"Amount": "1234.56", "Unit": "USD"},
+            "ForecastResultsByTime": [{"MeanValue": {"Amount": "1234.56"}}],
+        }
+
+
+class FakeS3:
+    def __init__(self, counter):
+        self.counter = counter
+        self.meta = FakeMeta()
+        self.lock = threading.Lock()
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.counter.hit("s3.put_object")
+        data = Body if isinstance(Body, (bytes, bytearray)) else Body.read()
+        with self.lock:
+            self.objects[Key] = bytes(data)
+        return {"ETag": '"bench"'}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.counter.hit("s3.get_object")
+        with self.lock:
+            data = self.objects.get(Key)
+        if data is None:
+            raise client_error("NoSuchKey", "GetObject")
+        return {"Body": io.BytesIO(data), "ETag": '"bench"', "ContentLength": len(data)}
+
+
+class FakeSES:
+    def __init__(self, counter):
+        self.counter = counter
+        self.meta = FakeMeta()
+
+    def send_raw_email(self, **kwargs):
+        self.counter.hit("ses.send_raw_email")
+        return {"MessageId": "bench-message"}
+
+    def get_send_quota(self, **kwargs):
+        self.counter.hit("ses.get_send_quota")
+        return {"Max24HourSend": 50000.0, "MaxSendRate": 14.0, "SentLast24Hours": 0.0}
+
+
+class FakeCloudWatch:
+    def __init__(self, counter):
+        self.counter = counter
+        self.meta = FakeMeta()
+
+    def put_metric_data(self, **kwargs):
+        self.counter.hit("cloudwatch.put_metric_data")
+
+
+class FakeBudgets:
+    def __init__(self, counter):
+        self.counter = counter
+        self.meta = FakeMeta()
+
+    def describe_budget(self, **kwargs):
+        self.counter.hit("budgets.describe_budget")
+        return {
+            "Budget": {
+                "BudgetLimit": {"Amount": "1000.0", "Unit": "USD"},
+                "CalculatedSpend": {
+                    "ActualSpend": {"Amount": "400.0", "Unit": "USD"},
+                    "ForecastedSpend": {"Amount": "900.0", "Unit": "USD"},
+                },
+            }
+        }
+
+
+class FakeSSM:
+    def __init__(self, counter):
+        self.counter = counter
+        self.meta = FakeMeta()
+
+    def get_parameters(self, Names, **kwargs):
+        self.counter.hit("ssm.get_parameters")
+        return {"Parameters": [{"Name": n, "Value": PARAMS[n]} for n in Names if n in PARAMS]}
+
+
+class FakeSTS:
+    def __init__(self, counter):
+        self.counter = counter
+        self.meta = FakeMeta()
+
+    def get_caller_identity(self, **kwargs):
+        self.counter.hit("sts.get_caller_identity")
+        return {"Account": "123456789012"}
+
+
+def load_app():
+    """Import lambda/app.py with benchmark configuration in the environment."""
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("METRICS_BACKEND", "api")
+    os.environ["PARAM_REPORT_TO"] = "/bench/report_to"
+    os.environ["PARAM_REPORT_FROM"] = "/bench/report_from"
+    os.environ["PARAM_ARCHIVE_BUCKET"] = "/bench/archive_bucket"
+    os.environ["PARAM_TOP_N_SERVICES"] = "/bench/top_n_services"
+    os.environ["PARAM_INCLUDE_MTD"] = "/bench/include_mtd"
+    os.environ["PARAM_INCLUDE_DRIVERS"] = "/bench/include_drivers"
+    sys.path.insert(0, os.path.abspath(LAMBDA_DIR))
+    import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    return app
+
+
+def install_fakes(app, counter, scale, page_size, throttle_every=0):
+    """Point every AWS client in app at a fresh set of fakes for one scenario."""
+    dims = {
+        "SERVICE": [f"Amazon Bench Service {i:04d}" for i in range(scale["services"])],
+        "USAGE_TYPE": [f"USE1-BenchUsage-{i:05d}" for i in range(scale["usage_types"])],
+        "REGION": [f"bench-region-{i}" for i in range(scale["regions"] - 1)] + ["global"],
+    }
+    fakes = {
+        "ce": FakeCostExplorer(counter, dims, page_size, throttle_every),
+        "s3": FakeS3(counter),
+        "ses": FakeSES(counter),
+        "cloudwatch": FakeCloudWatch(counter),
+        "budgets": FakeBudgets(counter),
+        "ssm": FakeSSM(counter),
+        "sts": FakeSTS(counter),
+    }
+    app._clients.update(fakes)
+    return fakes
+
+
+def freeze_clock(app, report_day):
+    """Make the handler report on report_day by pinning datetime.now to 07:00 the next day."""
+    real_datetime = app.datetime
+    frozen = datetime(report_day.year, report_day.month, report_day.day, 7) + timedelta(days=1)
+
+    class FrozenDatetime(real_datetime):
+        @classmethod
+        def now(cls, tz=None):
+            if tz is None:
+                return frozen
+            return frozen.replace(tzinfo=app.TZ).astimezone(tz)
+
+    app.datetime = FrozenDatetime
+    return real_datetime
+
+
+class FakeContext:
+    """Minimal Lambda context; the reporter reads the account ID from the function ARN."""
+
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:cost-alerting-reporter"
+    aws_request_id = "bench"
+
+    def get_remaining_time_in_millis(self):
+        return 300000
+
+
+def reset_warm_state(app):
+    """Drop everything a warm container would have kept between invocations."""
+    app._cache.clear()
+    app._result_cache.clear()
+    app._account_id = None
+    app._cold_start = True
+
+
+def run_scenario(app, name, scale, page_size, repeat, warm, throttle_every=0):
+    """Run one scenario repeat times; returns a dict of measurements."""
+    counter = CallCounter()
+    report_day = date(2026, 1, scale["day"])
+    real_datetime = freeze_clock(app, report_day)
+    try:
+        install_fakes(app, counter, scale, page_size, throttle_every)
+
+        # Peak memory from one cold traced run (tracemalloc slows execution, so it is not timed)
+        reset_warm_state(app)
+        tracemalloc.start()
+        app.lambda_handler(BENCH_EVENT, FakeContext())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        walls = []
+        result = None
+        for i in range(repeat):
+            if not warm or i == 0:
+                reset_warm_state(app)
+            counter.reset()
+            t0 = time.perf_counter()
+            result = app.lambda_handler(BENCH_EVENT, FakeContext())
+            walls.append(time.perf_counter() - t0)
+    finally:
+        app.datetime = real_datetime
+
+    return {
+        "scenario": name,
+        "scale": scale,
+        "page_size": page_size,
+        "runs": repeat,
+        "warm": warm,
+        "wall_ms_min": round(min(walls) * 1000, 1),
+        "wall_ms_avg": round(sum(walls) / len(walls) * 1000, 1),
+        "peak_mem_kib": round(peak / 1024, 1),
+        "api_calls": dict(sorted(counter.calls.items())),
+        "api_calls_total": sum(counter.calls.values()),
+        "phases": (result or {}).get("timings", {}).get("phases", {}),
+        "retries": (result or {}).get("timings", {}).get("retries", {}),
+    }
+
+
+def print_report(rows):
+    """Human-readable summary table followed by per-scenario API call counts."""
+    print(f"{'scenario':<10} {'day':>4} {'svc':>5} {'usage':>7} {'reg':>4} "
+          f"{'wall min ms':>12} {'wall avg ms':>12} {'peak KiB':>10} {'API calls':>10}")
+    for r in rows:
+        sc = r["scale"]
+        print(f"{r['scenario']:<10} {sc['day']:>4} {sc['services']:>5} {sc['usage_types']:>7} {sc['regions']:>4} "
+              f"{r['wall_ms_min']:>12} {r['wall_ms_avg']:>12} {r['peak_mem_kib']:>10} {r['api_calls_total']:>10}")
+    for r in rows:
+        print(f"\n[{r['scenario']}] API calls: " + ", ".join(f"{k}={v}" for k, v in r["api_calls"].items()))
+        slow = sorted(r["phases"].items(), key=lambda kv: kv[1]["ms"], reverse=True)[:5]
+        if slow:
+            print(f"[{r['scenario']}] slowest phases: " + ", ".join(f"{k}={v['ms']}ms" for k, v in slow))
+        if r["retries"]:
+            print(f"[{r['scenario']}] retries: " + ", ".join(
+                f"{k}={v['retries']} ({v['throttles']} throttled, {v['gave_up']} gave up)" for k, v in r["retries"].items()
+            ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the cost reporter against fake AWS clients.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="Preset scenario to run (repeatable; default: all presets)")
+    parser.add_argument("--day", type=int, help="Day of the month being reported (custom scenario)")
+    parser.add_argument("--services", type=int, help="Number of services (custom scenario)")
+    parser.add_argument("--usage-types", type=int, help="Number of usage types (custom scenario)")
+    parser.add_argument("--regions", type=int, help="Number of regions (custom scenario)")
+    parser.add_argument("--page-size", type=int, default=5000,
+                        help="Groups per Cost Explorer page before NextPageToken (default: 5000)")
+    parser.add_argument("--repeat", type=int, default=1, help="Invocations per scenario (default: 1)")
+    parser.add_argument("--warm", action="store_true",
+                        help="Keep warm-container caches between repeats instead of starting cold each time")
+    parser.add_argument("--throttle-every", type=int, default=0,
+                        help="Fail every Nth Cost Explorer request with ThrottlingException (default: never)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    scenarios = {}
+    if any(v is not None for v in (args.day, args.services, args.usage_types, args.regions)):
+        base = SCENARIOS["small"]
+        scenarios["custom"] = {
+            "day": args.day or base["day"],
+            "services": args.services or base["services"],
+            "usage_types": args.usage_types or base["usage_types"],
+            "regions": args.regions or base["regions"],
+        }
+    for name in args.scenario or ([] if scenarios else sorted(SCENARIOS, key=lambda n: SCENARIOS[n]["services"])):
+        scenarios[name] = SCENARIOS[name]
+
+    app = load_app()
+    rows = [
+        run_scenario(app, name, scale, args.page_size, args.repeat, args.warm, args.throttle_every)
+        for name, scale in scenarios.items()
+    ]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Re-render archived cost reports locally.
+
+Loads each day's archived views (daily_by_service, mtd_by_service and
+daily_drivers_usage_type, as columnar, JSON or CSV) from the archive bucket or
+from a local copy of it, and runs them through lambda/app.py's aggregation and
+HTML rendering. Cost Explorer and SES are never called, so layout changes and
+bad reports can be checked without waiting for a scheduled run.
+
+A local directory must mirror the bucket layout (reports/YYYY/MM/DD/...), e.g.
+    aws s3 sync s3://<archive-bucket>/reports ./archive/reports
+
+Usage:
+    python3 scripts/replay_reports.py --dir ./archive --start 2025-01-15
+    python3 scripts/replay_reports.py --bucket my-archive-bucket --start 2025-01-01 --end 2025-01-31
+    python3 scripts/replay_reports.py --dir ./archive --start 2025-01-01 --end 2025-03-31 --out /tmp/replay
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+
+
+class NoCalls:
+    """Client stand-in that fails loudly if replay ever reaches for the service."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        raise RuntimeError(f"Replay must not call {self.name}.{attr}")
+
+
+def load_app():
+    """Import lambda/app.py with placeholder configuration (replay never reads SSM)."""
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    for name in ("REPORT_TO", "REPORT_FROM", "ARCHIVE_BUCKET", "TOP_N_SERVICES", "INCLUDE_MTD", "INCLUDE_DRIVERS"):
+        os.environ.setdefault(f"PARAM_{name}", f"/replay/{name.lower()}")
+    sys.path.insert(0, os.path.abspath(LAMBDA_DIR))
+    import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    for name in ("ce", "ses", "ssm", "budgets", "cloudwatch"):
+        app._clients[name] = NoCalls(name)
+    return app
+
+
+def s3_reader(app, bucket):
+    """read(key) over the archive bucket; missing objects read as None."""
+    def read(key):
+        try:
+            return app.client("s3").get_object(Bucket=bucket, Key=key)["Body"].read()
+        except app.ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+    return read
+
+
+def dir_reader(root):
+    """read(key) over a local mirror of the archive bucket."""
+    def read(key):
+        path = os.path.join(root, *key.split("/"))
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+
+def cached(read):
+    """Memoize read() so neighbouring days share each other's archives in a batch."""
+    cache = {}
+    lock = threading.Lock()
+
+    def read_cached(key):
+        with lock:
+            if key in cache:
+                return cache[key]
+        body = read(key)
+        with lock:
+            cache[key] = body
+        return body
+    return read_cached
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-render archived cost reports without calling AWS Cost Explorer.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--bucket", help="Archive bucket to read reports/ from")
+    source.add_argument("--dir", help="Local directory mirroring the archive bucket")
+    parser.add_argument("--start", required=True, type=date.fromisoformat, help="First report day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last report day, inclusive (default: --start)")
+    parser.add_argument("--out", default="replay", help="Output directory for the HTML and text files (default: ./replay)")
+    parser.add_argument("--top-n", type=int, default=10, help="Rows per table (default: 10)")
+    parser.add_argument("--workers", type=int, default=8, help="Days rendered concurrently (default: 8)")
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    read = cached(s3_reader(app, args.bucket) if args.bucket else dir_reader(args.dir))
+    label = args.bucket or os.path.abspath(args.dir)
+    end = args.end or args.start
+    days = [args.start + timedelta(days=i) for i in range((end - args.start).days + 1)]
+    os.makedirs(args.out, exist_ok=True)
+
+    def render(day):
+        try:
+            html, text, subject = app.replay_report(read, day, top_n=args.top_n, bucket=label)
+        except ValueError as e:
+            return day, None, str(e)
+        path = os.path.join(args.out, f"report-{day.isoformat()}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        with open(os.path.join(args.out, f"report-{day.isoformat()}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        return day, path, subject
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        results = list(pool.map(render, days))
+    elapsed = time.perf_counter() - started
+
+    rendered = 0
+    for day, path, detail in results:
+        if path:
+            rendered += 1
+            print(f"{day}  {path}  {detail}")
+        else:
+            print(f"{day}  skipped: {detail}")
+    print(f"\nRendered {rendered}/{len(days)} day(s) in {elapsed * 1000:.0f} ms "
+          f"({elapsed * 1000 / max(rendered, 1):.1f} ms/day) from {label}")
+
+
+if __name__ == "__main__":
+    main()
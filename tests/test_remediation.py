@@ -0,0 +1,139 @@
+"""Unit tests for the remediation Lambda: budget notification parsing, the debounce lock and state writes (no AWS calls)."""
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from botocore.exceptions import ParamValidationError
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cost_remediation_lambda", "app.py")
+
+
+def load_remediation():
+    """Import cost_remediation_lambda/app.py as its own module (the reporter is also app.py)."""
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AUTOMATION_DOC_NAME", "cost-alerting-stop-tagged")
+    os.environ.setdefault("AUTOMATION_ASSUME_ROLE_ARN", "arn:aws:iam::111122223333:role/automation")
+    spec = importlib.util.spec_from_file_location("remediation_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+app = load_remediation()
+
+# An AWS Budgets SNS notification as delivered, threshold in dollars
+AWS_NOTIFICATION = """AWS Budget Notification October 16, 2026
+AWS Account 111122223333
+
+Dear AWS Customer,
+
+You requested that we alert you when the ACTUAL Cost associated with your cost-alerting-monthly budget is greater than $40.00 for the current month. The ACTUAL Cost associated with this budget is $42.50. You can find additional details below and by accessing the AWS Budgets dashboard [1].
+
+Budget Name: cost-alerting-monthly
+Budget Type: Cost
+Budgeted Amount: $50.00
+Alert Type: ACTUAL
+Alert Threshold: > $40.00
+ACTUAL Amount: $42.50
+
+[1] https://console.aws.amazon.com/billing/home#/budgets
+"""
+
+
+def sns_event(message, message_id="m-1"):
+    return {"Records": [{"Sns": {"MessageId": message_id, "Subject": "AWS Budgets", "Message": message}}]}
+
+
+class BudgetNotificationTests(unittest.TestCase):
+    def test_dollar_threshold_becomes_a_percentage(self):
+        fields = app.parse_budget_notification(AWS_NOTIFICATION)
+        self.assertEqual(fields["budget"], "cost-alerting-monthly")
+        self.assertEqual(fields["alert_type"], "ACTUAL")
+        self.assertEqual(fields["actual"], 42.5)
+        self.assertEqual(fields["threshold"], 80.0)
+
+    def test_percentage_threshold_is_used_as_is(self):
+        message = AWS_NOTIFICATION.replace("Alert Threshold: > $40.00", "Alert Threshold: > 100%")
+        self.assertEqual(app.parse_budget_notification(message)["threshold"], 100.0)
+
+    def test_80_percent_alert_is_below_threshold(self):
+        trigger = app.triggers_from_event(sns_event(AWS_NOTIFICATION))[0]
+        self.assertEqual(app.out_of_scope(trigger), "below_threshold")
+
+    def test_100_percent_alert_is_in_scope(self):
+        message = AWS_NOTIFICATION.replace("> $40.00", "> $50.00")
+        trigger = app.triggers_from_event(sns_event(message))[0]
+        self.assertEqual(trigger["threshold"], 100.0)
+        self.assertIsNone(app.out_of_scope(trigger))
+
+    def test_unparseable_threshold_fails_closed(self):
+        message = AWS_NOTIFICATION.replace("Alert Threshold: > $40.00\n", "").replace("greater than $40.00", "over")
+        trigger = app.triggers_from_event(sns_event(message))[0]
+        self.assertNotIn("threshold", trigger)
+        self.assertEqual(app.out_of_scope(trigger), "unknown_threshold")
+
+    def test_manual_trigger_is_in_scope(self):
+        trigger = app.triggers_from_event({"force": True})[0]
+        self.assertIsNone(app.out_of_scope(trigger))
+
+
+class DebounceLockTests(unittest.TestCase):
+    def setUp(self):
+        self.lock_dir = tempfile.TemporaryDirectory()
+        self.saved_lock_dir = app.LOCK_DIR
+        app.LOCK_DIR = self.lock_dir.name
+
+    def tearDown(self):
+        app.LOCK_DIR = self.saved_lock_dir
+        self.lock_dir.cleanup()
+
+    def trigger(self, threshold, message_id):
+        return {"budget": "cost-alerting-monthly", "threshold": threshold, "message_id": message_id,
+                "manual": False, "force": False}
+
+    def test_repeat_alert_is_debounced(self):
+        self.assertIsNotNone(app.acquire_lock(self.trigger(100.0, "a"))[1])
+        lock, etag = app.acquire_lock(self.trigger(100.0, "b"))
+        self.assertIsNone(etag)
+        self.assertEqual(lock["message_id"], "a")
+
+    def test_higher_threshold_takes_over_the_lock(self):
+        self.assertIsNotNone(app.acquire_lock(self.trigger(80.0, "a"))[1])
+        lock, etag = app.acquire_lock(self.trigger(100.0, "b"))
+        self.assertIsNotNone(etag)
+        self.assertEqual((lock["message_id"], lock["threshold"]), ("b", 100.0))
+        self.assertIsNone(app.acquire_lock(self.trigger(80.0, "c"))[1])
+
+
+class OldBotocoreS3:
+    """An S3 client whose botocore predates conditional writes."""
+
+    def __init__(self):
+        self.writes = []
+
+    def put_object(self, **kwargs):
+        if "IfMatch" in kwargs or "IfNoneMatch" in kwargs:
+            raise ParamValidationError(report='Unknown parameter in input: "IfNoneMatch"')
+        self.writes.append(kwargs["Key"])
+        return {"ETag": f'"{len(self.writes)}"'}
+
+
+class ConditionalWriteFallbackTests(unittest.TestCase):
+    def setUp(self):
+        self.saved = (app.s3, app.LOCK_DIR, app._conditional_writes)
+        app.s3, app.LOCK_DIR = OldBotocoreS3(), ""
+
+    def tearDown(self):
+        app.s3, app.LOCK_DIR, app._conditional_writes = self.saved
+
+    def test_state_is_written_without_conditions(self):
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(app.write_state("state/remediation/b.json", {}, None), '"1"')
+        self.assertFalse(app._conditional_writes)
+        self.assertEqual(app.write_state("state/remediation/b.json", {}, '"1"'), '"2"')
+        self.assertEqual(app.s3.writes, ["state/remediation/b.json"] * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
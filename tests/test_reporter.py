@@ -0,0 +1,753 @@
+"""Unit tests for the reporter Lambda's run markers, archives and report logic (no AWS calls)."""
+import gzip
+import importlib.util
+import json
+import os
+import unittest
+from datetime import date, datetime, timedelta, timezone
+
+from botocore.exceptions import ClientError, ReadTimeoutError
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "app.py")
+
+
+def load_reporter():
+    """Import lambda/app.py as its own module (the remediation Lambda is also app.py)."""
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    for name in ("REPORT_TO", "REPORT_FROM", "ARCHIVE_BUCKET", "TOP_N_SERVICES", "INCLUDE_MTD", "INCLUDE_DRIVERS"):
+        os.environ.setdefault(f"PARAM_{name}", f"/cost-alerting/{name.lower()}")
+    os.environ.setdefault("ENABLE_METRICS", "false")
+    spec = importlib.util.spec_from_file_location("reporter_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+app = load_reporter()
+BUCKET = "archive"
+HISTORY_DAYS = 28
+
+
+def client_error(code, operation):
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class FakeS3:
+    """In-memory S3 with ETags and If-Match / If-None-Match conditional puts."""
+
+    def __init__(self):
+        self.objects = {}
+        self.versions = 0
+        self.gets = 0
+        self.before_put = None
+
+    def get_object(self, Bucket, Key):
+        self.gets += 1
+        if Key not in self.objects:
+            raise client_error("NoSuchKey", "GetObject")
+        body, etag = self.objects[Key]
+        return {"Body": FakeBody(body), "ETag": etag}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        if self.before_put is not None:
+            hook, self.before_put = self.before_put, None
+            hook()
+        current = self.objects.get(Key)
+        if (IfNoneMatch == "*" and current is not None) or (IfMatch is not None and (current or (None, None))[1] != IfMatch):
+            raise client_error("PreconditionFailed", "PutObject")
+        self.versions += 1
+        etag = f'"{self.versions}"'
+        self.objects[Key] = (Body if isinstance(Body, bytes) else Body.read(), etag)
+        return {"ETag": etag}
+
+    def json(self, key):
+        return json.loads(self.objects[key][0])
+
+
+class StubbedClientsTest(unittest.TestCase):
+    """Swaps fakes into the reporter's client cache for the duration of a test."""
+
+    def setUp(self):
+        self.saved_clients = dict(app._clients)
+        self.s3 = FakeS3()
+        app._clients["s3"] = self.s3
+
+    def tearDown(self):
+        app._clients.clear()
+        app._clients.update(self.saved_clients)
+
+
+class RunMarkerTests(StubbedClientsTest):
+    DAY = date(2026, 10, 15)
+
+    def marker(self):
+        return self.s3.json(app.run_marker_key(self.DAY))
+
+    def test_first_claim_starts_at_fetch(self):
+        marker, etag = app.claim_run(BUCKET, self.DAY, "a", 60)
+        self.assertIsNotNone(etag)
+        self.assertEqual((marker["phase"], marker["owner"], marker["attempts"]), ("fetch", "a", 1))
+
+    def test_done_marker_is_not_claimed_again(self):
+        marker, etag = app.claim_run(BUCKET, self.DAY, "a", 60)
+        app.advance_run(BUCKET, self.DAY, marker, etag, "done", message_ids=["m-1"])
+        marker, etag = app.claim_run(BUCKET, self.DAY, "b", 60)
+        self.assertIsNone(etag)
+        self.assertEqual((marker["phase"], marker["message_ids"]), ("done", ["m-1"]))
+
+    def test_force_reclaims_a_done_marker(self):
+        marker, etag = app.claim_run(BUCKET, self.DAY, "a", 60)
+        app.advance_run(BUCKET, self.DAY, marker, etag, "done")
+        marker, etag = app.claim_run(BUCKET, self.DAY, "b", 60, force=True)
+        self.assertIsNotNone(etag)
+        self.assertEqual((marker["phase"], marker["owner"]), ("fetch", "b"))
+
+    def test_live_lease_blocks_another_owner(self):
+        app.claim_run(BUCKET, self.DAY, "a", 60)
+        marker, etag = app.claim_run(BUCKET, self.DAY, "b", 60)
+        self.assertIsNone(etag)
+        self.assertEqual(marker["owner"], "a")
+
+    def test_expired_lease_is_taken_over(self):
+        app.claim_run(BUCKET, self.DAY, "a", -1)
+        marker, etag = app.claim_run(BUCKET, self.DAY, "b", 60)
+        self.assertIsNotNone(etag)
+        self.assertEqual((marker["owner"], marker["attempts"]), ("b", 2))
+        self.assertEqual(self.marker()["owner"], "b")
+
+    def test_released_lease_is_taken_over_at_once(self):
+        marker, etag = app.claim_run(BUCKET, self.DAY, "a", 60)
+        app.release_run(BUCKET, self.DAY, marker, etag)
+        self.assertIsNotNone(app.claim_run(BUCKET, self.DAY, "b", 60)[1])
+
+    def test_email_marker_resumes_at_email(self):
+        marker, etag = app.claim_run(BUCKET, self.DAY, "a", 60)
+        etag = app.advance_run(BUCKET, self.DAY, marker, etag, "email", prefix="reports/2026/10/15/")
+        app.release_run(BUCKET, self.DAY, marker, etag)
+        marker, etag = app.claim_run(BUCKET, self.DAY, "b", 60)
+        self.assertIsNotNone(etag)
+        self.assertEqual((marker["phase"], marker["prefix"]), ("email", "reports/2026/10/15/"))
+
+    def test_precondition_failure_rereads_the_marker(self):
+        def racing_claim():
+            self.s3.objects[app.run_marker_key(self.DAY)] = (
+                json.dumps({"phase": "fetch", "owner": "b", "lease_until": "2999-01-01T00:00:00+00:00"}).encode(),
+                '"racer"',
+            )
+
+        self.s3.before_put = racing_claim
+        marker, etag = app.claim_run(BUCKET, self.DAY, "a", 60)
+        self.assertIsNone(etag)
+        self.assertEqual(marker["owner"], "b")
+        self.assertEqual(self.s3.gets, 2)
+
+    def test_advance_with_a_stale_etag_raises(self):
+        marker, etag = app.claim_run(BUCKET, self.DAY, "a", -1)
+        app.claim_run(BUCKET, self.DAY, "b", 60)
+        with self.assertRaises(RuntimeError):
+            app.advance_run(BUCKET, self.DAY, marker, etag, "email")
+        self.assertEqual(self.marker()["owner"], "b")
+
+
+class IncrementalMtdTests(unittest.TestCase):
+    """Runs the accumulator day by day against a month-start query of the same costs."""
+
+    SERVICES = ("Amazon EC2", "Amazon S3", "AWS Lambda")
+
+    def setUp(self):
+        self.costs = {}
+        day = date(2026, 9, 20)
+        while day < date(2026, 11, 1):
+            self.costs[day.isoformat()] = {s: round(1 + day.day * 0.5 + i, 2) for i, s in enumerate(self.SERVICES)}
+            day += timedelta(days=1)
+        self.full_queries = 0
+        self.saved = (app.fetch_daily_by_service, app.MTD_RECONCILE_EVERY_DAYS)
+        app.fetch_daily_by_service = self.fetch
+        app.MTD_RECONCILE_EVERY_DAYS = 100  # no scheduled rebuilds unless a test asks for them
+
+    def tearDown(self):
+        app.fetch_daily_by_service, app.MTD_RECONCILE_EVERY_DAYS = self.saved
+
+    def fetch(self, start, end, bucket=None, cube_start=None):
+        self.full_queries += 1
+        return self.window(start, end), None, {}
+
+    def window(self, start, end):
+        return {d: dict(c) for d, c in self.costs.items() if start.isoformat() <= d < end.isoformat()}
+
+    def run_day(self, state, report_day):
+        window_start = report_day - timedelta(days=7)
+        return app.incremental_mtd(state, self.window(window_start, report_day + timedelta(days=1)), window_start, report_day)
+
+    def assert_matches_month_query(self, totals, report_day):
+        expected = dict(app.rows_for_days(self.costs, report_day.replace(day=1), report_day + timedelta(days=1))[0])
+        self.assertEqual(set(totals), set(expected))
+        for service, amount in expected.items():
+            self.assertAlmostEqual(totals[service], amount, places=6)
+
+    def test_day_by_day_matches_the_month_query(self):
+        state = None
+        for n in range(1, 32):
+            report_day = date(2026, 10, n)
+            totals, state = self.run_day(state, report_day)
+            self.assert_matches_month_query(totals, report_day)
+        self.assertEqual(self.full_queries, 1)  # only the first day had no state
+
+    def test_scheduled_reconcile_also_matches(self):
+        app.MTD_RECONCILE_EVERY_DAYS = 7
+        state = None
+        for n in range(1, 32):
+            totals, state = self.run_day(state, date(2026, 10, n))
+            self.assert_matches_month_query(totals, date(2026, 10, n))
+        self.assertGreater(self.full_queries, 1)
+
+    def test_month_rollover_resets_the_state(self):
+        state = None
+        for n in range(20, 31):
+            _, state = self.run_day(state, date(2026, 9, n))
+        queries = self.full_queries
+        totals, state = self.run_day(state, date(2026, 10, 1))
+        self.assertEqual(self.full_queries, queries + 1)
+        self.assertEqual(state["month"], "2026-10")
+        self.assert_matches_month_query(totals, date(2026, 10, 1))
+
+    def test_missing_state_falls_back_to_the_full_query(self):
+        totals, state = self.run_day(None, date(2026, 10, 12))
+        self.assertEqual(self.full_queries, 1)
+        self.assert_matches_month_query(totals, date(2026, 10, 12))
+        self.assertEqual(state["through"], "2026-10-12")
+
+    def test_stale_state_falls_back_to_the_full_query(self):
+        _, state = self.run_day(None, date(2026, 10, 2))
+        totals, state = self.run_day(state, date(2026, 10, 20))  # 2nd is before the 20th's window
+        self.assertEqual(self.full_queries, 2)
+        self.assert_matches_month_query(totals, date(2026, 10, 20))
+
+    def test_restated_day_in_the_window_replaces_its_old_value(self):
+        state = None
+        for n in range(1, 11):
+            _, state = self.run_day(state, date(2026, 10, n))
+        self.costs["2026-10-08"]["Amazon EC2"] += 25.0
+        totals, state = self.run_day(state, date(2026, 10, 11))
+        self.assertEqual(self.full_queries, 1)
+        self.assert_matches_month_query(totals, date(2026, 10, 11))
+
+    def test_older_day_than_the_state_is_not_persisted(self):
+        _, state = self.run_day(None, date(2026, 10, 12))
+        totals, new_state = self.run_day(state, date(2026, 10, 9))
+        self.assertIsNone(new_state)
+        self.assert_matches_month_query(totals, date(2026, 10, 9))
+
+
+class ColumnarTests(unittest.TestCase):
+    START, END = date(2026, 10, 1), date(2026, 10, 3)
+    GROUPS = [
+        ("2026-10-01", "Amazon EC2", 12.345678901),
+        ("2026-10-01", "Amazon S3", 0.0),
+        ("2026-10-01", "Tax", -3.25),
+        ("2026-10-02", "Amazon EC2", 11.5),
+        ("2026-10-02", "Zürich Ωmega ☁️ Service", 0.0000001),
+        ("2026-10-02", "Refund", -100.0),
+    ]
+
+    def test_round_trip(self):
+        body, meta = app.encode_columnar(iter(self.GROUPS), "SERVICE", self.START, self.END)
+        header, rows = app.decode_columnar(body)
+        self.assertEqual(rows, self.GROUPS)
+        self.assertEqual((header["dimension"], header["start"], header["end"]), ("SERVICE", "2026-10-01", "2026-10-03"))
+        self.assertEqual(header["days"], ["2026-10-01", "2026-10-02"])
+        self.assertEqual(len(header["keys"]), 5)
+        self.assertEqual((meta["rows"], meta["keys"], meta["bytes"]), (6, 5, len(body)))
+        self.assertAlmostEqual(sum(a for _, _, a in rows), sum(a for _, _, a in self.GROUPS), places=9)
+        self.assertAlmostEqual(meta["total"], sum(a for _, _, a in self.GROUPS if a > 0), places=9)
+
+    def test_empty_group_set(self):
+        body, meta = app.encode_columnar([], "USAGE_TYPE", self.START, self.END)
+        header, rows = app.decode_columnar(body)
+        self.assertEqual(rows, [])
+        self.assertEqual((header["rows"], header["days"], header["keys"]), (0, [], []))
+        self.assertEqual((meta["rows"], meta["total"]), (0, 0))
+
+    def test_round_trip_of_a_raw_response(self):
+        rows = [("Amazon EC2", 40.5), ("Amazon S3", 2.25), ("Support (Business)", 0.01)]
+        raw = app.rows_to_raw(rows, self.START, self.END, "SERVICE")
+        body, _ = app.encode_columnar(app.raw_groups(raw), "SERVICE", self.START, self.END)
+        decoded = {key: amount for _, key, amount in app.decode_columnar(body)[1]}
+        self.assertEqual(decoded, dict(rows))
+
+    def test_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            app.decode_columnar(gzip.compress(b'{"not": "columnar"}'))
+
+
+class RenderEscapingTests(unittest.TestCase):
+    SERVICE = 'Evil <b>&"Service"</b>'
+    USAGE_TYPE = 'USE1-<Box>&"Usage"'
+
+    def render(self):
+        day = date(2026, 10, 15)
+        by_day = {}
+        d = date(2026, 9, 1)
+        while d <= day:
+            by_day[d.isoformat()] = {"Amazon EC2": 10.0, self.SERVICE: 5.0}
+            d += timedelta(days=1)
+        report = app.summarize_day(by_day, day, True)
+        report.update(
+            regional_rows=[("us-east-1", 15.0)], region_services=None, warnings=[], budget_info=None,
+            aws_forecast=None, d_rows=[(self.USAGE_TYPE, 3.0)], d_total=3.0, top_n=10, include_mtd=True,
+            include_drivers=True, bucket="archive", prefix="reports/2026/10/15/",
+        )
+        return app.render_report(report)
+
+    def test_names_are_escaped_in_html(self):
+        html, _, _ = self.render()
+        self.assertIn("Evil &lt;b&gt;&amp;&quot;Service&quot;&lt;/b&gt;", html)
+        self.assertIn("USE1-&lt;Box&gt;&amp;&quot;Usage&quot;", html)
+        self.assertNotIn(self.SERVICE, html)
+        self.assertNotIn(self.USAGE_TYPE, html)
+
+    def test_names_are_left_as_is_in_text(self):
+        _, text, _ = self.render()
+        self.assertIn(self.SERVICE, text)
+        self.assertIn(self.USAGE_TYPE, text)
+        self.assertNotIn("&lt;", text)
+        self.assertNotIn("&amp;", text)
+
+    def test_html_fields_are_not_escaped_twice(self):
+        out = []
+        app.emit(out, "row", name="A&B", amount=1.0)
+        self.assertIn("A&amp;B", "".join(out))
+        self.assertNotIn("&amp;amp;", "".join(out))
+
+
+class FakeSES:
+    """SES that rejects any call including a bad address and can throttle or time out on demand."""
+
+    def __init__(self, bad=(), throttle_first=0, timeout=False):
+        self.bad = set(bad)
+        self.throttles_left = throttle_first
+        self.timeout = timeout
+        self.calls = []
+
+    def get_send_quota(self):
+        return {"MaxSendRate": 1000.0}
+
+    def send_raw_email(self, Source, Destinations, RawMessage):
+        self.calls.append(list(Destinations))
+        if self.timeout:
+            raise ReadTimeoutError(endpoint_url="https://email.us-east-1.amazonaws.com")
+        if self.throttles_left:
+            self.throttles_left -= 1
+            raise client_error("Throttling", "SendRawEmail")
+        if self.bad & set(Destinations):
+            raise client_error("MessageRejected", "SendRawEmail")
+        to = RawMessage["Data"].split(b"\r\n", 1)[0]
+        assert to == b"To: " + ", ".join(Destinations).encode(), to
+        return {"MessageId": f"m-{len(self.calls)}"}
+
+
+class SendRawTests(StubbedClientsTest):
+    RAW = b"Subject: AWS Cost Report\r\n\r\nbody"
+
+    def setUp(self):
+        super().setUp()
+        self.saved = (app._ses_send_rate, dict(app._rate_state), dict(app.RATE_LIMITS), app.BACKOFF_BASE_SECONDS)
+        app._ses_send_rate = None
+        app.BACKOFF_BASE_SECONDS = 0
+
+    def tearDown(self):
+        app._ses_send_rate = self.saved[0]
+        app._rate_state.clear()
+        app._rate_state.update(self.saved[1])
+        app.RATE_LIMITS.clear()
+        app.RATE_LIMITS.update(self.saved[2])
+        app.BACKOFF_BASE_SECONDS = self.saved[3]
+        super().tearDown()
+
+    def send(self, ses, recipients):
+        app._clients["ses"] = ses
+        return app.send_raw("reports@example.com", recipients, self.RAW)
+
+    def test_parse_recipients(self):
+        self.assertEqual(
+            app.parse_recipients("a@x.com, b@x.com;c@x.com  A@x.com\n d@x.com"),
+            ["a@x.com", "b@x.com", "c@x.com", "d@x.com"],
+        )
+        self.assertEqual(app.parse_recipients(["a@x.com", "b@x.com,c@x.com"]), ["a@x.com", "b@x.com", "c@x.com"])
+        self.assertEqual(app.parse_recipients(""), [])
+
+    def test_recipients_go_out_in_batches_of_50(self):
+        recipients = [f"user{i}@example.com" for i in range(120)]
+        ses = FakeSES()
+        result = self.send(ses, recipients)
+        self.assertEqual(sorted(len(c) for c in ses.calls), [20, 50, 50])
+        self.assertEqual(sorted(a for c in ses.calls for a in c), sorted(recipients))
+        self.assertEqual((result["sent"], result["failed"]), (120, {}))
+        self.assertEqual(sorted(result["message_ids"]), ["m-1", "m-2", "m-3"])
+
+    def test_rejected_batch_falls_back_to_one_call_per_recipient(self):
+        recipients = [f"user{i}@example.com" for i in range(120)]
+        recipients[60] = "bad@example.com"
+        ses = FakeSES(bad={"bad@example.com"})
+        result = self.send(ses, recipients)
+        # three batches, then the rejected one's 50 addresses one at a time
+        self.assertEqual(len(ses.calls), 53)
+        self.assertEqual(sum(1 for c in ses.calls if len(c) == 1), 50)
+        self.assertEqual(set(result["failed"]), {"bad@example.com"})
+        self.assertIn("MessageRejected", result["failed"]["bad@example.com"])
+        self.assertEqual(result["sent"], 119)
+        self.assertEqual(len(result["message_ids"]), 2 + 49)
+        self.assertEqual(len(set(result["message_ids"])), 51)
+
+    def test_throttled_send_is_retried(self):
+        ses = FakeSES(throttle_first=1)
+        result = self.send(ses, ["a@example.com"])
+        self.assertEqual((len(ses.calls), result["sent"]), (2, 1))
+
+    def test_timed_out_send_is_not_retried(self):
+        ses = FakeSES(timeout=True)
+        with self.assertRaises(RuntimeError):
+            self.send(ses, ["a@example.com"])
+        self.assertEqual(len(ses.calls), 1)
+
+    def test_no_recipient_reached_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.send(FakeSES(bad={"bad@example.com"}), ["bad@example.com"])
+        with self.assertRaises(ValueError):
+            self.send(FakeSES(), [])
+
+
+class AnomalyDetectionTests(unittest.TestCase):
+    DAY = date(2026, 10, 15)
+
+    def series(self, days, costs):
+        """by_day with costs (a dict) on each of the `days` days before DAY."""
+        return {(self.DAY - timedelta(days=i)).isoformat(): dict(costs) for i in range(1, days + 1)}
+
+    def test_flat_series_has_no_anomaly(self):
+        by_day = self.series(30, {"Amazon EC2": 10.0, "Amazon S3": 0.0})
+        by_day[self.DAY.isoformat()] = {"Amazon EC2": 10.0, "Amazon S3": 0.0}
+        self.assertEqual(app.detect_anomalies(by_day, self.DAY, 30), [])
+
+    def test_zero_mad_does_not_divide_by_zero(self):
+        by_day = self.series(30, {"Amazon EC2": 10.0})
+        by_day[self.DAY.isoformat()] = {"Amazon EC2": 10.2, "New Service": 0.5}
+        self.assertEqual(app.detect_anomalies(by_day, self.DAY, 30), [])
+
+    def test_single_spike_is_flagged(self):
+        by_day = self.series(30, {"Amazon EC2": 10.0, "Amazon S3": 2.0})
+        for i in range(1, 31):
+            by_day[(self.DAY - timedelta(days=i)).isoformat()]["Amazon EC2"] += (i % 3) * 0.1
+        by_day[self.DAY.isoformat()] = {"Amazon EC2": 50.0, "Amazon S3": 2.0}
+        anomalies = app.detect_anomalies(by_day, self.DAY, 30)
+        self.assertEqual([a["service"] for a in anomalies], ["Amazon EC2"])
+        self.assertAlmostEqual(anomalies[0]["baseline"], 10.1)
+        self.assertAlmostEqual(anomalies[0]["change"], 39.9)
+        self.assertGreater(anomalies[0]["score"], app.ANOMALY_Z_THRESHOLD)
+
+    def test_new_service_has_no_percentage(self):
+        by_day = self.series(30, {"Amazon EC2": 10.0})
+        by_day[self.DAY.isoformat()] = {"Amazon EC2": 10.0, "Amazon SageMaker": 40.0}
+        anomalies = app.detect_anomalies(by_day, self.DAY, 30)
+        self.assertEqual([(a["service"], a["pct"]) for a in anomalies], [("Amazon SageMaker", None)])
+
+    def test_earlier_spike_does_not_mask_the_next(self):
+        by_day = self.series(30, {"Amazon EC2": 10.0})
+        by_day[(self.DAY - timedelta(days=5)).isoformat()] = {"Amazon EC2": 60.0}
+        by_day[self.DAY.isoformat()] = {"Amazon EC2": 60.0}
+        self.assertEqual(len(app.detect_anomalies(by_day, self.DAY, 30)), 1)
+
+    def test_history_shorter_than_the_lookback(self):
+        by_day = self.series(10, {"Amazon EC2": 10.0})
+        by_day[self.DAY.isoformat()] = {"Amazon EC2": 50.0}
+        self.assertEqual(len(app.detect_anomalies(by_day, self.DAY, 30)), 1)
+
+    def test_too_little_history_is_skipped(self):
+        by_day = self.series(app.ANOMALY_MIN_HISTORY_DAYS - 1, {"Amazon EC2": 10.0})
+        by_day[self.DAY.isoformat()] = {"Amazon EC2": 500.0}
+        self.assertEqual(app.detect_anomalies(by_day, self.DAY, 30), [])
+
+
+class ForecastTests(unittest.TestCase):
+    WEEKDAYS = [t % 7 for t in range(HISTORY_DAYS)]
+    FUTURE = [(HISTORY_DAYS + i) % 7 for i in range(10)]
+
+    def test_linear_series_reproduces_the_trend(self):
+        series = [50.0 + 2.0 * t for t in range(HISTORY_DAYS)]
+        expected, half_width = app.fit_daily_forecast(series, self.WEEKDAYS, self.FUTURE)
+        self.assertAlmostEqual(expected, sum(50.0 + 2.0 * (HISTORY_DAYS + i) for i in range(10)), places=6)
+        self.assertAlmostEqual(half_width, 0.0, places=6)
+
+    def test_weekday_factors_are_applied(self):
+        factors = [1.2] * 5 + [0.5] * 2
+        mean = sum(factors) / 7
+        factors = [f / mean for f in factors]
+        series = [(50.0 + 2.0 * t) * factors[w] for t, w in enumerate(self.WEEKDAYS)]
+        expected, _ = app.fit_daily_forecast(series, self.WEEKDAYS, self.FUTURE)
+        actual = sum((50.0 + 2.0 * (HISTORY_DAYS + i)) * factors[w] for i, w in enumerate(self.FUTURE))
+        self.assertAlmostEqual(expected / actual, 1.0, delta=0.025)
+        # A weekend-only horizon is forecast well below a weekday-only one
+        weekend, _ = app.fit_daily_forecast(series, self.WEEKDAYS, [5, 6])
+        weekdays, _ = app.fit_daily_forecast(series, self.WEEKDAYS, [0, 1])
+        self.assertLess(weekend, weekdays / 2)
+
+    def test_short_series_uses_the_trend_alone(self):
+        series = [10.0 + t for t in range(7)]
+        expected, _ = app.fit_daily_forecast(series, self.WEEKDAYS[:7], [0, 1, 2])
+        self.assertAlmostEqual(expected, 17.0 + 18.0 + 19.0, places=6)
+
+    def test_falling_trend_is_clamped_at_zero(self):
+        series = [30.0 - 2.0 * t for t in range(14)]
+        expected, _ = app.fit_daily_forecast(series, self.WEEKDAYS[:14], list(range(7)) * 3)
+        self.assertAlmostEqual(expected, 2.0 + 0.0, places=6)
+
+    def test_no_spend_forecasts_nothing(self):
+        self.assertEqual(app.fit_daily_forecast([], [], [0, 1]), (0.0, 0.0))
+        self.assertEqual(app.fit_daily_forecast([0.0] * 14, self.WEEKDAYS[:14], [0, 1]), (0.0, 0.0))
+        self.assertEqual(app.fit_daily_forecast([5.0] * 14, self.WEEKDAYS[:14], []), (0.0, 0.0))
+
+
+class MonitorWindowTests(unittest.TestCase):
+    NOW = datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+
+    def fetch(self, windows, now):
+        """One service per hour; its cost is the hour's index, plus 0.5 once the hour has settled."""
+        fetched = {}
+        for start, end in windows:
+            hour = start
+            while hour < end:
+                settled = now - hour >= timedelta(hours=app.MONITOR_SETTLE_HOURS)
+                fetched[app.ce_time(hour)] = {"Amazon EC2": hour.timestamp() // 3600 + (0.5 if settled else 0.0)}
+                hour += timedelta(hours=1)
+        return fetched
+
+    def run_monitor(self, state, now):
+        windows, settle_before = app.plan_monitor_windows(state, now)
+        state = app.update_monitor_state(state, self.fetch(windows, now), windows, now, settle_before)
+        return windows, settle_before, state
+
+    def test_first_run_seeds_and_settles_the_older_half(self):
+        windows, settle_before, state = self.run_monitor(None, self.NOW)
+        self.assertEqual(windows, [(self.NOW - timedelta(hours=app.MONITOR_SEED_HOURS), self.NOW)])
+        self.assertEqual(settle_before, self.NOW - timedelta(hours=app.MONITOR_SETTLE_HOURS))
+        self.assertEqual(state["through"], app.ce_time(self.NOW))
+        self.assertEqual(len(state["recent"]), app.MONITOR_SETTLE_HOURS)
+        self.assertEqual(min(state["recent"]), app.ce_time(settle_before))
+        self.assertEqual(state["baseline"]["hours"], app.MONITOR_SEED_HOURS - app.MONITOR_SETTLE_HOURS)
+
+    def test_steady_state_reads_only_the_new_hour_and_late_window(self):
+        _, _, state = self.run_monitor(None, self.NOW)
+        now = self.NOW + timedelta(hours=1)
+        windows, settle_before = app.plan_monitor_windows(state, now)
+        self.assertEqual(windows, [(self.NOW - timedelta(hours=app.MONITOR_LATE_HOURS), now)])
+        self.assertIsNone(settle_before)
+
+    def test_settling_hours_are_read_once_in_a_batch(self):
+        _, _, state = self.run_monitor(None, self.NOW)
+        for i in range(1, app.MONITOR_SETTLE_BATCH_HOURS):
+            windows, settle_before, state = self.run_monitor(state, self.NOW + timedelta(hours=i))
+            self.assertEqual(len(windows), 1)
+            self.assertIsNone(settle_before)
+
+        now = self.NOW + timedelta(hours=app.MONITOR_SETTLE_BATCH_HOURS)
+        windows, settle_before, state = self.run_monitor(state, now)
+        self.assertEqual(settle_before, now - timedelta(hours=app.MONITOR_SETTLE_HOURS))
+        self.assertEqual(windows, [
+            (self.NOW - timedelta(hours=app.MONITOR_SETTLE_HOURS), settle_before),
+            (now - timedelta(hours=1 + app.MONITOR_LATE_HOURS), now),
+        ])
+        self.assertEqual(min(state["recent"]), app.ce_time(settle_before))
+
+    def test_gap_rereads_every_hour_since_the_last_run(self):
+        _, _, state = self.run_monitor(None, self.NOW)
+        now = self.NOW + timedelta(hours=6)
+        windows, settle_before = app.plan_monitor_windows(state, now)
+        self.assertEqual(windows[-1], (self.NOW - timedelta(hours=app.MONITOR_LATE_HOURS), now))
+        self.assertEqual(settle_before, now - timedelta(hours=app.MONITOR_SETTLE_HOURS))
+
+        state = app.update_monitor_state(state, self.fetch(windows, now), windows, now, settle_before)
+        expected = set()
+        hour = settle_before
+        while hour < now:
+            expected.add(app.ce_time(hour))
+            hour += timedelta(hours=1)
+        self.assertEqual(set(state["recent"]), expected)
+
+    def test_every_hour_enters_the_baseline_once_after_settling(self):
+        folded = []
+        fold_baseline = app.fold_baseline
+        app.fold_baseline = lambda baseline, total: (folded.append(total), fold_baseline(baseline, total))[1]
+        self.addCleanup(setattr, app, "fold_baseline", fold_baseline)
+
+        state, now, reads = None, self.NOW, []
+        for _ in range(72):
+            windows, _, state = self.run_monitor(state, now)
+            reads.append(sum((end - start) // timedelta(hours=1) for start, end in windows))
+            now += timedelta(hours=1)
+
+        hours = [int(total) for total in folded]
+        self.assertEqual(hours, list(range(hours[0], hours[0] + len(hours))))
+        self.assertTrue(all(total % 1 == 0.5 for total in folded))
+        self.assertEqual(state["baseline"]["hours"], len(folded))
+        # After the seed, a run reads the late window plus at most one settle batch
+        self.assertLessEqual(max(reads[1:]), 1 + app.MONITOR_LATE_HOURS + app.MONITOR_SETTLE_BATCH_HOURS)
+
+
+class FakeCE:
+    """Cost Explorer returning one group per day; each call's amounts are its call number."""
+
+    KEYS = {"SERVICE": "Amazon EC2", "REGION": "us-east-1", "USAGE_TYPE": "BoxUsage:m5.large"}
+
+    def __init__(self):
+        self.periods = []
+
+    def get_cost_and_usage(self, TimePeriod, GroupBy=(), **kwargs):
+        self.periods.append((TimePeriod["Start"], TimePeriod["End"]))
+        results = []
+        day, end = date.fromisoformat(TimePeriod["Start"]), date.fromisoformat(TimePeriod["End"])
+        while day < end:
+            amount = str(len(self.periods))
+            results.append({
+                "TimePeriod": {"Start": day.isoformat(), "End": (day + timedelta(days=1)).isoformat()},
+                "Groups": [{
+                    "Keys": [self.KEYS[g["Key"]] for g in GroupBy],
+                    "Metrics": {"UnblendedCost": {"Amount": amount, "Unit": "USD"}},
+                }],
+            })
+            day += timedelta(days=1)
+        return {"ResultsByTime": results, "GroupDefinitions": list(GroupBy)}
+
+
+class CachedDailyResultsTests(StubbedClientsTest):
+    # The scheduled report's wall clock: 07:00 in the report time zone is 14:00 UTC on Oct 15
+    NOW = datetime(2026, 10, 15, 7, tzinfo=app.TZ)
+    START, END = date(2026, 10, 1), date(2026, 10, 16)
+
+    def setUp(self):
+        super().setUp()
+        self.ce = FakeCE()
+        app._clients["ce"] = self.ce
+        saved_cache = app._result_cache.copy()
+        app._result_cache.clear()
+        self.addCleanup(app._result_cache.update, saved_cache)
+        self.addCleanup(app._result_cache.clear)
+        self.clock = self.NOW
+        test = self
+
+        class FixedDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return test.clock.astimezone(tz)
+
+        self.addCleanup(setattr, app, "datetime", app.datetime)
+        app.datetime = FixedDatetime
+
+    def cold_start(self):
+        app._result_cache.clear()
+
+    def fetch(self):
+        by_day, _ = app.cached_daily_results("SERVICE", self.START, self.END, BUCKET)
+        return {day: results[0]["Groups"][0]["Metrics"]["UnblendedCost"]["Amount"] for day, results in by_day.items()}
+
+    def test_day_closes_48_hours_after_it_ends(self):
+        day_end = datetime(2026, 10, 13, tzinfo=timezone.utc) + timedelta(days=1)
+        closes = (day_end + app.CACHE_CLOSED_AFTER).astimezone(app.TZ)
+        self.assertTrue(app.is_closed_day(date(2026, 10, 13), closes))
+        self.assertFalse(app.is_closed_day(date(2026, 10, 13), closes - timedelta(seconds=1)))
+        self.assertTrue(app.is_closed_day(date(2026, 10, 12), self.NOW))
+        self.assertFalse(app.is_closed_day(date(2026, 10, 13), self.NOW))
+
+    def test_only_closed_days_are_persisted(self):
+        self.fetch()
+        cached = sorted(key for key in self.s3.objects if key.startswith(app.CACHE_PREFIX))
+        self.assertEqual(cached[0], f"{app.CACHE_PREFIX}SERVICE/DAILY/2026-10-01.json")
+        self.assertEqual(cached[-1], f"{app.CACHE_PREFIX}SERVICE/DAILY/2026-10-12.json")
+        self.assertEqual(len(cached), 12)
+
+    def test_cold_start_serves_closed_days_from_the_bucket_and_requeries_open_days(self):
+        self.fetch()
+        self.cold_start()
+        amounts = self.fetch()
+        self.assertEqual(self.ce.periods, [("2026-10-01", "2026-10-16"), ("2026-10-13", "2026-10-16")])
+        self.assertEqual({amounts[f"2026-10-{d:02d}"] for d in range(1, 13)}, {"1"})
+        # Today, yesterday and the day before (UTC) are still open
+        self.assertEqual([amounts[f"2026-10-{d}"] for d in (13, 14, 15)], ["2", "2", "2"])
+
+    def test_open_days_expire_from_the_in_process_cache(self):
+        self.fetch()
+        self.fetch()
+        self.assertEqual(len(self.ce.periods), 1)
+        self.clock += timedelta(seconds=app.CACHE_VOLATILE_TTL_SECONDS + 1)
+        self.fetch()
+        self.assertEqual(self.ce.periods[-1], ("2026-10-13", "2026-10-16"))
+
+    def test_next_day_closes_one_more_day(self):
+        self.fetch()
+        self.clock += timedelta(days=1)
+        self.cold_start()
+        amounts = self.fetch()
+        self.assertEqual(self.ce.periods[-1], ("2026-10-13", "2026-10-16"))
+        self.cold_start()
+        self.fetch()
+        # Oct 13 closed overnight: it was persisted by the last query and is not asked for again
+        self.assertEqual(self.ce.periods[-1], ("2026-10-14", "2026-10-16"))
+        self.assertEqual(amounts["2026-10-13"], "2")
+
+
+class BackfillTests(StubbedClientsTest):
+    CFG = {
+        app.PARAM_ARCHIVE_BUCKET: BUCKET,
+        app.PARAM_TOP_N_SERVICES: "10",
+        app.PARAM_INCLUDE_MTD: "true",
+        app.PARAM_INCLUDE_DRIVERS: "true",
+    }
+
+    def setUp(self):
+        super().setUp()
+        app._clients["ce"] = FakeCE()
+        saved_cache = app._result_cache.copy()
+        app._result_cache.clear()
+        self.addCleanup(app._result_cache.update, saved_cache)
+        self.addCleanup(app._result_cache.clear)
+
+    def fail_day(self, day):
+        put_object = self.s3.put_object
+
+        def failing_put(Bucket, Key, Body, **kwargs):
+            if Key.startswith(app.report_prefix(day)):
+                raise client_error("InternalError", "PutObject")
+            return put_object(Bucket, Key, Body, **kwargs)
+
+        self.s3.put_object = failing_put
+
+    def test_failed_day_is_reported_and_the_rest_indexed(self):
+        self.fail_day(date(2025, 9, 3))
+        result = app.run_backfill({"start": "2025-09-01", "end": "2025-09-05", "overwrite": True}, self.CFG)
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["failed"], ["2025-09-03"])
+        self.assertEqual(result["written"], ["2025-09-01", "2025-09-02", "2025-09-04", "2025-09-05"])
+        index = self.s3.json(app.report_index_key(date(2025, 9, 1)))
+        self.assertEqual(sorted(index["days"]), result["written"])
+
+    def test_clean_run_is_ok(self):
+        result = app.run_backfill({"start": "2025-09-01", "end": "2025-09-02", "overwrite": True}, self.CFG)
+        self.assertTrue(result["ok"])
+        self.assertEqual((result["written"], result["failed"]), (["2025-09-01", "2025-09-02"], []))
+
+    def test_range_longer_than_the_cap_is_rejected(self):
+        last = date(2025, 1, 1) + timedelta(days=app.BACKFILL_MAX_DAYS)
+        with self.assertRaises(ValueError):
+            app.run_backfill({"start": "2025-01-01", "end": last.isoformat()}, self.CFG)
+        self.assertEqual(app._clients["ce"].periods, [])
+
+
+if __name__ == "__main__":
+    unittest.main()